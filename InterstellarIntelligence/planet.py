@@ -1,8 +1,32 @@
 
+import os
+import sys
 import pygame as pg
 import math as m
+import numpy as np
 from opensimplex import OpenSimplex
 
+FILE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def update_path():
+    """
+    Makes the Simulation modules importable. The array noise kernels live
+    there so the planet prototype and the Simulation share them.
+    """
+
+    simulation_dir = os.path.join(FILE_DIR, "src", "Simulation")
+
+    if simulation_dir not in sys.path:
+        sys.path.append(simulation_dir)
+
+
+update_path()
+
+import asset_cache
+import lighting
+import noise_field
+
 # variables listed with values
 
 class Vector:
@@ -23,69 +47,113 @@ class Light:
         self.direction = direction  
         self.intensity = intensity
 
-light = Light(Vector(0, -1, -1), intensity=1.0)  # Example: light pointing downward (ye implemented nahi hai yet, depends on solar intensity)
+light = Light(Vector(0, -1, -1), intensity=1.0)  # Example: light pointing downward, into the screen
 light.direction.normalize()
 
-def generate_normal_map(radius: int, center: Vector, width: int, height: int, simplex: OpenSimplex) -> pg.Surface:
+# Terrain octaves: (frequency, weight). A half-weight base octave is used as
+# is, these are remapped from [-1, 1] to [0, 1] before weighting.
+TERRAIN_OCTAVES = [(4, 0.25), (8, 0.125), (16, 0.125), (32, 0.0625), (64, 0.03125), (128, 0.015625)]
+TERRAIN_RECIPE = [noise_field.Octave(1, 0.5)] + [
+    noise_field.Octave(frequency, weight, remap=True) for frequency, weight in TERRAIN_OCTAVES
+]
+CLOUD_RECIPE = [noise_field.Octave(1, 1.0)]
+# Noise coordinates from the normal: terrain samples (nx, ny, nx), clouds
+# a scaled copy of (nx, ny, nz)
+TERRAIN_AXES = (0, 1, 0)
+CLOUD_SCALE = (2, 2, 1)
+TERRAIN_BANDS = [-0.25, 0, 0.25]
+TERRAIN_COLORS = np.array([
+    (139, 69, 19),  # Brown
+    (205, 133, 63),  # Sandy Brown
+    (135, 206, 250),  # Light Blue
+    (34, 139, 34),  # Steel Blue
+], dtype=np.uint8)
+
+CLOUD_THRESHOLD = 0.3
+
+
+def build_planet_assets(radius: int, simplex: OpenSimplex) -> dict:
+    """
+    Computes the sphere normals, terrain bands and cloud mask of the whole
+    disk. None of them depend on where the planet is drawn.
+
+    Returns:
+        dict: "normals" (3, 2r, 2r) float64 unit normals, zero outside the
+        disk; "terrain" (2r, 2r) int8 band per pixel, -1 outside the disk;
+        "clouds" (2r, 2r) bool cloud mask. All indexed [x, y].
+    """
+    # Disk offsets indexed [x, y] to match pygame.surfarray
+    x, y = np.meshgrid(np.arange(-radius, radius), np.arange(-radius, radius), indexing="ij")
+    inside = (x * x + y * y) <= radius * radius
+    x, y = x[inside], y[inside]
+
+    # Normal calculation
+    nx = -(radius - x) / radius + 1
+    ny = (radius - y) / radius - 1
+    nz = np.sqrt(np.maximum(0, 1 - (nx * nx + ny * ny)))
+    magnitude = np.sqrt(nx ** 2 + ny ** 2 + nz ** 2)
+    magnitude[magnitude == 0] = 1
+    nx, ny, nz = nx / magnitude, ny / magnitude, nz / magnitude
+
+    normal = (nx, ny, nz)
+    terrain_value = noise_field.fbm(simplex, tuple(normal[axis] for axis in TERRAIN_AXES), TERRAIN_RECIPE)
+    cloud_value = noise_field.fbm(simplex, tuple(c * scale for c, scale in zip(normal, CLOUD_SCALE)), CLOUD_RECIPE)
+
+    normals = np.zeros((3,) + inside.shape)
+    normals[:, inside] = nx, ny, nz
+    terrain = np.full(inside.shape, -1, dtype=np.int8)
+    terrain[inside] = np.digitize(terrain_value, TERRAIN_BANDS)
+    clouds = np.zeros(inside.shape, dtype=bool)
+    clouds[inside] = cloud_value > CLOUD_THRESHOLD
+    return {"normals": normals, "terrain": terrain, "clouds": clouds}
+
+
+def load_planet_assets(radius: int, simplex: OpenSimplex) -> dict:
+    """
+    build_planet_assets backed by the on-disk asset cache.
+    """
+    # Everything build_planet_assets reads, so changing any of it rebuilds
+    params = {
+        "seed": simplex.get_seed(),
+        "radius": radius,
+        "terrain_recipe": [list(octave) for octave in TERRAIN_RECIPE],
+        "terrain_axes": TERRAIN_AXES,
+        "terrain_bands": TERRAIN_BANDS,
+        "cloud_recipe": [list(octave) for octave in CLOUD_RECIPE],
+        "cloud_scale": CLOUD_SCALE,
+        "cloud_threshold": CLOUD_THRESHOLD,
+    }
+    return asset_cache.load_or_build("planet", params, lambda: build_planet_assets(radius, simplex))
+
+
+def generate_normal_map(radius: int, center: Vector, width: int, height: int, simplex: OpenSimplex,
+                        light: Light = light) -> pg.Surface:
+    assets = load_planet_assets(radius, simplex)
+    terrain = assets["terrain"]
+
+    # Only the part of the disk that lands on the surface
+    x, y = np.meshgrid(np.arange(-radius, radius), np.arange(-radius, radius), indexing="ij")
+    px, py = center.x + x, center.y + y
+    visible = (terrain >= 0) & (px >= 0) & (px < width) & (py >= 0) & (py < height)
+
+    # Determine terrain color
+    colors = TERRAIN_COLORS[terrain[visible]]
+
+    # Clouds, blended at 50% over the terrain (we will replace this with the cloud density formula/value)
+    cloudy = assets["clouds"][visible]
+    alpha = 0.5  # Transparency level (0.0 = fully transparent, 1.0 = fully opaque)
+    colors[cloudy] = (alpha * 255 + (1 - alpha) * colors[cloudy]).astype(np.uint8)
+
+    # Diffuse lighting; the light direction points from the sun, so the sun
+    # lies the opposite way
+    to_sun = -np.array([light.direction.x, light.direction.y, light.direction.z])
+    shade, _ = lighting.light_field(assets["normals"][:, visible], to_sun)
+    colors = np.clip(colors * (shade * light.intensity)[:, None], 0, 255).astype(np.uint8)
+
+    pixels = np.zeros((width, height, 3), dtype=np.uint8)
+    pixels[px[visible], py[visible]] = colors
     display = pg.Surface((width, height))
-    for x in range(-radius, radius):
-        for y in range(-radius, radius):
-            if (x * x + y * y) <= radius * radius:
-                # Normal calculation
-                normal = Vector(
-                    -(radius - x) / radius + 1,
-                    (radius - y) / radius - 1
-                )
-                normal.z = m.sqrt(max(0, 1 - (normal.x * normal.x + normal.y * normal.y)))
-                normal.normalize()
-                
-                terrain_value = 0.5 * simplex.noise3(normal.x, normal.y, normal.x)
-                terrain_value += 0.25 * (simplex.noise3(normal.x * 4, normal.y * 4, normal.x * 4) + 1) / 2
-                terrain_value += 0.125 * (simplex.noise3(normal.x * 8, normal.y * 8, normal.x * 8) + 1) / 2
-                terrain_value += 0.125 * (simplex.noise3(normal.x * 16, normal.y * 16, normal.x * 16) + 1) / 2
-                terrain_value += 0.0625 * (simplex.noise3(normal.x * 32, normal.y * 32, normal.x * 32) + 1) / 2
-                terrain_value += 0.03125 * (simplex.noise3(normal.x * 64, normal.y * 64, normal.x * 64) + 1) / 2
-                terrain_value += 0.015625 * (simplex.noise3(normal.x * 128, normal.y * 128, normal.x * 128) + 1) / 2
-
-                # Determine terrain color
-                if terrain_value < -0.25:
-                    color = (139, 69, 19)  # Brown
-                elif terrain_value < 0:
-                    color = (205, 133, 63)  # Sandy Brown
-                elif terrain_value < 0.25:
-                    color = (135, 206, 250)  # Light Blue
-                else:
-                    color = (34, 139, 34)  # Steel Blue
-
-                display.set_at((center.x + x, center.y + y), color)
-
-                # Clouds
-                cloud_value = simplex.noise3(normal.x * 2, normal.y * 2, normal.z)
-                if cloud_value > 0.3:   # we will replace this with the cloud density formula/value
-                    light_direction = Vector(-0.5, -0.5, -1)
-                    light_direction.normalize()
-                    light_power = max(0, normal.x * light_direction.x +
-                                         normal.y * light_direction.y +
-                                         normal.z * light_direction.z)
-                    cloud_color = (255, 255, 255)
-                    # cloud_final_color = tuple(int(c * light_power) for c in cloud_color)
-                    # display.set_at((center.x + x, center.y + y), cloud_color)
-
-                    alpha = 0.5  # Transparency level (0.0 = fully transparent, 1.0 = fully opaque)
-
-                    try:
-                        background_color = display.get_at((center.x + x, center.y + y))[:3]
-                    except IndexError:
-                        background_color = (0, 0, 0)
-
-                    blended_color = (
-                        int(alpha * cloud_color[0] + (1 - alpha) * background_color[0]),
-                        int(alpha * cloud_color[1] + (1 - alpha) * background_color[1]),
-                        int(alpha * cloud_color[2] + (1 - alpha) * background_color[2]),
-                    )
-
-                    display.set_at((center.x + x, center.y + y), blended_color)
-
+    pg.surfarray.blit_array(display, pixels)
     return display
 # TO ADD:
 # levers
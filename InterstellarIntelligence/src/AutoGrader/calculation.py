@@ -106,22 +106,25 @@ def build_engine(order):
     return engine
 
 
+# Reachable range of each output, generated by
+# ../Simulation/interval.py --variable-ranges; test_interval.py there
+# fails when it no longer matches the model
 variable_ranges = {
     "temperature": (0.0, 102.0),
     "cloud_density": (0.0, 10000.0),
-    "photosynthesis": (0, 101),
-    "plants_density": (0.0, 1101.31),
-    "oxygen": (0.0, 1213028.81),
+    "photosynthesis": (0.0, 101.0),
+    "plants_density": (0.0, 1101.0),
+    "oxygen": (0.0, 1212357.5),
     "carbon_dioxide": (39.49, 1040.0),
-    "asi": (39.99, 1213028.81),
+    "asi": (40.29, 1212357.52),
     "rainfall_intensity": (0.0, 2000.0),
     "radius_of_wet_ground": (0.0, 200000.0),
     "rainfall_area": (0.0, 1256637.06),
     "power": (0.0, 10504.0),
     "uv_index": (0.0, 102.0),
     "pollution": (0.0, 1000.5),
-    "health_risk": (0.0, 11.53),
-    "crop_yield": (0, 437991.30),
+    "health_risk": (0.0, 7.01),
+    "crop_yield": (0.0, 437991.3),
     "hunger": (0.0, 100.0),
     "water_resources": (5.0, 2030.0),
     "thirst": (0.0, 100.0),
@@ -149,4 +152,4 @@ def compute_and_normalize(engine, normalizer, indep_variables):
         map: name(str) to normalized value(float) map
     """
     computed = engine.compute(indep_variables)
-    return normalizer.normalize(computed)
\ No newline at end of file
+    return normalizer.normalize(computed)
\ No newline at end of file
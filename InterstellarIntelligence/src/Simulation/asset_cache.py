@@ -0,0 +1,130 @@
+"""
+Persistent cache for generated noise fields and textures.
+
+Every asset is a directory of ``.npy`` files named after a digest of its
+generation parameters and the installed opensimplex version. Loading maps
+the files read-only, so start-up is near instant after the first run and
+several simulation processes share the same physical pages. Changing any
+parameter (or upgrading opensimplex) yields a new digest and the asset is
+regenerated.
+
+The cache lives in ~/.cache/interstellar_intelligence unless the
+SIM_ASSET_CACHE environment variable points elsewhere.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from importlib import metadata
+
+import numpy as np
+
+# Bump when the on-disk layout changes
+CACHE_FORMAT = 1
+
+
+def get_cache_dir():
+    default = os.path.join(os.path.expanduser("~"), ".cache", "interstellar_intelligence")
+    return os.environ.get("SIM_ASSET_CACHE", default)
+
+
+def get_opensimplex_version():
+    try:
+        return metadata.version("opensimplex")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def asset_digest(name, params):
+    """
+    Digest identifying one asset build.
+
+    Args:
+        name (str): asset name, e.g. "terrain_noise"
+        params (dict): JSON-serialisable generation parameters
+
+    Returns:
+        str: 16 hex characters
+    """
+    key = {
+        "name": name,
+        "params": params,
+        "opensimplex": get_opensimplex_version(),
+        "format": CACHE_FORMAT,
+    }
+    encoded = json.dumps(key, sort_keys=True).encode()
+    return hashlib.sha1(encoded).hexdigest()[:16]
+
+
+def _asset_dir(name, params, cache_dir=None):
+    return os.path.join(cache_dir or get_cache_dir(), f"{name}-{asset_digest(name, params)}")
+
+
+def is_cached(name, params, cache_dir=None):
+    """
+    True if the asset is stored, so load_or_build will not call build().
+    """
+    return os.path.exists(os.path.join(_asset_dir(name, params, cache_dir), "manifest.json"))
+
+
+def _load(directory, fields):
+    return {field: np.load(os.path.join(directory, field + ".npy"), mmap_mode="r") for field in fields}
+
+
+def load_or_build(name, params, build, cache_dir=None):
+    """
+    Returns the arrays of an asset, building and storing them on a miss.
+
+    Args:
+        name (str): asset name
+        params (dict): JSON-serialisable parameters the asset depends on
+        build (callable): build() -> dict of field name to numpy array
+        cache_dir (str): overrides get_cache_dir()
+
+    Returns:
+        dict: field name to read-only array (memory-mapped when cached)
+    """
+    cache_dir = cache_dir or get_cache_dir()
+    directory = _asset_dir(name, params, cache_dir)
+    manifest_path = os.path.join(directory, "manifest.json")
+
+    if os.path.exists(manifest_path):
+        try:
+            with open(manifest_path) as file:
+                manifest = json.load(file)
+            return _load(directory, manifest["fields"])
+        except (OSError, ValueError, KeyError):
+            pass  # Damaged entry, rebuild it below
+
+    arrays = build()
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Write into a private directory and rename it into place, so other
+        # processes only ever see complete assets
+        temp_dir = tempfile.mkdtemp(prefix=f".{name}-", dir=cache_dir)
+        os.chmod(temp_dir, 0o755)
+        for field, array in arrays.items():
+            np.save(os.path.join(temp_dir, field + ".npy"), np.ascontiguousarray(array))
+        with open(os.path.join(temp_dir, "manifest.json"), "w") as file:
+            json.dump({"name": name, "params": params, "fields": sorted(arrays)}, file, indent=2)
+
+        if os.path.exists(directory):
+            shutil.rmtree(directory, ignore_errors=True)
+        try:
+            os.replace(temp_dir, directory)
+        except OSError:
+            # Another process stored the same asset first
+            shutil.rmtree(temp_dir, ignore_errors=True)
+        return _load(directory, arrays)
+    except OSError as error:
+        print(f"Asset cache unavailable ({error}), using {name} from memory")
+        return arrays
+
+
+def clear(cache_dir=None):
+    """
+    Deletes every cached asset.
+    """
+    shutil.rmtree(cache_dir or get_cache_dir(), ignore_errors=True)
@@ -0,0 +1,192 @@
+"""
+Vectorized version of equations.calculate_dependent_variables.
+
+Every function takes NumPy arrays (or anything that supports the NumPy
+ufuncs used here) and evaluates the model for all points at once. The
+calculate_* functions return the unclamped expressions and branches of
+equations.py; calculate_dependent_variables applies the CLAMPS limits
+between them, so truncating the results gives the integers the Simulation
+shows.
+
+The scalar path raises ZeroDivisionError wherever the cloud density is 0
+(calculate_albedo divides by it even though "Albedo" reports the cloud
+density); the batch path returns the reported value there instead.
+"""
+
+import hashlib
+import os
+
+import numpy as np
+
+from clamps import CLAMPS  # Re-exported; the limits live there
+
+INPUT_NAMES = ["solar_intensity", "humidity", "wind_speed", "population"]
+INPUT_RANGES = {name: (0.0, 100.0) for name in INPUT_NAMES}  # Slider ranges
+
+OUTPUT_NAMES = [
+    "Temperature (C)", "Cloud Density", "Photosynthesis", "Oxygen", "Carbon Dioxide", "ASI",
+    "Rainfall Intensity", "Radius of wet ground", "Rainfall Area", "Power", "UV index",
+    "Pollution", "Health Risk", "Plants Density", "Crop Yield", "Hunger", "Water Resources",
+    "Thirst", "Albedo",
+]
+
+# Upper clamp of each output, the natural scale for comparing them
+OUTPUT_MAXIMA = {name: float(CLAMPS[name][1]) for name in OUTPUT_NAMES if name in CLAMPS}
+OUTPUT_MAXIMA["Albedo"] = OUTPUT_MAXIMA["Cloud Density"]
+
+
+# Sources whose edits change the model: this module, the clamp limits and
+# the scalar equations the Simulation runs
+MODEL_SOURCES = [__file__] + [os.path.join(os.path.dirname(os.path.abspath(__file__)), name)
+                              for name in ("clamps.py", "equations.py")]
+
+
+def model_digest():
+    """
+    Short digest of the model's sources, for keying results computed from
+    the model so they are rebuilt when either set of equations changes.
+    """
+    digest = hashlib.sha1()
+    for path in MODEL_SOURCES:
+        with open(path, "rb") as file:
+            digest.update(file.read())
+    return digest.hexdigest()[:16]
+
+
+def clamp(value, low, high):
+    return np.minimum(np.maximum(value, low), high)
+
+
+def calculate_temperature(humidity, solar_intensity):
+    return 0.02 * humidity + solar_intensity
+
+
+def calculate_cloud_density(humidity, solar_intensity):
+    return humidity * humidity / np.maximum(solar_intensity, 1)
+
+
+def calculate_photosynthesis(temperature, cloud_density):
+    return temperature * (0.5 + 0.5 * np.cos(cloud_density))
+
+
+def calculate_plants_density(solar_intensity, photosynthesis):
+    return solar_intensity * solar_intensity / 10 + photosynthesis
+
+
+def calculate_oxygen(photosynthesis, plants_density, population):
+    return 5 + 1.5 * photosynthesis + plants_density * plants_density - 0.05 * population
+
+
+def calculate_carbon_dioxide(photosynthesis, population):
+    return 40 + 10 * population - 0.005 * photosynthesis
+
+
+def calculate_asi(oxygen, carbon_dioxide):
+    return np.sqrt(oxygen * oxygen + carbon_dioxide * carbon_dioxide)
+
+
+def calculate_rainfall_intensity(humidity, solar_intensity, wind_speed):
+    return 0.1 * humidity * solar_intensity * (1 + wind_speed / 100)
+
+
+def calculate_radius_of_wet_ground(rainfall_intensity, wind_speed):
+    return rainfall_intensity * wind_speed
+
+
+def calculate_rainfall_area(radius_of_wet_ground):
+    return np.pi * radius_of_wet_ground * 2
+
+
+def calculate_power(temperature, wind_speed):
+    return temperature * temperature + wind_speed
+
+
+def calculate_uv_index(temperature, solar_intensity):
+    return 0.01 * temperature * solar_intensity
+
+
+def calculate_pollution(population, wind_speed):
+    return 10 * population + 0.005 * wind_speed
+
+
+def calculate_health_risk(uv_index, pollution):
+    return np.log(1 + uv_index + pollution)
+
+
+def calculate_crop_yield(solar_intensity, humidity, plants_density):
+    return np.where(solar_intensity > 20, 0.05 * (solar_intensity - 20) * humidity * plants_density, 0)
+
+
+def calculate_hunger(population, crop_yield):
+    return population / np.maximum(crop_yield, 1)
+
+
+def calculate_water_resources(rainfall_intensity, wind_speed, population):
+    return 10 + rainfall_intensity + 0.2 * wind_speed - 0.05 * population
+
+
+def calculate_thirst(population, rainfall_area):
+    return population / np.maximum(rainfall_area, 1)
+
+
+def scalar_failures(outputs):
+    """
+    Points where equations.calculate_dependent_variables raises
+    ZeroDivisionError, given the outputs computed here.
+
+    Returns:
+        np.ndarray: bool mask
+    """
+    return outputs["Cloud Density"] == 0
+
+
+def calculate_dependent_variables(variables, truncate=False, unclamped=None):
+    """
+    Evaluates the model for arrays of slider values.
+
+    Args:
+        variables (dict): INPUT_NAMES -> arrays (or scalars), broadcast
+            together
+        truncate (bool): truncate towards zero like the int() calls of the
+            scalar version; otherwise the unrounded values are returned
+        unclamped (dict): if given, filled with each clamped output's value
+            before its clamp
+
+    Returns:
+        dict: OUTPUT_NAMES -> float64 arrays of the broadcast shape
+    """
+    solar_intensity, humidity, wind_speed, population = (variables[name] for name in INPUT_NAMES)
+
+    def limit(name, value):
+        if unclamped is not None:
+            unclamped[name] = value
+        return clamp(value, *CLAMPS[name])
+
+    temperature = limit("Temperature (C)", calculate_temperature(humidity, solar_intensity))
+    cloud_density = limit("Cloud Density", calculate_cloud_density(humidity, solar_intensity))
+    photosynthesis = limit("Photosynthesis", calculate_photosynthesis(temperature, cloud_density))
+    plants_density = limit("Plants Density", calculate_plants_density(solar_intensity, photosynthesis))
+    oxygen = limit("Oxygen", calculate_oxygen(photosynthesis, plants_density, population))
+    carbon_dioxide = limit("Carbon Dioxide", calculate_carbon_dioxide(photosynthesis, population))
+    asi = limit("ASI", calculate_asi(oxygen, carbon_dioxide))
+    rainfall_intensity = limit("Rainfall Intensity", calculate_rainfall_intensity(humidity, solar_intensity, wind_speed))
+    radius_of_wet_ground = limit("Radius of wet ground", calculate_radius_of_wet_ground(rainfall_intensity, wind_speed))
+    rainfall_area = limit("Rainfall Area", calculate_rainfall_area(radius_of_wet_ground))
+    power = limit("Power", calculate_power(temperature, wind_speed))
+    uv_index = limit("UV index", calculate_uv_index(temperature, solar_intensity))
+    pollution = limit("Pollution", calculate_pollution(population, wind_speed))
+    health_risk = limit("Health Risk", calculate_health_risk(uv_index, pollution))
+    crop_yield = limit("Crop Yield", calculate_crop_yield(solar_intensity, humidity, plants_density))
+    hunger = limit("Hunger", calculate_hunger(population, crop_yield))
+    water_resources = limit("Water Resources", calculate_water_resources(rainfall_intensity, wind_speed, population))
+    thirst = limit("Thirst", calculate_thirst(population, rainfall_area))
+
+    outputs = dict(zip(OUTPUT_NAMES, [
+        temperature, cloud_density, photosynthesis, oxygen, carbon_dioxide, asi,
+        rainfall_intensity, radius_of_wet_ground, rainfall_area, power, uv_index,
+        pollution, health_risk, plants_density, crop_yield, hunger, water_resources,
+        thirst, cloud_density,
+    ]))
+    if truncate:
+        outputs = {name: np.trunc(value) for name, value in outputs.items()}
+    return outputs
@@ -0,0 +1,215 @@
+"""
+Offline planet renders for parameter sweeps.
+
+A sweep spec is a JSON file listing values for any of the slider variables;
+every combination is rendered through planet_renderer.draw_planet on a
+process pool:
+
+    {
+        "variables": {
+            "solar_intensity": [0, 50, 100],
+            "humidity": {"start": 0, "stop": 100, "num": 5},
+            "wind_speed": 10
+        },
+        "rotation": 0.25,
+        "radius": 200
+    }
+
+A variable is a list, a single value or an evenly spaced range (``stop``
+included). Unlisted variables keep their defaults. The command writes
+``frame_%05d.png`` files with an ``index.csv`` of the inputs and dependent
+variables of every frame, and/or a labelled contact sheet.
+
+    python batch_render.py sweep.json --out renders/ --contact-sheet sheet.png
+"""
+
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import argparse
+import csv
+import itertools
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pygame
+
+import headless
+import planet_renderer
+import tile_pool
+from simulation import Simulation, DEFAULT_VARIABLES
+
+LABEL_HEIGHT = 18
+LABEL_NAMES = {"solar_intensity": "sun", "humidity": "hum", "wind_speed": "wind", "population": "pop"}
+
+
+def expand_values(value):
+    if isinstance(value, dict):
+        return np.linspace(value["start"], value["stop"], int(value["num"])).tolist()
+    if isinstance(value, list):
+        return value
+    return [value]
+
+
+def expand_spec(spec):
+    """
+    Returns:
+        list: one variables dict per frame, last variable varying fastest
+    """
+    sweep = spec.get("variables", {})
+    for name in sweep:
+        if name not in DEFAULT_VARIABLES:
+            raise ValueError(f"Unknown variable: {name}")
+    names = list(sweep)
+    frames = []
+    for values in itertools.product(*(expand_values(sweep[name]) for name in names)):
+        variables = dict(DEFAULT_VARIABLES)
+        variables.update(zip(names, values))
+        frames.append(variables)
+    return frames
+
+
+def init_worker():
+    # Each process renders one frame at a time; the processes provide the
+    # parallelism, so tiles run inline instead of on a thread pool.
+    tile_pool.set_thread_count(1)
+
+
+def render_job(job):
+    """
+    Renders one frame in a worker process.
+
+    Args:
+        job (tuple): (index, variables, options) with options holding
+            rotation, radius, lod, out (directory or None) and thumbnail
+            (contact sheet cell size or None)
+
+    Returns:
+        tuple: (index, dependent variables, thumbnail RGB array or None);
+        the dependent variables are None if the model failed
+    """
+    index, variables, options = job
+    try:
+        sim = Simulation(variables)
+    except ArithmeticError as error:
+        print(f"Frame {index} skipped, model failed for {variables}: {error}")
+        return index, None, None
+    sim.planet_rotation = sim.cloud_rotation = options["rotation"]
+    surface = headless.render_frame(sim, options["radius"], options["lod"])
+    if options["out"]:
+        pygame.image.save(surface, os.path.join(options["out"], f"frame_{index:05d}.png"))
+    thumbnail = None
+    if options["thumbnail"]:
+        size = options["thumbnail"]
+        thumbnail = headless.frame_array(pygame.transform.smoothscale(surface, (size, size)))
+    return index, sim.dependent_variables, thumbnail
+
+
+def frame_label(variables, names):
+    return " ".join(f"{LABEL_NAMES.get(name, name)} {variables[name]:g}" for name in names)
+
+
+def write_index(path, frames, dependents):
+    fieldnames = ["frame"] + list(DEFAULT_VARIABLES)
+    fieldnames += next((list(dependent) for dependent in dependents if dependent), [])
+    with open(path, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=fieldnames)
+        writer.writeheader()
+        for index, (variables, dependent) in enumerate(zip(frames, dependents)):
+            writer.writerow({"frame": index, **variables, **(dependent or {})})
+
+
+def build_contact_sheet(thumbnails, labels, columns, size):
+    pygame.font.init()
+    font = pygame.font.Font(None, LABEL_HEIGHT)
+    rows = -(-len(thumbnails) // columns)
+    sheet = pygame.Surface((columns * size, rows * (size + LABEL_HEIGHT)))
+    for index, (thumbnail, text) in enumerate(zip(thumbnails, labels)):
+        x, y = index % columns * size, index // columns * (size + LABEL_HEIGHT)
+        if thumbnail is not None:
+            sheet.blit(pygame.surfarray.make_surface(thumbnail.swapaxes(0, 1)), (x, y))
+        label = font.render(text, True, (255, 255, 255))
+        sheet.blit(label, (x + 2, y + size + 2), pygame.Rect(0, 0, size - 4, LABEL_HEIGHT))
+    return sheet
+
+
+def render_sweep(spec, out=None, contact_sheet=None, columns=None, thumbnail=160, workers=None):
+    """
+    Renders every frame of a sweep spec.
+
+    Args:
+        spec (dict): parsed sweep spec
+        out (str): directory for the PNG sequence and index.csv, or None
+        contact_sheet (str): path of the contact sheet PNG, or None
+        columns (int): contact sheet columns, by default about square
+        thumbnail (int): contact sheet cell size in pixels
+        workers (int): process count, by default one per CPU
+
+    Returns:
+        list: dependent variables of every frame, None where the model failed
+    """
+    frames = expand_spec(spec)
+    options = {
+        "rotation": float(spec.get("rotation", 0)) % 1,
+        "radius": int(spec.get("radius", planet_renderer.PLANET_RADIUS)),
+        "lod": int(spec.get("lod", 0)),
+        "out": out,
+        "thumbnail": thumbnail if contact_sheet else None,
+    }
+    if out:
+        os.makedirs(out, exist_ok=True)
+
+    # Build the globe textures once in the parent so they land in the asset
+    # cache; the workers then only memory-map them.
+    planet_renderer.get_globe_layers()
+
+    jobs = [(index, variables, options) for index, variables in enumerate(frames)]
+    dependents = [None] * len(frames)
+    thumbnails = [None] * len(frames)
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(jobs) // (4 * workers))
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+        for index, dependent, image in executor.map(render_job, jobs, chunksize=chunksize):
+            dependents[index] = dependent
+            thumbnails[index] = image
+
+    if out and frames:
+        write_index(os.path.join(out, "index.csv"), frames, dependents)
+    if contact_sheet and frames:
+        # Label each cell with the variables that change across the sweep
+        varying = [name for name in DEFAULT_VARIABLES if len({frame[name] for frame in frames}) > 1]
+        labels = [frame_label(frame, varying) for frame in frames]
+        columns = columns or int(np.ceil(np.sqrt(len(frames))))
+        pygame.image.save(build_contact_sheet(thumbnails, labels, columns, thumbnail), contact_sheet)
+    return dependents
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render the planet for every combination in a sweep spec.")
+    parser.add_argument("spec", help="JSON sweep spec")
+    parser.add_argument("--out", help="directory for frame_%%05d.png files and index.csv")
+    parser.add_argument("--contact-sheet", help="path of a contact sheet PNG")
+    parser.add_argument("--columns", type=int, help="contact sheet columns")
+    parser.add_argument("--thumbnail", type=int, default=160, help="contact sheet cell size in pixels")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    args = parser.parse_args()
+    if not args.out and not args.contact_sheet:
+        parser.error("Nothing to write: pass --out and/or --contact-sheet")
+
+    with open(args.spec) as file:
+        spec = json.load(file)
+    start = time.perf_counter()
+    try:
+        dependents = render_sweep(spec, args.out, args.contact_sheet, args.columns, args.thumbnail, args.workers)
+    except ValueError as error:
+        parser.error(str(error))
+    elapsed = time.perf_counter() - start
+    skipped = dependents.count(None)
+    print(f"Rendered {len(dependents) - skipped} frames in {elapsed:.1f} s, {skipped} skipped")
+
+
+if __name__ == "__main__":
+    main()
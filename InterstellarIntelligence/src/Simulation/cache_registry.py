@@ -0,0 +1,250 @@
+import functools
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def sizeof(value):
+    """
+    Approximate memory held by a cached value. Arrays and surfaces count
+    their pixel buffers; containers add up their items.
+    """
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if hasattr(value, "get_pitch"):  # pygame.Surface
+        return value.get_pitch() * value.get_height()
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(sizeof(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sizeof(item) for item in value.values())
+    return sys.getsizeof(value)
+
+
+class Cache:
+    """
+    Bounded key/value cache with hit, miss, eviction and byte counters.
+
+    Entries are evicted when the cache exceeds ``max_entries`` or
+    ``max_bytes``, or when the registry it belongs to exceeds its memory
+    limit. ``policy`` picks the victim: "lru" (least recently used) or
+    "lfu" (fewest hits, oldest first on ties). LFU never evicts the most
+    recently used entry, so a new entry is not dropped before its first hit.
+    """
+
+    def __init__(self, name, max_entries=None, max_bytes=None, policy="lru", registry=None):
+        if policy not in ("lru", "lfu"):
+            raise ValueError(f"Unknown eviction policy: {policy}")
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.registry = registry
+
+        self.lock = threading.RLock()
+        self.entries = OrderedDict()  # key -> (value, bytes)
+        self.uses = {}
+        self.bytes = 0
+        self.peak_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key, default=None):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self.uses[key] += 1
+            self.entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value):
+        size = sizeof(value)
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = (value, size)
+            self.uses[key] = 0
+            self.bytes += size
+            self.peak_bytes = max(self.peak_bytes, self.bytes)
+            while len(self.entries) > 1 and self._over_limit():
+                self.evict()
+        if self.registry is not None:
+            self.registry.enforce_limit(self)
+        return value
+
+    def get_or_create(self, key, build):
+        """
+        Returns the cached value for ``key``, calling ``build()`` on a miss.
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = self.put(key, build())
+        return value
+
+    def evict(self):
+        """
+        Drops one entry chosen by the policy. Returns False if empty.
+        """
+        with self.lock:
+            if not self.entries:
+                return False
+            if self.policy == "lru":
+                key = next(iter(self.entries))
+            else:
+                candidates = list(self.entries)[:-1] or list(self.entries)
+                key = min(candidates, key=self.uses.__getitem__)
+            self._remove(key)
+            self.evictions += 1
+            return True
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.uses.clear()
+            self.bytes = 0
+
+    def _remove(self, key):
+        _, size = self.entries.pop(key)
+        del self.uses[key]
+        self.bytes -= size
+
+    def _over_limit(self):
+        if self.max_entries is not None and len(self.entries) > self.max_entries:
+            return True
+        return self.max_bytes is not None and self.bytes > self.max_bytes
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "peak_bytes": self.peak_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class CacheRegistry:
+    """
+    Owns every in-memory cache of the simulation so their counters can be
+    shown together and their combined size kept under ``memory_limit``
+    bytes.
+
+    Configured with SIM_CACHE_MB (memory ceiling, default 256) and
+    SIM_CACHE_LOG (seconds between log lines; defaults to 60 when
+    SIM_PROFILE is set, otherwise off).
+
+    The render worker and the main thread both fill caches, so the
+    registry lock serializes enforcement and registration. It is always
+    taken before a cache's own lock, never while holding one.
+    """
+
+    def __init__(self, memory_limit=None, log_interval=0):
+        self.memory_limit = memory_limit
+        self.log_interval = log_interval
+        self.lock = threading.RLock()
+        self.caches = {}
+        self.last_log = time.monotonic()
+
+    @classmethod
+    def from_env(cls):
+        memory_mb = float(os.environ.get("SIM_CACHE_MB", "256"))
+        profiling = os.environ.get("SIM_PROFILE", "") not in ("", "0")
+        log_interval = float(os.environ.get("SIM_CACHE_LOG", "60" if profiling else "0"))
+        return cls(memory_limit=int(memory_mb * 1024 * 1024), log_interval=log_interval)
+
+    def create(self, name, max_entries=None, max_bytes=None, policy="lru"):
+        with self.lock:
+            if name in self.caches:
+                raise ValueError(f"Cache {name} already registered")
+            cache = Cache(name, max_entries, max_bytes, policy, registry=self)
+            self.caches[name] = cache
+            return cache
+
+    def memoize(self, name, max_entries=None, max_bytes=None, policy="lru"):
+        """
+        Decorator caching a function on its positional arguments, a bounded
+        replacement for functools.lru_cache.
+        """
+        cache = self.create(name, max_entries, max_bytes, policy)
+
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args):
+                return cache.get_or_create(args, lambda: function(*args))
+            wrapper.cache = cache
+            return wrapper
+        return decorator
+
+    def total_bytes(self):
+        with self.lock:
+            return sum(cache.bytes for cache in self.caches.values())
+
+    def enforce_limit(self, source):
+        """
+        Evicts from ``source`` (the cache that just grew), then from the
+        largest other caches, until the total fits the memory limit. The
+        entry just added to ``source`` is kept. Safe to call from any
+        thread.
+        """
+        if self.memory_limit is None:
+            return
+        with self.lock:
+            while self.total_bytes() > self.memory_limit:
+                if len(source) > 1:
+                    source.evict()
+                    continue
+                others = [cache for cache in self.caches.values() if cache is not source and len(cache)]
+                if not others:
+                    return
+                max(others, key=lambda cache: cache.bytes).evict()
+
+    def stats(self):
+        with self.lock:
+            return [cache.stats() for cache in self.caches.values()]
+
+    def hud_lines(self):
+        lines = [f"caches {self.total_bytes() / 2 ** 20:7.1f} MB of {self.memory_limit / 2 ** 20:.0f}"
+                 if self.memory_limit else f"caches {self.total_bytes() / 2 ** 20:7.1f} MB"]
+        for stats in self.stats():
+            lines.append(
+                f"{stats['name']:<14}{stats['entries']:5d} {stats['bytes'] / 2 ** 20:6.1f} MB"
+                f"  hit {stats['hit_rate']:4.0%}  ev {stats['evictions']}"
+            )
+        return lines
+
+    def maybe_log(self):
+        """
+        Prints one line per cache if the log interval has passed.
+        """
+        if not self.log_interval:
+            return
+        now = time.monotonic()
+        if now - self.last_log < self.log_interval:
+            return
+        self.last_log = now
+        for stats in self.stats():
+            print(
+                f"Cache {stats['name']}: {stats['entries']} entries, {stats['bytes']} bytes "
+                f"(peak {stats['peak_bytes']}), {stats['hits']} hits, {stats['misses']} misses, "
+                f"{stats['evictions']} evictions"
+            )
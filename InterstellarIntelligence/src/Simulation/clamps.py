@@ -0,0 +1,26 @@
+# Clamp limits of the model, shared by batch_equations and both scalar
+# equations.py files. Plain Python with no imports, so the scalar
+# equations do not pull in NumPy to read them.
+
+# (low, high) limits each computed output is clamped to. Albedo reports the
+# clamped cloud density and has no clamp of its own.
+CLAMPS = {
+    "Temperature (C)": (0.0, 102.0), "Cloud Density": (0.0, 10000.0), "Photosynthesis": (0, 101),
+    "Plants Density": (0.0, 1101.31), "Oxygen": (0.0, 1213028.81), "Carbon Dioxide": (39.49, 1040.0),
+    "ASI": (39.99, 1213028.81), "Rainfall Intensity": (0.0, 2000.0), "Radius of wet ground": (0.0, 200000.0),
+    "Rainfall Area": (0.0, 1256637.06), "Power": (0.0, 10504.0), "UV index": (0.0, 102.0),
+    "Pollution": (0.0, 1000.5), "Health Risk": (0.0, 11.53), "Crop Yield": (0, 437991.30),
+    "Hunger": (0.0, 100.0), "Water Resources": (5.0, 2030.0), "Thirst": (0.0, 100.0),
+}
+
+
+def clamp_output(name, value):
+    """
+    Limits a scalar computed value to the CLAMPS range of output ``name``.
+    """
+    low, high = CLAMPS[name]
+    if value < low:
+        return low
+    if value > high:
+        return high
+    return value
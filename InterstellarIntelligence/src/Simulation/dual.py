@@ -0,0 +1,171 @@
+"""
+Forward-mode automatic differentiation of the model.
+
+A ``Dual`` carries values and their gradients with respect to the four
+sliders. It implements the NumPy ufuncs used by batch_equations (and
+``np.where``), so running batch_equations.calculate_dependent_variables on
+duals yields every output together with its exact derivatives in one pass.
+``jacobian`` does that for arrays of slider settings.
+
+Clamps and branches are piecewise: the derivative is that of the active
+piece. On a tie (a value exactly at a clamp limit or branch point) the
+unclamped piece wins for np.maximum / np.minimum, and np.where follows its
+condition.
+"""
+
+import numpy as np
+
+import batch_equations
+
+CHUNK_POINTS = 65536
+
+
+def _term(grad, factor):
+    return None if grad is None else grad * np.asarray(factor)[..., None]
+
+
+def _sum(*terms):
+    present = [term for term in terms if term is not None]
+    total = present[0]
+    for term in present[1:]:
+        total = total + term
+    return total
+
+
+def _select(condition, grad_true, grad_false):
+    condition = np.asarray(condition)[..., None]
+    return np.where(condition, 0 if grad_true is None else grad_true, 0 if grad_false is None else grad_false)
+
+
+# Gradient rules: (values, grads) of the operands -> gradient of the result.
+# A None grad is a constant operand.
+_RULES = {
+    np.add: lambda v, g: _sum(g[0], g[1]),
+    np.subtract: lambda v, g: _sum(g[0], _term(g[1], -1)),
+    np.multiply: lambda v, g: _sum(_term(g[0], v[1]), _term(g[1], v[0])),
+    np.true_divide: lambda v, g: _sum(_term(g[0], 1 / v[1]), _term(g[1], -v[0] / (v[1] * v[1]))),
+    np.negative: lambda v, g: _term(g[0], -1),
+    np.positive: lambda v, g: g[0],
+    np.square: lambda v, g: _term(g[0], 2 * v[0]),
+    np.sqrt: lambda v, g: _term(g[0], 0.5 / np.sqrt(v[0])),
+    np.exp: lambda v, g: _term(g[0], np.exp(v[0])),
+    np.log: lambda v, g: _term(g[0], 1 / v[0]),
+    np.sin: lambda v, g: _term(g[0], np.cos(v[0])),
+    np.cos: lambda v, g: _term(g[0], -np.sin(v[0])),
+    np.absolute: lambda v, g: _term(g[0], np.sign(v[0])),
+    np.maximum: lambda v, g: _select(v[0] >= v[1], g[0], g[1]),
+    np.minimum: lambda v, g: _select(v[0] <= v[1], g[0], g[1]),
+    np.power: lambda v, g: _sum(
+        _term(g[0], v[1] * np.power(v[0], v[1] - 1)),
+        _term(g[1], np.power(v[0], v[1]) * np.log(np.where(v[0] > 0, v[0], 1))),
+    ),
+}
+_CONSTANT_UFUNCS = {np.trunc, np.floor, np.ceil, np.rint, np.sign}
+_COMPARISONS = {np.greater, np.greater_equal, np.less, np.less_equal, np.equal, np.not_equal}
+
+
+class Dual(np.lib.mixins.NDArrayOperatorsMixin):
+    """
+    Values with gradients. ``grad`` has the shape of ``value`` plus a last
+    axis of partial derivatives (it may be broadcast against ``value``).
+    """
+
+    def __init__(self, value, grad):
+        self.value = np.asarray(value, dtype=np.float64)
+        self.grad = np.asarray(grad, dtype=np.float64)
+
+    @property
+    def shape(self):
+        return self.value.shape
+
+    def __repr__(self):
+        return f"Dual({self.value!r}, grad={self.grad!r})"
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        if method != "__call__" or kwargs:
+            return NotImplemented
+        values = [x.value if isinstance(x, Dual) else np.asarray(x) for x in inputs]
+        if ufunc in _COMPARISONS:
+            return ufunc(*values)
+        result = ufunc(*values)
+        if ufunc in _CONSTANT_UFUNCS:
+            derivatives = next(x.grad.shape[-1] for x in inputs if isinstance(x, Dual))
+            return Dual(result, np.zeros(np.shape(result) + (derivatives,)))
+        rule = _RULES.get(ufunc)
+        if rule is None:
+            return NotImplemented
+        grads = [x.grad if isinstance(x, Dual) else None for x in inputs]
+        return Dual(result, rule(values, grads))
+
+    def __array_function__(self, func, types, args, kwargs):
+        if func is not np.where or kwargs or len(args) != 3:
+            return NotImplemented
+        condition, if_true, if_false = args
+        condition = condition.value if isinstance(condition, Dual) else np.asarray(condition)
+        values = [x.value if isinstance(x, Dual) else x for x in (if_true, if_false)]
+        grads = [x.grad if isinstance(x, Dual) else None for x in (if_true, if_false)]
+        return Dual(np.where(condition, *values), _select(condition, *grads))
+
+
+def seed(variables):
+    """
+    Turns slider values into duals differentiating with respect to each
+    of batch_equations.INPUT_NAMES.
+
+    Returns:
+        dict: input name -> Dual, all broadcast to one shape
+    """
+    values = np.broadcast_arrays(*(np.asarray(variables[name], dtype=np.float64)
+                                   for name in batch_equations.INPUT_NAMES))
+    count = len(values)
+    return {
+        name: Dual(value, np.broadcast_to(np.eye(count)[i], value.shape + (count,)))
+        for i, (name, value) in enumerate(zip(batch_equations.INPUT_NAMES, values))
+    }
+
+
+def jacobian(variables):
+    """
+    Evaluates the model and its derivatives in one pass, in chunks of
+    CHUNK_POINTS settings to keep the gradient temporaries small.
+
+    Args:
+        variables (dict): INPUT_NAMES -> arrays (or scalars), broadcast together
+
+    Returns:
+        tuple: (outputs, jacobian) where outputs maps OUTPUT_NAMES to value
+        arrays and jacobian has shape (..., 19, 4): d output / d input in
+        OUTPUT_NAMES x INPUT_NAMES order
+    """
+    inputs = np.broadcast_arrays(*(np.asarray(variables[name], dtype=np.float64)
+                                   for name in batch_equations.INPUT_NAMES))
+    shape = inputs[0].shape
+    flat = [np.ravel(values) for values in inputs]
+    total = flat[0].size
+    outputs = {name: np.empty(total) for name in batch_equations.OUTPUT_NAMES}
+    matrix = np.empty((total, len(batch_equations.OUTPUT_NAMES), len(flat)))
+
+    for start in range(0, total, CHUNK_POINTS):
+        stop = min(start + CHUNK_POINTS, total)
+        duals = seed({name: values[start:stop] for name, values in zip(batch_equations.INPUT_NAMES, flat)})
+        results = batch_equations.calculate_dependent_variables(duals)
+        for i, name in enumerate(batch_equations.OUTPUT_NAMES):
+            outputs[name][start:stop] = results[name].value
+            matrix[start:stop, i] = results[name].grad
+
+    outputs = {name: values.reshape(shape) for name, values in outputs.items()}
+    return outputs, matrix.reshape(shape + matrix.shape[1:])
+
+
+def sensitivities(variables):
+    """
+    Derivatives at one slider setting, for display.
+
+    Returns:
+        dict: output name -> {input name: derivative}
+    """
+    _, matrix = jacobian(variables)
+    return {
+        output: dict(zip(batch_equations.INPUT_NAMES, row.tolist()))
+        for output, row in zip(batch_equations.OUTPUT_NAMES, matrix)
+    }
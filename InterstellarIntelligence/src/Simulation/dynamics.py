@@ -0,0 +1,369 @@
+"""
+Time-stepping dynamics of the planet.
+
+The static model maps slider settings straight to outputs. Here oxygen,
+carbon dioxide, water resources, plant density and population are state
+that evolves: at every instant the batch_equations give, from the current
+state, the value each of the first four would settle at, and the state
+moves towards it with its own time constant. Population grows
+logistically and shrinks once hunger or thirst (population per unit of
+crop yield or rainfall area) pass 1. Solar intensity, humidity and wind
+speed are the fixed drivers of each planet. Time is in years.
+
+State is held in contiguous (planets, 5) arrays, so one call advances
+thousands of independent planets: ``Planets.run`` with fixed Euler or RK4
+steps, ``Planets.run_adaptive`` with Dormand-Prince 5(4) steps sized per
+planet. Either can record one planet's ``Trajectory`` for the Simulation
+front-end (T key) to play back.
+
+    python dynamics.py --planets 20000 --steps 500 --dt 0.1 --method rk4
+    python dynamics.py --planets 20000 --duration 50 --adaptive
+    python dynamics.py --set solar_intensity=60 --set humidity=40 --barren --record 0 --out trajectory.npz
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+import batch_equations
+
+STATE_NAMES = ["Oxygen", "Carbon Dioxide", "Water Resources", "Plants Density", "Population"]
+DRIVER_NAMES = ["solar_intensity", "humidity", "wind_speed"]
+
+# Years for each of the first four states to close most of the gap to the
+# value the equations give
+TIME_CONSTANTS = np.array([20.0, 20.0, 2.0, 5.0])
+GROWTH_RATE = 0.05  # Population growth per year with food and water to spare
+STATE_LIMITS = np.array([batch_equations.CLAMPS[name] for name in STATE_NAMES[:4]]
+                        + [batch_equations.INPUT_RANGES["population"]], dtype=float)
+SCALES = STATE_LIMITS[:, 1]  # Reference sizes for the adaptive error norm
+
+DURATION = 100.0
+DT = 0.1
+TOLERANCE = 1e-6
+METHODS = ("euler", "rk4")
+
+# Dormand-Prince 5(4) tableau
+_DP_C = np.array([0, 1 / 5, 3 / 10, 4 / 5, 8 / 9, 1, 1])
+_DP_A = [
+    [],
+    [1 / 5],
+    [3 / 40, 9 / 40],
+    [44 / 45, -56 / 15, 32 / 9],
+    [19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729],
+    [9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656],
+    [35 / 384, 0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84],
+]
+_DP_B = np.array([35 / 384, 0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84, 0])
+_DP_ERROR = _DP_B - np.array([5179 / 57600, 0, 7571 / 16695, 393 / 640, -92097 / 339200, 187 / 2100, 1 / 40])
+
+
+def _limit(name, value):
+    return batch_equations.clamp(value, *batch_equations.CLAMPS[name])
+
+
+def rates(state, drivers):
+    """
+    Time derivatives of the state.
+
+    Args:
+        state (np.ndarray): (n, 5) in STATE_NAMES order
+        drivers (np.ndarray): (n, 3) in DRIVER_NAMES order
+
+    Returns:
+        np.ndarray: (n, 5) derivatives per year
+    """
+    be = batch_equations
+    oxygen, carbon_dioxide, water, plants, population = state.T
+    solar_intensity, humidity, wind_speed = drivers.T
+
+    temperature = _limit("Temperature (C)", be.calculate_temperature(humidity, solar_intensity))
+    cloud_density = _limit("Cloud Density", be.calculate_cloud_density(humidity, solar_intensity))
+    photosynthesis = _limit("Photosynthesis", be.calculate_photosynthesis(temperature, cloud_density))
+    rainfall_intensity = _limit("Rainfall Intensity",
+                                be.calculate_rainfall_intensity(humidity, solar_intensity, wind_speed))
+    radius_of_wet_ground = _limit("Radius of wet ground",
+                                  be.calculate_radius_of_wet_ground(rainfall_intensity, wind_speed))
+    rainfall_area = _limit("Rainfall Area", be.calculate_rainfall_area(radius_of_wet_ground))
+    crop_yield = _limit("Crop Yield", be.calculate_crop_yield(solar_intensity, humidity, plants))
+
+    # Where the equations would put each state given the rest of it
+    targets = np.stack([
+        _limit("Oxygen", be.calculate_oxygen(photosynthesis, plants, population)),
+        _limit("Carbon Dioxide", be.calculate_carbon_dioxide(photosynthesis, population)),
+        _limit("Water Resources", be.calculate_water_resources(rainfall_intensity, wind_speed, population)),
+        _limit("Plants Density", be.calculate_plants_density(solar_intensity, photosynthesis)),
+    ], axis=1)
+    derivatives = np.empty_like(state)
+    derivatives[:, :4] = (targets - state[:, :4]) / TIME_CONSTANTS
+
+    # Unclamped hunger and thirst are population over what food and water
+    # support; the slider range caps population as well
+    hunger = be.calculate_hunger(population, crop_yield)
+    thirst = be.calculate_thirst(population, rainfall_area)
+    crowding = population / STATE_LIMITS[4, 1]
+    derivatives[:, 4] = GROWTH_RATE * population * (1 - np.maximum(np.maximum(hunger, thirst), crowding))
+    return derivatives
+
+
+def euler_step(state, drivers, dt):
+    return state + dt * rates(state, drivers)
+
+
+def rk4_step(state, drivers, dt):
+    k1 = rates(state, drivers)
+    k2 = rates(state + dt / 2 * k1, drivers)
+    k3 = rates(state + dt / 2 * k2, drivers)
+    k4 = rates(state + dt * k3, drivers)
+    return state + dt / 6 * (k1 + 2 * k2 + 2 * k3 + k4)
+
+
+STEPPERS = {"euler": euler_step, "rk4": rk4_step}
+
+
+def limit_state(state):
+    """
+    Clamps the state to the ranges the equations allow, in place.
+    """
+    np.clip(state, STATE_LIMITS[:, 0], STATE_LIMITS[:, 1], out=state)
+    return state
+
+
+def initial_state(variables, barren=False):
+    """
+    State of planets at the given slider settings: the static model's
+    outputs, or with ``barren`` no plants, oxygen or water yet.
+
+    Args:
+        variables (dict): INPUT_NAMES -> arrays or scalars, broadcast
+            together; population is the starting population
+
+    Returns:
+        tuple: (state, drivers) contiguous float64 arrays
+    """
+    columns = np.broadcast_arrays(*(np.asarray(variables[name], dtype=np.float64).ravel()
+                                    for name in batch_equations.INPUT_NAMES))
+    inputs = dict(zip(batch_equations.INPUT_NAMES, columns))
+    outputs = batch_equations.calculate_dependent_variables(inputs)
+    state = np.stack([outputs[name] for name in STATE_NAMES[:4]] + [inputs["population"]], axis=1)
+    if barren:
+        state[:, [0, 2, 3]] = STATE_LIMITS[[0, 2, 3], 0]
+    drivers = np.stack([inputs[name] for name in DRIVER_NAMES], axis=1)
+    return np.ascontiguousarray(limit_state(state)), np.ascontiguousarray(drivers)
+
+
+class Trajectory:
+    """
+    States of one planet over time: ``times`` (m,) and ``states`` (m, 5)
+    in STATE_NAMES order, with its ``drivers``.
+    """
+
+    def __init__(self, times, states, drivers):
+        self.times = np.asarray(times, dtype=np.float64)
+        self.states = np.asarray(states, dtype=np.float64)
+        self.drivers = np.asarray(drivers, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.times)
+
+    def at(self, t):
+        """
+        Returns:
+            dict: state name -> value at time ``t``, linearly interpolated
+        """
+        return {name: float(np.interp(t, self.times, self.states[:, i])) for i, name in enumerate(STATE_NAMES)}
+
+    def save(self, path):
+        np.savez(path, times=self.times, states=self.states, drivers=self.drivers,
+                 state_names=np.array(STATE_NAMES), driver_names=np.array(DRIVER_NAMES))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["times"], data["states"], data["drivers"])
+
+
+class Planets:
+    """
+    Independent planets advanced together. ``state`` is (n, 5) and
+    ``drivers`` (n, 3), both C-contiguous; ``time`` is each planet's own
+    clock, which differs between planets only after adaptive runs.
+    """
+
+    def __init__(self, state, drivers):
+        self.state = np.ascontiguousarray(state, dtype=np.float64)
+        self.drivers = np.ascontiguousarray(drivers, dtype=np.float64)
+        self.time = np.zeros(len(self.state))
+        self.steps = 0  # Planet-steps taken, rejected adaptive steps included
+
+    @classmethod
+    def from_variables(cls, variables, barren=False):
+        return cls(*initial_state(variables, barren))
+
+    def __len__(self):
+        return len(self.state)
+
+    def outputs(self):
+        """
+        Returns:
+            dict: state name -> (n,) array
+        """
+        return {name: self.state[:, i] for i, name in enumerate(STATE_NAMES)}
+
+    def run(self, steps, dt=DT, method="rk4", record=None):
+        """
+        Advances every planet by ``steps`` fixed steps.
+
+        Args:
+            record (int): index of a planet whose trajectory to keep
+
+        Returns:
+            Trajectory or None
+        """
+        if method not in STEPPERS:
+            raise ValueError(f"Unknown method: {method}")
+        step = STEPPERS[method]
+        recorded = [self.state[record].copy()] if record is not None else None
+        start = self.time[record] if record is not None else 0.0
+        for _ in range(steps):
+            self.state = limit_state(step(self.state, self.drivers, dt))
+            if recorded is not None:
+                recorded.append(self.state[record].copy())
+        self.time += steps * dt
+        self.steps += steps * len(self)
+        if recorded is None:
+            return None
+        return Trajectory(start + dt * np.arange(steps + 1), recorded, self.drivers[record])
+
+    def run_adaptive(self, duration, tolerance=TOLERANCE, record=None, max_rounds=100_000):
+        """
+        Advances every planet by ``duration`` with Dormand-Prince 5(4)
+        steps, each planet sizing its own steps so the error estimate stays
+        within ``tolerance`` of the state's scale.
+
+        Returns:
+            Trajectory or None
+
+        Raises:
+            RuntimeError: if some planet has not reached the end after
+                ``max_rounds`` rounds of steps
+        """
+        end = self.time + duration
+        dt = np.full(len(self), min(DT, duration))
+        recorded = ([self.time[record]], [self.state[record].copy()]) if record is not None else None
+
+        def unfinished():
+            return np.flatnonzero(self.time < end - 1e-12 * np.maximum(end, 1))
+
+        for _ in range(max_rounds):
+            active = unfinished()
+            if not len(active):
+                break
+            y, drivers = self.state[active], self.drivers[active]
+            h = np.minimum(dt[active], end[active] - self.time[active])[:, None]
+            stages = []
+            for a in _DP_A:
+                increment = sum(coefficient * k for coefficient, k in zip(a, stages)) if a else 0
+                stages.append(rates(y + h * increment, drivers))
+            k = np.stack(stages)
+            proposal = y + h * np.tensordot(_DP_B, k, axes=1)
+            error = np.abs(h * np.tensordot(_DP_ERROR, k, axes=1)) / (tolerance * SCALES)
+            norm = error.max(axis=1)
+
+            accepted = norm <= 1
+            rows = active[accepted]
+            self.state[rows] = limit_state(proposal[accepted])
+            self.time[rows] += h[accepted, 0]
+            # Standard step-size control with a safety factor
+            with np.errstate(divide="ignore"):
+                factor = np.clip(0.9 * norm ** -0.2, 0.2, 5.0)
+            dt[active] = h[:, 0] * factor
+            self.steps += len(active)
+            if recorded is not None and record in rows:
+                recorded[0].append(self.time[record])
+                recorded[1].append(self.state[record].copy())
+        else:
+            behind = unfinished()
+            if len(behind):
+                slowest = behind[np.argmin(self.time[behind] - end[behind])]
+                raise RuntimeError(
+                    f"{len(behind)} planets unfinished after {max_rounds} rounds; planet {slowest} "
+                    f"reached year {self.time[slowest]:g} of {end[slowest]:g}"
+                )
+        if recorded is None:
+            return None
+        return Trajectory(recorded[0], recorded[1], self.drivers[record])
+
+
+def trajectory(variables, duration=DURATION, tolerance=TOLERANCE, barren=False):
+    """
+    Trajectory of a single planet at one slider setting, for display.
+    """
+    planets = Planets.from_variables({name: [value] for name, value in variables.items()}, barren)
+    return planets.run_adaptive(duration, tolerance, record=0)
+
+
+def parse_assignments(assignments):
+    variables = {}
+    for assignment in assignments:
+        name, _, value = assignment.partition("=")
+        if name not in batch_equations.INPUT_NAMES:
+            raise ValueError(f"Unknown input: {name}")
+        variables[name] = float(value)
+    return variables
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Step the planet dynamics for many planets at once.")
+    parser.add_argument("--planets", type=int, default=10000)
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE",
+                        help="slider value for every planet; unset sliders are random per planet")
+    parser.add_argument("--barren", action="store_true", help="start without plants, oxygen or water")
+    parser.add_argument("--method", choices=METHODS, default="rk4")
+    parser.add_argument("--steps", type=int, default=1000)
+    parser.add_argument("--dt", type=float, default=DT, help="years per fixed step")
+    parser.add_argument("--adaptive", action="store_true", help="adaptive steps over --duration")
+    parser.add_argument("--duration", type=float, default=DURATION, help="years, with --adaptive")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--record", type=int, metavar="INDEX", help="keep this planet's trajectory")
+    parser.add_argument("--out", help="write the recorded trajectory to this .npz file")
+    args = parser.parse_args()
+
+    try:
+        fixed = parse_assignments(args.set)
+    except ValueError as error:
+        parser.error(str(error))
+    if args.record is not None and not 0 <= args.record < args.planets:
+        parser.error(f"--record must be below --planets ({args.planets})")
+    rng = np.random.default_rng(args.seed)
+    variables = {
+        name: fixed.get(name, rng.uniform(*batch_equations.INPUT_RANGES[name], args.planets))
+        for name in batch_equations.INPUT_NAMES
+    }
+    variables = {name: np.broadcast_to(values, args.planets) for name, values in variables.items()}
+    planets = Planets.from_variables(variables, args.barren)
+
+    start = time.perf_counter()
+    if args.adaptive:
+        try:
+            recorded = planets.run_adaptive(args.duration, args.tolerance, args.record)
+        except RuntimeError as error:
+            parser.error(str(error))
+    else:
+        recorded = planets.run(args.steps, args.dt, args.method, args.record)
+    elapsed = time.perf_counter() - start
+    print(f"{planets.steps} planet-steps in {elapsed:.2f} s ({planets.steps / elapsed:,.0f} per second), "
+          f"{planets.time.max():g} years")
+    for name, values in planets.outputs().items():
+        print(f"  {name:<16} mean {values.mean():12.6g}  min {values.min():12.6g}  max {values.max():12.6g}")
+    if recorded is not None:
+        print(f"Planet {args.record}: {len(recorded)} recorded states")
+        if args.out:
+            recorded.save(args.out)
+            print("Saved", args.out)
+
+
+if __name__ == "__main__":
+    main()
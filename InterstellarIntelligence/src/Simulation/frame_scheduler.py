@@ -0,0 +1,111 @@
+import pygame
+
+
+class FrameScheduler:
+    """
+    Decides when the simulation renders and which parts of the window are
+    pushed to the display.
+
+    While the user is interacting the loop runs at ``active_fps``. Once no
+    input has arrived for ``idle_after`` seconds it drops to ``idle_fps`` and
+    sleeps inside ``pygame.event.wait`` so any new input wakes it immediately.
+    """
+
+    def __init__(self, active_fps=30, idle_fps=4, idle_after=2.0, max_dirty_rects=1000):
+        self.active_fps = active_fps
+        self.idle_fps = idle_fps
+        self.idle_after_ms = int(idle_after * 1000)
+
+        self.clock = pygame.time.Clock()
+        self.last_input_ms = pygame.time.get_ticks()
+        self.last_frame_ms = pygame.time.get_ticks()
+        self.dt = 1 / active_fps
+
+        self.dirty_rects = []
+        self.max_dirty_rects = max_dirty_rects
+        self.full_redraw = True
+        self.widget_states = {}
+        self.animation_pending = False
+
+    def is_idle(self):
+        """
+        Idle means no input for a while and no animation asking for full rate.
+        """
+        if self.animation_pending:
+            return False
+        return pygame.time.get_ticks() - self.last_input_ms >= self.idle_after_ms
+
+    def note_input(self):
+        self.last_input_ms = pygame.time.get_ticks()
+
+    def wait_for_events(self):
+        """
+        Sleeps until the next frame is due and returns the events queued
+        meanwhile. In idle mode the sleep is cut short by the first event.
+
+        Returns:
+            list: pygame events for this frame
+        """
+        if self.is_idle():
+            frame_ms = 1000 // self.idle_fps
+            timeout = max(0, frame_ms - (pygame.time.get_ticks() - self.last_frame_ms))
+            first = pygame.event.wait(timeout)
+            events = [] if first.type == pygame.NOEVENT else [first]
+            events.extend(pygame.event.get())
+            self.clock.tick()
+        else:
+            self.clock.tick(self.active_fps)
+            events = pygame.event.get()
+
+        now = pygame.time.get_ticks()
+        self.dt = max(1, now - self.last_frame_ms) / 1000
+        self.last_frame_ms = now
+        self.animation_pending = False
+        return events
+
+    @property
+    def frame_scale(self):
+        """
+        How many 30 FPS frames of animation the elapsed time corresponds to,
+        so motion speed does not depend on the current frame rate.
+        """
+        return self.dt * 30
+
+    def mark_dirty(self, rect):
+        self.dirty_rects.append(pygame.Rect(rect))
+
+    def request_full_redraw(self):
+        self.full_redraw = True
+
+    def track(self, key, state, rect):
+        """
+        Marks a widget dirty when its visible state changed since the last
+        frame. Both the old and the new bounding rect are pushed so that
+        shrinking text is erased.
+
+        Args:
+            key (hashable): identifies the widget
+            state (hashable): whatever determines how the widget looks
+            rect (pygame.Rect): area the widget was drawn into this frame
+        """
+        previous = self.widget_states.get(key)
+        rect = pygame.Rect(rect)
+        if previous is None:
+            self.mark_dirty(rect)
+        elif previous[0] != state or previous[1] != rect:
+            self.mark_dirty(previous[1])
+            self.mark_dirty(rect)
+        self.widget_states[key] = (state, rect)
+
+    def flush(self):
+        """
+        Pushes this frame to the display: everything on a full redraw,
+        otherwise only the dirty rects (nothing at all if none are dirty).
+        Past ``max_dirty_rects`` one full flip is cheaper than the rect list.
+        """
+        if self.full_redraw or len(self.dirty_rects) > self.max_dirty_rects:
+            pygame.display.flip()
+        elif self.dirty_rects:
+            pygame.display.update(self.dirty_rects)
+        self.full_redraw = False
+        self.dirty_rects = []
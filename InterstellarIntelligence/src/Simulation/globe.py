@@ -0,0 +1,78 @@
+"""
+Rotating globe drawn from precomputed tables.
+
+The surface is generated once as an equirectangular texture (see
+noise_field.NoiseGrid.sphere): row ``i`` is a line of latitude from the
+north pole down, column ``j`` a meridian. A lookup table maps every pixel
+of the planet disk to the texel it shows when the globe is at rest. Rotating the globe about its axis only shifts the
+column, so a frame costs one gather per layer and no noise evaluation.
+"""
+
+import numpy as np
+
+import noise_field
+
+TEXTURE_WIDTH = 1024
+TEXTURE_HEIGHT = 512
+
+
+def build_lookup(radius, size, scale, margin, width=TEXTURE_WIDTH, height=TEXTURE_HEIGHT):
+    """
+    Maps the pixels of a square planet frame to texels.
+
+    Frame pixel ``(i, j)`` sits ``j * scale - (margin + radius)`` pixels right
+    of and ``i * scale - (margin + radius)`` pixels below the planet centre.
+
+    Returns:
+        dict: "index" int64 (size, size) flat offsets into a texture laid
+        out by ``Globe``; "disk" bool (size, size) pixels on the planet;
+        "normals" float32 (3, size, size) unit surface normals (x right,
+        y up, z towards the viewer), zero off the disk
+    """
+    pixels = (np.arange(size) * scale - (margin + radius)) / radius
+    nx = np.broadcast_to(pixels[None, :], (size, size))
+    ny = np.broadcast_to(-pixels[:, None], (size, size))
+    disk = nx * nx + ny * ny <= 1
+    nz = np.sqrt(np.maximum(0, 1 - nx * nx - ny * ny))
+
+    lat = np.arcsin(np.clip(ny, -1, 1))
+    lon = np.arctan2(nx, nz)
+    rows, cols = noise_field.grid_index(noise_field.SPHERE_BOUNDS, (height, width), lat, lon)
+    index = np.where(disk, rows * 2 * width + cols, 0)
+
+    normals = np.where(disk, np.stack([nx, ny, nz]), 0).astype(np.float32)
+    return {"index": index, "disk": disk, "normals": normals}
+
+
+def rotation_columns(turns, width=TEXTURE_WIDTH):
+    """
+    Texture columns the globe has turned through after ``turns`` eastward
+    revolutions.
+    """
+    return int(turns * width) % width
+
+
+class Globe:
+    """
+    One texture layer of the globe (terrain classes, cloud cover, ...).
+    """
+
+    def __init__(self, texture):
+        """
+        Args:
+            texture (np.ndarray): (height, width) equirectangular texture
+        """
+        self.height, self.width = texture.shape
+        # Every row is stored twice so rotated lookups never wrap around
+        self.texels = np.concatenate([texture, texture], axis=1).ravel()
+
+    @property
+    def nbytes(self):
+        return self.texels.nbytes
+
+    def sample(self, index, columns, out=None):
+        """
+        Texels under the lookup ``index`` with the globe turned eastwards by
+        ``columns`` (see rotation_columns).
+        """
+        return np.take(self.texels, index + (self.width - columns % self.width), out=out)
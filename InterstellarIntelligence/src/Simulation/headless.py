@@ -0,0 +1,113 @@
+"""
+Headless runner: steps a Simulation and renders the planet without a window
+or frame cap, as fast as the CPU allows.
+
+    python headless.py --frames 300 --set solar_intensity=80 --out frames/
+
+Frames are plain pygame Surfaces (no display needed, SDL runs on the dummy
+driver) or (height, width, 3) uint8 arrays via ``frame_array``.
+"""
+
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import argparse
+import time
+
+import pygame
+
+import planet_renderer
+from simulation import Simulation
+
+BACKGROUND = (0, 0, 0)
+
+
+def get_frame_size(radius=planet_renderer.PLANET_RADIUS):
+    return 2 * (radius + planet_renderer.GLOW_MARGIN)
+
+
+def render_frame(sim, radius=planet_renderer.PLANET_RADIUS, lod=0, surface=None):
+    """
+    Draws the glow and planet of ``sim`` centred on a square surface.
+
+    Args:
+        sim (Simulation): state to draw
+        surface (pygame.Surface): reused when it has the right size
+
+    Returns:
+        pygame.Surface: the frame
+    """
+    size = get_frame_size(radius)
+    if surface is None or surface.get_size() != (size, size):
+        surface = pygame.Surface((size, size))
+    surface.fill(BACKGROUND)
+    planet_renderer.draw_planet(surface, sim, (size // 2, size // 2), radius, lod)
+    return surface
+
+
+def frame_array(surface):
+    """
+    Returns:
+        np.ndarray: (height, width, 3) uint8 copy of the pixels
+    """
+    return pygame.surfarray.array3d(surface).swapaxes(0, 1)
+
+
+def run(sim, frames, dt=1 / 30, radius=planet_renderer.PLANET_RADIUS, lod=0):
+    """
+    Steps the simulation ``dt`` seconds per frame and yields each rendered
+    frame. The same surface is reused, so copy it to keep it.
+    """
+    surface = None
+    for _ in range(frames):
+        sim.update()
+        surface = render_frame(sim, radius, lod, surface)
+        yield surface
+        sim.step(dt)
+
+
+def parse_assignments(assignments):
+    variables = {}
+    for assignment in assignments:
+        name, _, value = assignment.partition("=")
+        variables[name] = float(value)
+    return variables
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render the planet without a window.")
+    parser.add_argument("--frames", type=int, default=120)
+    parser.add_argument("--dt", type=float, default=1 / 30, help="simulated seconds per frame")
+    parser.add_argument("--lod", type=int, default=0, choices=range(len(planet_renderer.LOD_SCALES)))
+    parser.add_argument("--radius", type=int, default=planet_renderer.PLANET_RADIUS)
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE",
+                        help="slider value, e.g. solar_intensity=80")
+    parser.add_argument("--out", help="directory for frame_%%05d.png files")
+    args = parser.parse_args()
+
+    sim = Simulation()
+    for name, value in parse_assignments(args.set).items():
+        if name not in sim.variables:
+            parser.error(f"Unknown variable: {name}")
+        sim.set_variable(name, value)
+    try:
+        sim.update()
+    except ArithmeticError as error:
+        # The baseline equations divide by the cloud density (see batch_equations)
+        parser.error(f"Model failed for {sim.variables}: {error}")
+
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+    planet_renderer.get_globe_layers()  # Keep asset loading out of the timing
+
+    start = time.perf_counter()
+    for i, surface in enumerate(run(sim, args.frames, args.dt, args.radius, args.lod)):
+        if args.out:
+            pygame.image.save(surface, os.path.join(args.out, f"frame_{i:05d}.png"))
+    elapsed = time.perf_counter() - start
+    print(f"Rendered {args.frames} frames in {elapsed:.2f} s ({args.frames / elapsed:.1f} FPS)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,490 @@
+"""
+Interval bounds of the model over boxes of slider settings.
+
+An ``Interval`` holds arrays of lower and upper bounds and implements the
+NumPy ufuncs used by batch_equations (and ``np.where``), like dual.Dual, so
+running batch_equations.calculate_dependent_variables on intervals encloses
+every output over whole boxes of settings at once. Arithmetic results are
+rounded outwards by one ulp, so the enclosures hold despite rounding.
+
+One box is loose (the cosine of a wide cloud density range is anything in
+[-1, 1]), so the analyses split the slider box into sub-boxes and bisect
+the ones that still decide the answer:
+
+``output_bounds`` encloses every output, and every value before its clamp,
+between ranges attained at sample points and guaranteed ones.
+``clamp_report`` flags CLAMPS limits that disagree with those ranges, and
+``variable_ranges`` turns them into the AutoGrader's table of output ranges.
+``feasible_region`` discards the parts of the slider box that cannot meet
+constraints such as "thirst < 1", for sweep and optimizer to skip.
+
+    python interval.py
+    python interval.py --where "thirst < 1 and hunger < 1"
+    python interval.py --variable-ranges
+"""
+
+import argparse
+import math
+from collections import namedtuple
+
+import numpy as np
+
+import asset_cache
+import batch_equations
+
+SPLITS = 8  # Initial sub-boxes per input
+ROUNDS = 40  # Bisections of the sub-boxes deciding an output bound
+REGION_ROUNDS = 12  # Bisections of the sub-boxes a constraint cannot decide
+MAX_BOXES = 65536  # Sub-boxes evaluated per round
+TOLERANCE = 1e-3  # Bounds closer than this to the attained values are done
+CLAMP_TOLERANCE = 0.01  # The CLAMPS constants are given to two decimals
+
+_LOW = np.array([batch_equations.INPUT_RANGES[name][0] for name in batch_equations.INPUT_NAMES])
+_HIGH = np.array([batch_equations.INPUT_RANGES[name][1] for name in batch_equations.INPUT_NAMES])
+_CORNERS = np.array(np.meshgrid(*[[0.0, 1.0]] * len(_LOW), indexing="ij")).reshape(len(_LOW), -1).T
+
+Bounds = namedtuple("Bounds", ["low", "high", "attained_low", "attained_high"])
+ClampCheck = namedtuple("ClampCheck", ["output", "side", "constant", "attained", "bound", "status"])
+
+
+def _outward(low, high):
+    return Interval(np.nextafter(low, -np.inf), np.nextafter(high, np.inf))
+
+
+def _multiply(a, b):
+    products = np.stack([a[0] * b[0], a[0] * b[1], a[1] * b[0], a[1] * b[1]])
+    return _outward(np.fmin.reduce(products), np.fmax.reduce(products))
+
+
+def _divide(a, b):
+    positive = (b[0] > 0) | (b[1] < 0)
+    with np.errstate(divide="ignore"):
+        quotient = _multiply(a, (1 / np.where(positive, b[1], 1), 1 / np.where(positive, b[0], 1)))
+    return Interval(np.where(positive, quotient.low, -np.inf), np.where(positive, quotient.high, np.inf))
+
+
+def _square(a):
+    low = np.where(a[0] > 0, a[0] * a[0], np.where(a[1] < 0, a[1] * a[1], 0))
+    return _outward(low, np.maximum(a[0] * a[0], a[1] * a[1]))
+
+
+def _cos(a):
+    # The range holds 1 if it spans an even multiple of pi, -1 if an odd one
+    first, last = np.ceil(a[0] / np.pi), np.floor(a[1] / np.pi)
+    spans = last - first
+    has_even = (spans >= 1) | ((spans == 0) & (first % 2 == 0))
+    has_odd = (spans >= 1) | ((spans == 0) & (first % 2 == 1))
+    ends = np.cos(a[0]), np.cos(a[1])
+    bounds = _outward(np.where(has_odd, -1, np.minimum(*ends)), np.where(has_even, 1, np.maximum(*ends)))
+    return Interval(np.maximum(bounds.low, -1), np.minimum(bounds.high, 1))
+
+
+def _monotone(function):
+    return lambda a: _outward(function(a[0]), function(a[1]))
+
+
+def _compare(certain, possible):
+    # Truth of a comparison as an interval over {0, 1}
+    return lambda a, b: Interval(certain(a, b).astype(np.float64), possible(a, b).astype(np.float64))
+
+
+# Interval rules: (low, high) of the operands -> Interval
+_RULES = {
+    np.add: lambda a, b: _outward(a[0] + b[0], a[1] + b[1]),
+    np.subtract: lambda a, b: _outward(a[0] - b[1], a[1] - b[0]),
+    np.multiply: _multiply,
+    np.true_divide: _divide,
+    np.negative: lambda a: Interval(-a[1], -a[0]),
+    np.positive: lambda a: Interval(a[0], a[1]),
+    np.square: _square,
+    np.sqrt: lambda a: _outward(np.sqrt(np.maximum(a[0], 0)), np.sqrt(np.maximum(a[1], 0))),
+    np.exp: _monotone(np.exp),
+    np.log: _monotone(np.log),
+    np.cos: _cos,
+    np.maximum: lambda a, b: Interval(np.maximum(a[0], b[0]), np.maximum(a[1], b[1])),
+    np.minimum: lambda a, b: Interval(np.minimum(a[0], b[0]), np.minimum(a[1], b[1])),
+    np.trunc: lambda a: Interval(np.trunc(a[0]), np.trunc(a[1])),
+    np.floor: lambda a: Interval(np.floor(a[0]), np.floor(a[1])),
+    np.ceil: lambda a: Interval(np.ceil(a[0]), np.ceil(a[1])),
+    np.greater: _compare(lambda a, b: a[0] > b[1], lambda a, b: a[1] > b[0]),
+    np.greater_equal: _compare(lambda a, b: a[0] >= b[1], lambda a, b: a[1] >= b[0]),
+    np.less: _compare(lambda a, b: a[1] < b[0], lambda a, b: a[0] < b[1]),
+    np.less_equal: _compare(lambda a, b: a[1] <= b[0], lambda a, b: a[0] <= b[1]),
+}
+
+
+class Interval(np.lib.mixins.NDArrayOperatorsMixin):
+    """
+    Arrays of closed ranges [low, high]. Comparisons give intervals over
+    {0, 1}: [1, 1] always true, [0, 0] never, [0, 1] undecided, and
+    np.where takes the hull of both branches where its condition is
+    undecided.
+    """
+
+    def __init__(self, low, high=None):
+        self.low = np.asarray(low, dtype=np.float64)
+        self.high = self.low if high is None else np.asarray(high, dtype=np.float64)
+
+    @property
+    def shape(self):
+        return np.broadcast_shapes(self.low.shape, self.high.shape)
+
+    def __repr__(self):
+        return f"Interval({self.low!r}, {self.high!r})"
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        if method != "__call__" or kwargs or ufunc not in _RULES:
+            return NotImplemented
+        bounds = [(x.low, x.high) if isinstance(x, Interval) else (np.asarray(x),) * 2 for x in inputs]
+        return _RULES[ufunc](*bounds)
+
+    def __array_function__(self, func, types, args, kwargs):
+        if func is not np.where or kwargs or len(args) != 3:
+            return NotImplemented
+        condition, if_true, if_false = (x if isinstance(x, Interval) else Interval(x) for x in args)
+        always, never = condition.low > 0, condition.high <= 0
+        low = np.where(always, if_true.low, np.where(never, if_false.low, np.minimum(if_true.low, if_false.low)))
+        high = np.where(always, if_true.high, np.where(never, if_false.high, np.maximum(if_true.high, if_false.high)))
+        return Interval(low, high)
+
+
+def split_box(low, high, parts):
+    """
+    Splits each (low, high) box into parts ** inputs equal sub-boxes.
+
+    Args:
+        low, high (np.ndarray): (n, inputs) corners
+
+    Returns:
+        tuple: (low, high) of the (n * parts ** inputs, inputs) sub-boxes
+    """
+    steps = np.arange(parts)
+    offsets = np.array(np.meshgrid(*[steps] * low.shape[1], indexing="ij")).reshape(low.shape[1], -1).T
+    size = (high - low) / parts
+    sub_low = low[:, None] + offsets[None] * size[:, None]
+    sub_high = np.where(offsets + 1 == parts, high[:, None], sub_low + size[:, None])
+    return sub_low.reshape(-1, low.shape[1]), sub_high.reshape(-1, low.shape[1])
+
+
+def evaluate(low, high):
+    """
+    Encloses the model over boxes.
+
+    Returns:
+        tuple: (outputs, unclamped) dicts of Interval, one entry per box
+    """
+    variables = {name: Interval(low[:, i], high[:, i]) for i, name in enumerate(batch_equations.INPUT_NAMES)}
+    unclamped = {}
+    with np.errstate(invalid="ignore"):
+        outputs = batch_equations.calculate_dependent_variables(variables, unclamped=unclamped)
+    return outputs, unclamped
+
+
+def _attained(low, high):
+    # Model values at the corners and centre of every box
+    points = np.concatenate([(low[:, None] + (high - low)[:, None] * _CORNERS[None]).reshape(-1, low.shape[1]),
+                             (low + high) / 2])
+    unclamped = {}
+    outputs = batch_equations.calculate_dependent_variables(dict(zip(batch_equations.INPUT_NAMES, points.T)),
+                                                            unclamped=unclamped)
+    return outputs, unclamped
+
+
+def _quantities(outputs, unclamped):
+    return [outputs[name] for name in batch_equations.OUTPUT_NAMES] + [unclamped[name] for name in batch_equations.CLAMPS]
+
+
+def bisect(low, high, axis):
+    """
+    Halves each box along its entry of ``axis``.
+
+    Returns:
+        tuple: (low, high) of the 2n halves, both halves of box i at 2i
+        and 2i + 1
+    """
+    rows = np.arange(len(low))
+    middle = (low[rows, axis] + high[rows, axis]) / 2
+    halves_low, halves_high = np.repeat(low, 2, axis=0), np.repeat(high, 2, axis=0)
+    halves_high[2 * rows, axis] = middle
+    halves_low[2 * rows + 1, axis] = middle
+    return halves_low, halves_high
+
+
+def _enclose(low, high):
+    enclosures = _quantities(*evaluate(low, high))
+    return (np.stack([np.broadcast_to(q.low, len(low)) for q in enclosures]),
+            np.stack([np.broadcast_to(q.high, len(low)) for q in enclosures]))
+
+
+def compute_bounds(splits=SPLITS, rounds=ROUNDS, max_boxes=MAX_BOXES):
+    """
+    Branch and bound over the slider box for the range of every output and
+    of every value before its clamp. A sub-box is bisected while one of its
+    enclosures reaches more than TOLERANCE beyond the values attained so
+    far, along whichever input narrows its enclosures most.
+
+    Returns:
+        dict: "low", "high", "attained_low", "attained_high" arrays over
+        OUTPUT_NAMES followed by the CLAMPS names (unclamped values)
+    """
+    low, high = split_box(_LOW[None], _HIGH[None], splits)
+    inputs = low.shape[1]
+    count = len(batch_equations.OUTPUT_NAMES) + len(batch_equations.CLAMPS)
+    settled_low, settled_high = np.full(count, np.inf), np.full(count, -np.inf)
+    attained_low, attained_high = np.full(count, np.inf), np.full(count, -np.inf)
+
+    def overshoot(box_low, box_high):
+        # How far boxes reach past the attained range, per quantity
+        return np.maximum(np.maximum(attained_low[:, None] - box_low, box_high - attained_high[:, None]), 0)
+
+    for round_ in range(rounds + 1):
+        box_low, box_high = _enclose(low, high)
+        values = np.stack([np.broadcast_to(q, len(low) * (len(_CORNERS) + 1)) for q in _quantities(*_attained(low, high))])
+        attained_low = np.minimum(attained_low, values.min(axis=1))
+        attained_high = np.maximum(attained_high, values.max(axis=1))
+        scale = np.maximum(attained_high - attained_low, 1)[:, None]
+
+        excess = overshoot(box_low, box_high)
+        deciding = np.any(excess > TOLERANCE, axis=0) & (round_ < rounds)
+        # Quantities differ in scale by orders of magnitude, so boxes are
+        # ranked by their overshoot relative to the attained range
+        rank = (excess / scale).max(axis=0)
+        if deciding.sum() * 2 * inputs > max_boxes:
+            keep = np.argsort(rank)[::-1][:max_boxes // (2 * inputs)]
+            deciding[:] = False
+            deciding[keep] = True
+        settled_low = np.minimum(settled_low, box_low[:, ~deciding].min(axis=1, initial=np.inf))
+        settled_high = np.maximum(settled_high, box_high[:, ~deciding].max(axis=1, initial=-np.inf))
+        if not deciding.any():
+            break
+
+        # Try halving every box along each input and keep the halves that
+        # overshoot least, the widest input breaking ties
+        low, high = low[deciding], high[deciding]
+        scores = np.empty((len(low), inputs))
+        for axis in range(inputs):
+            halves_low, halves_high = bisect(low, high, np.full(len(low), axis))
+            half_rank = (overshoot(*_enclose(halves_low, halves_high)) / scale).max(axis=0)
+            scores[:, axis] = half_rank.reshape(-1, 2).sum(axis=1)
+        best = np.lexsort((low - high, scores), axis=-1)[:, 0]
+        low, high = bisect(low, high, best)
+
+    return {"low": settled_low, "high": settled_high, "attained_low": attained_low, "attained_high": attained_high}
+
+
+def output_bounds(splits=SPLITS, rounds=ROUNDS, max_boxes=MAX_BOXES):
+    """
+    Reachable ranges of the model over the slider box, cached per model
+    source in the asset cache.
+
+    Returns:
+        tuple: (outputs, unclamped) dicts of Bounds; ``low`` / ``high``
+        enclose every reachable value, ``attained_low`` / ``attained_high``
+        are reached at sample points, so the true extremes lie between
+    """
+    arrays = asset_cache.load_or_build(
+        "interval_bounds",
+        {"model": batch_equations.model_digest(), "splits": splits, "rounds": rounds, "max_boxes": max_boxes,
+         "tolerance": TOLERANCE},
+        lambda: compute_bounds(splits, rounds, max_boxes),
+    )
+    names = batch_equations.OUTPUT_NAMES + list(batch_equations.CLAMPS)
+    bounds = [Bounds(*(float(arrays[field][i]) for field in Bounds._fields)) for i in range(len(names))]
+    outputs = dict(zip(names[:len(batch_equations.OUTPUT_NAMES)], bounds))
+    unclamped = dict(zip(names[len(batch_equations.OUTPUT_NAMES):], bounds[len(batch_equations.OUTPUT_NAMES):]))
+    return outputs, unclamped
+
+
+def clamp_report(unclamped=None):
+    """
+    Compares every CLAMPS limit with the range of the value it clamps.
+
+    Statuses: "tight" (the limit is the reachable extreme), "unreachable"
+    (no reachable value gets to the limit, so it never applies), "cuts"
+    (reachable values beyond the limit are clamped) and "unresolved" (the
+    enclosure is too loose to tell).
+
+    Returns:
+        list: ClampCheck entries, with ``attained`` and ``bound`` the
+        attained and guaranteed extreme on the limit's side
+    """
+    if unclamped is None:
+        unclamped = output_bounds()[1]
+    checks = []
+    for name, (low, high) in batch_equations.CLAMPS.items():
+        bounds = unclamped[name]
+        for side, constant, attained, bound, sign in (("low", low, bounds.attained_low, bounds.low, -1),
+                                                      ("high", high, bounds.attained_high, bounds.high, 1)):
+            # Signed distances outwards from the limit
+            reached, enclosed = sign * (attained - constant), sign * (bound - constant)
+            if enclosed < -CLAMP_TOLERANCE:
+                status = "unreachable"
+            elif reached > CLAMP_TOLERANCE:
+                status = "cuts"
+            elif reached >= -CLAMP_TOLERANCE and enclosed <= CLAMP_TOLERANCE:
+                status = "tight"
+            else:
+                status = "unresolved"
+            checks.append(ClampCheck(name, side, float(constant), attained, bound, status))
+    return checks
+
+
+def _constraint_state(enclosure, op, value):
+    # (always met, never met) over each box
+    if op in ("<", "<="):
+        compare = np.less if op == "<" else np.less_equal
+        return compare(enclosure.high, value), ~compare(enclosure.low, value)
+    if op in (">", ">="):
+        compare = np.greater if op == ">" else np.greater_equal
+        return compare(enclosure.low, value), ~compare(enclosure.high, value)
+    if op == "==":
+        return (enclosure.low == value) & (enclosure.high == value), (value < enclosure.low) | (value > enclosure.high)
+    raise ValueError(f"Unknown operator: {op}")
+
+
+def variable_ranges(outputs=None):
+    """
+    Range of every clamped output over the slider box, as the AutoGrader's
+    ``variable_ranges`` in calculation.py and actual_solution.py: the
+    enclosure rounded outwards to two decimals, within the clamp limits.
+
+    Returns:
+        dict: AutoGrader name ("health_risk") -> (low, high)
+    """
+    if outputs is None:
+        outputs = output_bounds()[0]
+    ranges = {}
+    for name, (low, high) in batch_equations.CLAMPS.items():
+        key = name.split(" (")[0].lower().replace(" ", "_")
+        # Rounded first so float noise past the last digit is not rounded out
+        ranges[key] = (max(low, math.floor(round(outputs[name].low * 100, 6)) / 100),
+                       min(high, math.ceil(round(outputs[name].high * 100, 6)) / 100))
+    return ranges
+
+
+def format_variable_ranges(ranges):
+    lines = [f'    "{key}": ({float(low)!r}, {float(high)!r}),' for key, (low, high) in ranges.items()]
+    return "variable_ranges = {\n" + "\n".join(lines) + "\n}"
+
+
+class Region:
+    """
+    Union of boxes of slider settings, (n, inputs) ``low`` / ``high``
+    corners in INPUT_NAMES order. Points outside every box cannot meet the
+    constraints the region was built for; every point of a box marked
+    ``certain`` meets them.
+    """
+
+    def __init__(self, low, high, certain):
+        self.low = low
+        self.high = high
+        self.certain = certain
+
+    def __len__(self):
+        return len(self.low)
+
+    def volume_fraction(self):
+        """
+        Share of the slider box the region covers.
+        """
+        return float(np.prod((self.high - self.low) / (_HIGH - _LOW), axis=1).sum())
+
+    def intersects(self, low, high):
+        """
+        Whether the box [low, high] overlaps the region.
+        """
+        return bool(np.any(np.all((self.low <= high) & (self.high >= low), axis=1)))
+
+    def sample(self, count, rng):
+        """
+        Uniform random settings within the region.
+
+        Returns:
+            np.ndarray: (count, inputs) array
+        """
+        volumes = np.prod(self.high - self.low, axis=1)
+        weights = volumes / volumes.sum() if volumes.sum() > 0 else None
+        boxes = rng.choice(len(self.low), count, p=weights)
+        return rng.uniform(self.low[boxes], self.high[boxes])
+
+
+def feasible_region(constraints, splits=SPLITS, rounds=REGION_ROUNDS, max_boxes=MAX_BOXES):
+    """
+    Drops the sub-boxes of the slider box that cannot meet every
+    constraint, halving undecided ones along their widest input for
+    ``rounds`` rounds.
+
+    Args:
+        constraints (list): (output, op, value) tuples with op one of
+            "<", "<=", ">", ">=", "=="
+
+    Returns:
+        Region
+    """
+    low, high = split_box(_LOW[None], _HIGH[None], splits)
+    kept_low, kept_high, kept_certain = [], [], []
+    for round_ in range(rounds + 1):
+        outputs, _ = evaluate(low, high)
+        always = np.ones(len(low), dtype=bool)
+        never = np.zeros(len(low), dtype=bool)
+        for output, op, value in constraints:
+            met, failed = _constraint_state(outputs[output], op, value)
+            always &= met
+            never |= failed
+        undecided = ~always & ~never
+        if round_ == rounds or 2 * undecided.sum() > max_boxes:
+            undecided[:] = False
+        # Undecided boxes are kept whole once they are no longer halved
+        kept = always if undecided.any() else ~never
+        kept_low.append(low[kept])
+        kept_high.append(high[kept])
+        kept_certain.append(always[kept])
+        if not undecided.any():
+            break
+        low, high = bisect(low[undecided], high[undecided], np.argmax(high[undecided] - low[undecided], axis=1))
+    return Region(np.concatenate(kept_low), np.concatenate(kept_high), np.concatenate(kept_certain))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Interval bounds of the model over the slider ranges.")
+    parser.add_argument("--where", help='constraints, e.g. "thirst < 1 and hunger < 1"')
+    parser.add_argument("--rounds", type=int, default=ROUNDS, help="bisection rounds")
+    parser.add_argument("--variable-ranges", action="store_true",
+                        help="print the AutoGrader's variable_ranges table")
+    args = parser.parse_args()
+
+    if args.variable_ranges:
+        print(format_variable_ranges(variable_ranges(output_bounds(rounds=args.rounds)[0])))
+        return
+
+    if args.where:
+        # range_index imports sweep, which imports this module
+        import range_index
+
+        try:
+            constraints = range_index.parse_constraints(args.where)
+        except ValueError as error:
+            parser.error(str(error))
+        region = feasible_region(constraints, rounds=args.rounds)
+        print(f"{len(region)} boxes ({int(region.certain.sum())} certain) cover "
+              f"{100 * region.volume_fraction():.3f}% of the slider box")
+        if len(region):
+            for i, name in enumerate(batch_equations.INPUT_NAMES):
+                print(f"  {name:<16} {region.low[:, i].min():8.3f} .. {region.high[:, i].max():8.3f}")
+        return
+
+    outputs, unclamped = output_bounds(rounds=args.rounds)
+    print(f"{'':<22}{'enclosure':>31}{'attained':>31}")
+    for name, bounds in outputs.items():
+        print(f"{name:<22}{bounds.low:>15.6g}{bounds.high:>16.6g}{bounds.attained_low:>15.6g}{bounds.attained_high:>16.6g}")
+    print()
+    verdicts = {"unreachable": "is never reached", "cuts": "cuts off reachable values",
+                "unresolved": "could not be checked"}
+    for check in clamp_report(unclamped):
+        if check.status != "tight":
+            print(f"{check.output} {check.side} clamp {check.constant:g} {verdicts[check.status]}: values "
+                  f"before it reach {check.attained:.6g} (bound {check.bound:.6g})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Diffuse day/night lighting of the planet disk.
+
+Lighting works on a cached field of unit surface normals (x right, y up,
+z towards the viewer, zero off the disk) such as the one stored by
+globe.build_lookup. A new sun direction only costs a dot product and a few
+element-wise operations over that field.
+"""
+
+import numpy as np
+
+AMBIENT = 0.08  # Brightness of the night side
+TERMINATOR_WIDTH = 0.2  # Half width of the twilight band, in units of cos(angle to the sun)
+CITY_COLOR = np.array([255, 200, 120], dtype=np.float32)
+
+
+def sun_direction(solar_intensity):
+    """
+    Unit vector towards the sun. At full intensity the sun is behind the
+    viewer and the whole disk is lit; as the intensity drops it swings round
+    to the left until most of the visible side is night.
+
+    Args:
+        solar_intensity (float): slider value, 0 to 100
+
+    Returns:
+        np.ndarray: float32 vector of shape (3,)
+    """
+    angle = np.radians(120 * (1 - min(max(solar_intensity, 0), 100) / 100))
+    direction = np.array([-np.sin(angle), 0.3, np.cos(angle)])
+    return (direction / np.linalg.norm(direction)).astype(np.float32)
+
+
+def smoothstep(edge0, edge1, x):
+    t = np.clip((x - edge0) / (edge1 - edge0), 0, 1)
+    return t * t * (3 - 2 * t)
+
+
+def light_field(normals, direction):
+    """
+    Lambertian lighting with a soft terminator.
+
+    Args:
+        normals (np.ndarray): (3, ...) unit normals
+        direction (np.ndarray): (3,) unit vector towards the sun
+
+    Returns:
+        tuple: (shade, night) float32 arrays shaped like one normal
+        component. ``shade`` multiplies the surface colour, ``night`` is
+        the 0 to 1 weight of emissive night-side lights.
+    """
+    cosine = np.tensordot(np.asarray(direction, dtype=np.float32), normals, axes=1).astype(np.float32)
+    day = smoothstep(-TERMINATOR_WIDTH, TERMINATOR_WIDTH, cosine)
+    # Wrapped diffuse term so light fades into the twilight band instead of
+    # stopping dead at the geometric terminator
+    diffuse = np.clip((cosine + TERMINATOR_WIDTH) / (1 + TERMINATOR_WIDTH), 0, 1)
+    shade = AMBIENT + (1 - AMBIENT) * diffuse * day
+    return shade.astype(np.float32), (1 - day).astype(np.float32)
+
+
+def city_light_rgb(cities, night, population):
+    """
+    Additive colour of city lights.
+
+    Args:
+        cities (np.ndarray): 0 to 1 city density per pixel
+        night (np.ndarray): night weight from light_field
+        population (float): slider value, 0 to 100
+
+    Returns:
+        np.ndarray: float32 array of shape cities.shape + (3,)
+    """
+    strength = np.float32(min(max(population, 0), 100) / 100)
+    return (cities * night * strength)[..., None] * CITY_COLOR
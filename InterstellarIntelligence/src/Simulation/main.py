@@ -1,57 +1,46 @@
-import math
-import random
-import pygame
 import os
-import pickle
-from opensimplex import OpenSimplex
-from functools import lru_cache
-import equations 
-
-pygame.init()
-simplex = OpenSimplex(seed=42)
+import numpy as np
+import pygame
+import dynamics
+import pareto
+import planet_renderer
+import scenario_store
+import uncertainty
+from frame_scheduler import FrameScheduler
+from profiler import FrameProfiler
+from starfield import StarField
+from render_worker import RenderWorker
+from simulation import Simulation, DEFAULT_VARIABLES
+
+# Windowed front-end. The model lives in simulation.py and the planet
+# renderer in planet_renderer.py; nothing here runs until main() is called.
 
 SCREEN_WIDTH, SCREEN_HEIGHT = 1200, 600 
 screenheight = 700
-screen = pygame.display.set_mode((SCREEN_WIDTH, screenheight))
-pygame.display.set_caption("Planet Habitability Simulation")
-clock = pygame.time.Clock()
-
-terrain_cache = {}
-planet_radius = min(SCREEN_WIDTH, SCREEN_HEIGHT) // 3
+center_x, center_y = SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2
 
 WHITE = (255, 255, 255)
 GREEN = (34, 139, 34)
-BLUE = (0, 0, 255)
 GRAY = (100, 100, 100)
 BLACK = (0, 0, 0)
-RED = (255, 0, 0)
-SANDY = (205, 133, 63)
-BLUE1 = (70, 130, 180)  # Water
-LIGHT_GREEN = (144, 238, 144)  # Sparse plants
-BROWN = (139, 69, 19)  # Dry areas
-
-font = pygame.font.Font(None, 30)
-
-# Independent variables (sliders)
-default_variables = {
-    "solar_intensity": 0,  
-    "humidity": 50,     
-    "wind_speed": 10,   
-    "population": 1000  
-}
-
-# Load saved variables if the file exists
-SAVE_FILE = "saved_variables.pkl"
-if os.path.exists(SAVE_FILE):
-    with open(SAVE_FILE, "rb") as file:
-        variables = pickle.load(file)
-        print("Variables saved:", variables)
-else:
-    variables = default_variables.copy()  
+
+default_variables = DEFAULT_VARIABLES
+
+# The Save button writes this preset of the scenario store and it is
+# loaded on start if it exists; SIM_PRESET picks another one.
+SAVE_PRESET = os.environ.get("SIM_PRESET", scenario_store.DEFAULT_PRESET)
+
+def load_variables():
+    if store.versions(SAVE_PRESET):
+        variables = store.load(SAVE_PRESET)
+        print("Variables loaded:", variables)
+        return variables
+    return default_variables.copy()
+
 def save_variables():
-    with open(SAVE_FILE, "wb") as file:
-        pickle.dump(variables, file)
-    print("Variables saved:", variables)
+    # Queued for the store's writer thread; the frame loop does not wait
+    store.save_preset(SAVE_PRESET, sim.variables)
+    print("Variables saved:", sim.variables)
 
 independent_sliders = [
     {"x": 50, "y": 150, "width": 300, "var": "solar_intensity", "label": "Solar Intensity (W/m²)"},
@@ -67,158 +56,58 @@ def draw_slider(x, y, width, value, label):
     handle_x = x + int((value / 100) * width)
     pygame.draw.circle(screen, (224, 180, 74), (handle_x, y + 5), 8)  # Slider knob
     text = font.render(f"{label}: {value:.2f}", True, WHITE)
-    screen.blit(text, (x, y - 25))
-
-center_x, center_y = SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2
-previous_terrain = {}
-
-solar_intensity = variables["solar_intensity"]#dependent_variables.get("solar_intensity") / 100
-@lru_cache(maxsize=None)
-
-def get_terrain_color(noise_value, rainfall, plant_density):
-    # Adjust plant density effect
-    if plant_density < 50:
-        plant_factor = plant_density / 50  # Gradually fades to brown
-    elif plant_density > 500:
-        plant_factor = max(0, (200 - plant_density) / 100)#max(0, 1 - (plant_density - 100) / 100)  # Gradually turns brown again
-    else:
-        plant_factor = 1  # Most green in 50-100 range
-
-    # Adjust rainfall effect
-    if rainfall < 80000:
-        rain_factor = 0  # No blue for very low rainfall
-    elif rainfall > 90000:
-        rain_factor = max(0, 1 - (rainfall - 90000) / 10000)  # Gradually fades out above 90000
-    else:
-        rain_factor = (rainfall - 80000) / (90000 - 80000)  # Most blue in 80000-90000 range
-
-    if noise_value < -0.1:
-        transition = plant_factor  # Use adjusted plant density
-        r = int(BROWN[0] * (1 - transition) + GREEN[0] * transition)
-        g = int(BROWN[1] * (1 - transition) + GREEN[1] * transition)
-        b = int(BROWN[2] * (1 - transition) + GREEN[2] * transition)
-    elif noise_value < 0:
-        transition = rain_factor  # Use adjusted rainfall
-        r = int(SANDY[0] * (1 - transition) + LIGHT_GREEN[0] * transition)
-        g = int(SANDY[1] * (1 - transition) + LIGHT_GREEN[1] * transition)
-        b = int(SANDY[2] * (1 - transition) + LIGHT_GREEN[2] * transition)
-    else:
-        transition = rain_factor  # Use adjusted rainfall
-        r = int(BROWN[0] * (1 - transition) + BLUE1[0] * transition)
-        g = int(BROWN[1] * (1 - transition) + BLUE1[1] * transition)
-        b = int(BROWN[2] * (1 - transition) + BLUE1[2] * transition)
-
-    return (max(0, min(255, r)), max(0, min(255, g)), max(0, min(255, b)))
-
-noise_map = {}
-
-def get_noise_value(x, y):
-    if (x, y) in noise_map:
-        return noise_map[(x, y)]
-    
-    noise_value = simplex.noise2(x / 50, y / 50) + 0.5 * simplex.noise2(x / 30, y / 30) + 0.25 * simplex.noise2(x / 10, y / 10)
-    
-    noise_map[(x, y)] = noise_value
-    return noise_value
-
-
-CLOUD_COLOR = (255, 255, 255, 60) 
-cloud_noise_offset = 0  
-
-def draw_clouds(radius, cloud_density):
-    global cloud_noise_offset
-    cloud_surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-
-    adjusted_radius = min(radius, planet_radius)  
-    if cloud_density < 100:
-        cloud_opacity = 5
-    elif cloud_density < 150:
-        cloud_opacity = 50
-    elif cloud_density < 200:
-        cloud_opacity = 60
-    elif cloud_density < 400:
-        cloud_opacity = 70
-    elif cloud_density < 1000:
-        cloud_opacity = 90
-    elif cloud_density < 2000:
-        cloud_opacity = 120
-    elif cloud_density < 3000:
-        cloud_opacity = 140
-    elif cloud_density < 6000:
-        cloud_opacity = 160
-    else:
-        cloud_opacity = 170 # Best whiteness at 600+
-
-    cloud_color = (255, 255, 255, cloud_opacity)  
-
-    for y in range(int(center_y - adjusted_radius), int(center_y + adjusted_radius), 5):
-        for x in range(int(center_x - adjusted_radius), int(center_x + adjusted_radius), 5):
-            distance = math.sqrt((x - center_x) ** 2 + (y - center_y) ** 2)
-            if distance <= adjusted_radius:
-                noise_value = simplex.noise2((x + cloud_noise_offset) / 80, (y + cloud_noise_offset) / 80)
-                if noise_value > 0.2:  
-                    pygame.draw.circle(cloud_surface, cloud_color, (x, y), 5)
-
-    screen.blit(cloud_surface, (0, 0))
-    cloud_noise_offset += variables["wind_speed"] * 0.2  # Wind effect
-
-def draw_shading_overlay(radius, solar_intensity):
-    if solar_intensity < 20:
-        darkness = 180  # Very light shading
-    elif 20 <= solar_intensity < 40:
-        darkness = 100  # Light shading
-    elif 40 <= solar_intensity < 60:
-        darkness = 70  # Moderate shading
-    elif 60 <= solar_intensity < 80:
-        darkness = 60  # Darker shading
-    else:
-        darkness = 30  # Very dark shading
-
-    shading_surface = pygame.Surface((2 * radius, 2 * radius), pygame.SRCALPHA)
-    pygame.draw.circle(shading_surface, (0, 0, 0, darkness), (radius, radius), radius)
-
-    screen.blit(shading_surface, (center_x - radius, center_y - radius))
-
-def draw_planet(radius, rainfall, plant_density, asi, cloud_density):
-    center_x, center_y = SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2
-    max_glow_alpha = min(255, 100 + int(asi * 1.55))
-
-    if asi < 5000:
-        glow_r = min(255, 200 + int(asi * 0.2))  
-        glow_g = min(255, 200 + int(asi * 0.2))
-        glow_b = min(255, 220 + int(asi * 0.25))
-        layer_spacing = 15  # Fewer layers
-    elif 6000 <= asi <= 9000:
-        glow_r = min(255, 240 + int(asi * 0.3))  
-        glow_g = min(255, 240 + int(asi * 0.3))
-        glow_b = min(255, 240 + int(asi * 0.3))
-        layer_spacing = 10  
-    else:
-        glow_r = min(255, 250 + int(asi * 0.2))  
-        glow_g = min(255, 250 + int(asi * 0.2))
-        glow_b = min(255, 255)
-        layer_spacing = 17 
-
-    for i in range(radius + 5, radius + 30, layer_spacing):  
-        alpha = max(0, max_glow_alpha - (i - radius) * 5)  # Fade effect
-        glow_color = (glow_r, glow_g, glow_b, alpha)
-        glow_surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-        pygame.draw.circle(glow_surface, glow_color, (center_x, center_y), i)
-        screen.blit(glow_surface, (0, 0))
-
-    for y in range(center_y - radius, center_y + radius, 3):
-        for x in range(center_x - radius, center_x + radius, 3):
-            distance = math.sqrt((x - center_x) ** 2 + (y - center_y) ** 2)
-            if distance <= radius:
-                noise_value = get_noise_value(x, y)  
-                color = get_terrain_color(noise_value, rainfall, plant_density)
-                pygame.draw.rect(screen, color, (x, y, 3, 3))
-
-    draw_shading_overlay(radius, variables["solar_intensity"])
-    draw_clouds(radius, cloud_density)
-
-
-def draw_dependent_variables(dependent_variables):
+    text_rect = screen.blit(text, (x, y - 25))
+    return text_rect.union(pygame.Rect(x - 8, y - 3, width + 17, 17))
+
+# Level of detail used while a slider is dragged
+FRAME_BUDGET_MS = 1000 / 30
+SETTLE_MS = 250
+lod_render_ms = {}
+
+def select_lod(interacting):
+    """
+    Full detail once the sliders are at rest; while interacting, the finest
+    reduced level whose last render fitted in the frame budget.
+    """
+    if not interacting:
+        return 0
+    for lod in range(1, len(planet_renderer.LOD_SCALES)):
+        if lod_render_ms.get(lod, 0) <= FRAME_BUDGET_MS:
+            return lod
+    return len(planet_renderer.LOD_SCALES) - 1
+
+def update_lod_timing(lod, render_ms):
+    previous = lod_render_ms.get(lod)
+    lod_render_ms[lod] = render_ms if previous is None else 0.7 * previous + 0.3 * render_ms
+
+planet_frame = None
+planet_frame_params = None
+
+def draw_planet(radius, lod=0):
+    global planet_frame, planet_frame_params
+
+    # Terrain, shading and clouds come from the render worker; until it
+    # finishes a newer frame the last completed one is shown.
+    with profiler.stage("swap"):
+        planet_worker.submit(planet_renderer.get_planet_params(sim, radius, lod))
+        result = planet_worker.take(planet_renderer.frame_to_surface)
+        if result is not None:
+            planet_frame_params, planet_frame, render_ms = result
+            frame_lod = planet_frame_params[-1]
+            update_lod_timing(frame_lod, render_ms)
+            planet_frame = planet_renderer.scale_planet_surface(planet_frame, radius, frame_lod)
+
+    with profiler.stage("planet"):
+        glow_key = planet_renderer.get_glow_key(radius, sim.asi)
+        if planet_frame is not None:
+            rect = planet_renderer.draw_planet(screen, sim, (center_x, center_y), radius, lod, planet_frame)
+            scheduler.track("planet", (glow_key, planet_frame_params), rect)
+
+    with profiler.stage("simulation"):
+        sim.step(scheduler.dt)
+
+
+def draw_dependent_variables(dependent_variables, intervals=None):
     y_offset = 80
     bar_width = 250
     x_offset = SCREEN_WIDTH - 350
@@ -227,22 +116,30 @@ def draw_dependent_variables(dependent_variables):
     for key, value in dependent_variables.items():
         if y_offset + vertical_spacing > screenheight - 50:
             break
-        draw_horizontal_bar(x_offset, y_offset, bar_width, value, key)
+        interval = intervals.get(key) if intervals else None
+        rect = draw_horizontal_bar(x_offset, y_offset, bar_width, value, key, interval)
+        scheduler.track(("bar", key), (value, interval), rect)
         y_offset += vertical_spacing
 
 
-def draw_horizontal_bar(x, y, width, value, label):
+def draw_horizontal_bar(x, y, width, value, label, interval=None):
     bar_height = 5
     bar_value = int(min(width, max(0, (value / 100) * width)))
     pygame.draw.rect(screen, GRAY, (x, y, width, bar_height), border_radius=3)
     pygame.draw.rect(screen, (224, 180, 74), (x, y, bar_value, bar_height), border_radius=3)
     text = font.render(f"{label}: {value:.2f}", True, WHITE)
-    screen.blit(text, (x, y - 20))
-
+    text_rect = screen.blit(text, (x, y - 20))
+    rect = text_rect.union(pygame.Rect(x, y, width, bar_height))
+    if interval is not None:
+        # Error bar under the bar, on the same scale
+        low, high = (x + int(min(width, max(0, (bound / 100) * width))) for bound in interval)
+        error_y = y + bar_height + 3
+        pygame.draw.line(screen, (220, 60, 60), (low, error_y), (high, error_y), 2)
+        for end in (low, high):
+            pygame.draw.line(screen, (220, 60, 60), (end, error_y - 2), (end, error_y + 2))
+        rect = rect.union(pygame.Rect(x, error_y - 2, width + 1, 5))
+    return rect
 
-def reset_variables():
-    global variables
-    variables = default_variables.copy()
 
 def draw_button(x, y, width, height, text, color, hover_color, is_hovering):
     button_color = hover_color if is_hovering else color
@@ -251,72 +148,310 @@ def draw_button(x, y, width, height, text, color, hover_color, is_hovering):
     text_x = x + (width - text_surface.get_width()) // 2
     text_y = y + (height - text_surface.get_height()) // 2
     screen.blit(text_surface, (text_x, text_y))
-
-num_stars = 120
-stars = [(random.randint(0, SCREEN_WIDTH), random.randint(0, screenheight), random.uniform(0.5, 2), random.randint(1, 3)) for _ in range(num_stars)]
+    return pygame.Rect(x, y, width, height)
+
+# Pareto front overlay, toggled with P. SIM_PARETO_FRONT may name a front
+# saved by pareto.py; otherwise the default one is computed on first use,
+# on a worker thread so the window stays responsive meanwhile.
+PARETO_PANEL = pygame.Rect(50, 560, 300, 125)
+PARETO_PLOT = pygame.Rect(10, 26, 280, 90)  # Inside the panel
+PARETO_SAMPLES = 200_000
+pareto_visible = False
+pareto_front = None
+pareto_background = None
+
+def load_pareto_front(_params, _out):
+    # RenderWorker render callback; the front depends on neither argument
+    path = os.environ.get("SIM_PARETO_FRONT")
+    if path:
+        return pareto.Front.load(path)
+    return pareto.Front.compute(samples=PARETO_SAMPLES)
+
+def pareto_point(values):
+    """
+    Panel coordinates of the first two objective values; maximized
+    objectives grow right and up, minimized ones left and down, so the
+    front always bulges towards the top right.
+    """
+    values = np.asarray(values[:2], dtype=float)
+    low = pareto_front.values[:, :2].min(axis=0)
+    span = np.ptp(pareto_front.values[:, :2], axis=0)
+    fraction = np.clip((values - low) / np.where(span > 0, span, 1), 0, 1)
+    fraction = [f if sense == "max" else 1 - f for f, (_, sense) in zip(fraction, pareto_front.objectives)]
+    return (int(PARETO_PLOT.x + fraction[0] * PARETO_PLOT.width),
+            int(PARETO_PLOT.bottom - fraction[1] * PARETO_PLOT.height))
+
+def render_pareto_background():
+    surface = pygame.Surface(PARETO_PANEL.size)
+    surface.fill((20, 20, 30))
+    pygame.draw.rect(surface, GRAY, surface.get_rect(), 1)
+    names = " vs ".join(name for name, _ in pareto_front.objectives[:2])
+    surface.blit(hud_font.render(f"Pareto front: {names}", True, WHITE), (8, 6))
+    points = [pareto_point(values) for values in pareto_front.values]
+    if len(points) > 1:
+        pygame.draw.lines(surface, (224, 180, 74), False, points)
+    for point in points:
+        pygame.draw.circle(surface, WHITE, point, 1)
+    return surface
+
+def draw_pareto_overlay(dependent_variables):
+    global pareto_front, pareto_background
+    if not pareto_visible:
+        scheduler.track("pareto", None, PARETO_PANEL)
+        return
+    if pareto_front is None:
+        result = pareto_worker.take(lambda front: front)
+        if result is None:
+            error = pareto_worker.error("front")
+            lines = ["Pareto front failed, P to retry:", str(error)[:42]] if error else ["Computing Pareto front..."]
+            pygame.draw.rect(screen, (20, 20, 30), PARETO_PANEL)
+            pygame.draw.rect(screen, GRAY, PARETO_PANEL, 1)
+            for i, line in enumerate(lines):
+                screen.blit(hud_font.render(line, True, WHITE), (PARETO_PANEL.x + 8, PARETO_PANEL.y + 6 + 18 * i))
+            scheduler.track("pareto", tuple(lines), PARETO_PANEL)
+            return
+        pareto_front = result[1]
+    if pareto_background is None:
+        pareto_background = render_pareto_background()
+    screen.blit(pareto_background, PARETO_PANEL)
+    # The current settings, off the front unless they are Pareto-optimal
+    current = [dependent_variables[name] for name, _ in pareto_front.objectives]
+    x, y = pareto_point(current)
+    marker = (PARETO_PANEL.x + x, PARETO_PANEL.y + y)
+    pygame.draw.circle(screen, (220, 60, 60), marker, 4)
+    scheduler.track("pareto", marker, PARETO_PANEL)
+
+# Error bars, toggled with U: the 5-95% range of each output with humidity
+# and wind speed uncertain around their sliders. Computed on a worker thread
+# for each state the sliders settle at; hidden while a trajectory plays.
+UNCERTAINTY_SPREADS = {"humidity": 5.0, "wind_speed": 2.0}  # Standard deviations
+UNCERTAINTY_SAMPLES = 4096
+UNCERTAINTY_CHUNK = 1024
+uncertainty_visible = False
+output_intervals = None  # (slider items, output name -> (low, high)), the newest computed
+
+def compute_output_intervals(items, _out):
+    # RenderWorker render callback; ``items`` are the slider (name, value) pairs
+    distributions = uncertainty.around(dict(items), UNCERTAINTY_SPREADS)
+    summaries = uncertainty.propagate(distributions, UNCERTAINTY_SAMPLES, (0.05, 0.95), (), UNCERTAINTY_CHUNK)
+    return {name: (summary.quantiles[0.05], summary.quantiles[0.95]) for name, summary in summaries.items()}
+
+# Dynamics panel, toggled with T: plays one planet's trajectory on the
+# globe and plots its states. SIM_TRAJECTORY may name one saved by
+# dynamics.py; otherwise the current sliders are run from barren ground.
+TRAJECTORY_PANEL = pygame.Rect(380, 560, 440, 125)
+TRAJECTORY_PLOT = pygame.Rect(10, 26, 300, 90)  # Inside the panel
+TRAJECTORY_COLORS = [(120, 200, 255), (200, 120, 120), (80, 140, 255), (34, 200, 80), (224, 180, 74)]
+trajectory_background = None
+
+def load_trajectory():
+    path = os.environ.get("SIM_TRAJECTORY")
+    if path:
+        return dynamics.Trajectory.load(path)
+    return dynamics.trajectory(sim.variables, barren=True)
+
+def trajectory_x(t):
+    times = sim.trajectory.times
+    span = times[-1] - times[0]
+    return TRAJECTORY_PLOT.x + int((t - times[0]) / span * TRAJECTORY_PLOT.width) if span > 0 else TRAJECTORY_PLOT.x
+
+def render_trajectory_background():
+    """
+    Each state scaled to its own range over the trajectory, with a legend.
+    """
+    surface = pygame.Surface(TRAJECTORY_PANEL.size)
+    surface.fill((20, 20, 30))
+    pygame.draw.rect(surface, GRAY, surface.get_rect(), 1)
+    trajectory = sim.trajectory
+    low = trajectory.states.min(axis=0)
+    span = np.ptp(trajectory.states, axis=0)
+    fractions = (trajectory.states - low) / np.where(span > 0, span, 1)
+    for i, (name, color) in enumerate(zip(dynamics.STATE_NAMES, TRAJECTORY_COLORS)):
+        points = [(trajectory_x(t), int(TRAJECTORY_PLOT.bottom - f * TRAJECTORY_PLOT.height))
+                  for t, f in zip(trajectory.times, fractions[:, i])]
+        if len(points) > 1:
+            pygame.draw.lines(surface, color, False, points)
+        surface.blit(hud_font.render(name, True, color), (TRAJECTORY_PLOT.right + 14, TRAJECTORY_PLOT.y + 18 * i))
+    return surface
+
+def draw_trajectory_overlay():
+    global trajectory_background
+    if sim.trajectory is None:
+        trajectory_background = None
+        scheduler.track("trajectory", None, TRAJECTORY_PANEL)
+        return
+    if trajectory_background is None:
+        trajectory_background = render_trajectory_background()
+    screen.blit(trajectory_background, TRAJECTORY_PANEL)
+    year = sim.trajectory_time
+    title = hud_font.render(f"Dynamics: year {year:.1f} of {sim.trajectory.times[-1]:g}", True, WHITE)
+    screen.blit(title, (TRAJECTORY_PANEL.x + 8, TRAJECTORY_PANEL.y + 6))
+    x = TRAJECTORY_PANEL.x + trajectory_x(year)
+    pygame.draw.line(screen, WHITE, (x, TRAJECTORY_PANEL.y + TRAJECTORY_PLOT.y),
+                     (x, TRAJECTORY_PANEL.y + TRAJECTORY_PLOT.bottom))
+    scheduler.track("trajectory", (x, round(year, 1)), TRAJECTORY_PANEL)
+    scheduler.animation_pending = True  # Keep full rate while playing
 
 def draw_stars():
-    for i in range(len(stars)):
-        x, y, speed, size = stars[i]
-        
-        if random.random() < 0.08:  
-            size = random.randint(1, 3)
-        
-        pygame.draw.circle(screen, WHITE, (int(x), y), size)
-
-        x = (x + 1) % SCREEN_WIDTH
-        stars[i] = (x, y, speed, size)  # U
-
-
-running = True
-dragging_slider = None
-while running:
-    screen.fill(BLACK)
-    draw_stars() 
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-        elif event.type == pygame.MOUSEBUTTONDOWN:
+    star_field.update(scheduler.frame_scale)
+    for rect in star_field.draw(screen):
+        scheduler.mark_dirty(rect)
+
+def set_slider_value(slider, pos):
+    x, y, width, var, _ = slider.values()
+    relative_x = pos[0] - x
+    value = max(0, min(100, (relative_x / width) * 100))
+    sim.set_variable(var, value)
+
+
+def init_window():
+    global screen, font, hud_font, scheduler, profiler, star_field, planet_worker, pareto_worker, interval_worker
+    global store, sim
+    pygame.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, screenheight))
+    pygame.display.set_caption("Planet Habitability Simulation")
+    font = pygame.font.Font(None, 30)
+    hud_font = pygame.font.Font(None, 20)
+    scheduler = FrameScheduler(active_fps=30, idle_fps=4, idle_after=2.0)
+    profiler = FrameProfiler.from_env()
+    star_field = StarField(SCREEN_WIDTH, screenheight, count=600)
+    planet_worker = RenderWorker(planet_renderer.render_planet_frame)
+    planet_worker.start()
+    pareto_worker = RenderWorker(load_pareto_front, name="pareto-front")
+    pareto_worker.start()
+    interval_worker = RenderWorker(compute_output_intervals, name="output-intervals")
+    interval_worker.start()
+    store = scenario_store.ScenarioStore()
+    sim = Simulation(load_variables())
+
+
+def main():
+    global pareto_visible, uncertainty_visible, output_intervals
+    init_window()
+    caches = planet_renderer.caches
+
+    running = True
+    dragging_slider = None
+    variables_changed_ms = 0
+    recorded_variables = dict(sim.variables)  # Last state written to the history
+    while running:
+        events = scheduler.wait_for_events()
+        profiler.begin_frame()
+        with profiler.stage("stars"):
+            screen.fill(BLACK)
+            draw_stars() 
+
+        # Mouse motion is coalesced: only the last position of the frame updates the model
+        with profiler.stage("events"):
+            motion_pos = None
+            for event in events:
+                if event.type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP, pygame.MOUSEMOTION, pygame.KEYDOWN):
+                    scheduler.note_input()
+
+                if event.type == pygame.QUIT:
+                    running = False
+                elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                    scheduler.request_full_redraw()
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                    profiler.toggle_hud()
+                    scheduler.request_full_redraw()
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_p:
+                    # While the panel shows a failure, P retries instead of hiding it
+                    if not (pareto_visible and pareto_worker.error("front")):
+                        pareto_visible = not pareto_visible
+                    if pareto_visible and pareto_front is None:
+                        pareto_worker.submit("front")
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_u:
+                    uncertainty_visible = not uncertainty_visible
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_t:
+                    if sim.trajectory is None:
+                        sim.play_trajectory(load_trajectory())
+                    else:
+                        sim.stop_trajectory()
+                elif event.type == pygame.MOUSEBUTTONDOWN:
+                    for slider in independent_sliders:
+                        x, y, width, var, _ = slider.values()
+                        if x <= event.pos[0] <= x + width and y - 10 <= event.pos[1] <= y + 20:
+                            dragging_slider = slider
+                            sim.stop_trajectory()  # The trajectory was run at the old settings
+                    if 50 <= event.pos[0] <= 170 and 500 <= event.pos[1] <= 540:
+                        sim.reset()
+                    if 200 <= event.pos[0] <= 320 and 500 <= event.pos[1] <= 540:
+                        save_variables()
+
+                elif event.type == pygame.MOUSEBUTTONUP:
+                    if dragging_slider and motion_pos:
+                        set_slider_value(dragging_slider, motion_pos)
+                    motion_pos = None
+                    dragging_slider = None
+
+                elif event.type == pygame.MOUSEMOTION and dragging_slider:
+                    motion_pos = event.pos
+
+            if dragging_slider:
+                if motion_pos:
+                    set_slider_value(dragging_slider, motion_pos)
+                scheduler.animation_pending = True  # Keep full rate for the whole drag
+
+        with profiler.stage("equations"):
+            if sim.update():
+                variables_changed_ms = pygame.time.get_ticks()
+            slider_items = tuple(sim.variables.items())
+            # A state whose intervals failed is retried once the sliders leave it
+            settled = uncertainty_visible and not dragging_slider and sim.trajectory is None
+            if settled and interval_worker.error(slider_items) is None:
+                interval_worker.submit(slider_items)
+            result = interval_worker.take(lambda intervals: intervals)
+            if result is not None:
+                output_intervals = result[:2]
+            # History gets each state the sliders come to rest at
+            if not dragging_slider and sim.trajectory is None and sim.variables != recorded_variables:
+                store.record(sim.variables)
+                recorded_variables = dict(sim.variables)
+
+        # Reduced detail while a slider is moving; full detail once it ends or settles
+        settling = pygame.time.get_ticks() - variables_changed_ms < SETTLE_MS
+        lod = select_lod(dragging_slider is not None and settling)
+        draw_planet(planet_renderer.PLANET_RADIUS, lod)
+
+        with profiler.stage("ui"):
             for slider in independent_sliders:
-                x, y, width, var, _ = slider.values()
-                if x <= event.pos[0] <= x + width and y - 10 <= event.pos[1] <= y + 20:
-                    dragging_slider = slider
-                if 50 <= event.pos[0] <= 170 and 500 <= event.pos[1] <= 540:
-                    reset_variables()
-                if 200 <= event.pos[0] <= 320 and 500 <= event.pos[1] <= 540:
-                    save_variables()
-
-        elif event.type == pygame.MOUSEBUTTONUP:
-            dragging_slider = None
-
-        elif event.type == pygame.MOUSEMOTION and dragging_slider:
-            x, y, width, var, _ = dragging_slider.values()
-            relative_x = event.pos[0] - x
-            value = max(0, min(100, (relative_x / width) * 100))
-            variables[var] = value
-
-    dependent_variables = equations.calculate_dependent_variables(variables)
-
-    plants_density = max(0, min(100, dependent_variables.get("Plants Density"))) 
-    rainfall_area = dependent_variables.get("Rainfall Area") 
-    asi = dependent_variables.get("ASI") 
-    cloud_density = int(dependent_variables.get("Cloud Density"))
-    rainfall_intensity = dependent_variables.get("Rainfall Intensity")
-
-    draw_planet(200, rainfall_area,plants_density, asi, cloud_density)
-
-    for slider in independent_sliders:
-        draw_slider(slider["x"], slider["y"], slider["width"], variables[slider["var"]], slider["label"])
-
-    draw_dependent_variables(dependent_variables)
-
-    mouse_pos = pygame.mouse.get_pos()
-    is_hovering_default = 50 <= mouse_pos[0] <= 170 and 500 <= mouse_pos[1] <= 540
-    is_hovering_save = 200 <= mouse_pos[0] <= 320 and 500 <= event.pos[1] <= 540
-    draw_button(50, 500, 120, 40, "Default", GRAY, (194, 197, 204), is_hovering_default)
-    draw_button(200, 500, 120, 40, "Save", GREEN, (100, 255, 100), is_hovering_save)
-
-    pygame.display.flip()
-    clock.tick(30)
-
-pygame.quit()
+                value = sim.variables[slider["var"]]
+                rect = draw_slider(slider["x"], slider["y"], slider["width"], value, slider["label"])
+                scheduler.track(("slider", slider["var"]), int(round(value)), rect)
+
+            intervals = None
+            showing_intervals = uncertainty_visible and sim.trajectory is None
+            if showing_intervals and output_intervals and output_intervals[0] == slider_items:
+                intervals = output_intervals[1]
+            draw_dependent_variables(sim.dependent_variables, intervals)
+            draw_pareto_overlay(sim.dependent_variables)
+            draw_trajectory_overlay()
+
+            mouse_pos = pygame.mouse.get_pos()
+            is_hovering_default = 50 <= mouse_pos[0] <= 170 and 500 <= mouse_pos[1] <= 540
+            is_hovering_save = 200 <= mouse_pos[0] <= 320 and 500 <= mouse_pos[1] <= 540
+            rect = draw_button(50, 500, 120, 40, "Default", GRAY, (194, 197, 204), is_hovering_default)
+            scheduler.track(("button", "Default"), is_hovering_default, rect)
+            rect = draw_button(200, 500, 120, 40, "Save", GREEN, (100, 255, 100), is_hovering_save)
+            scheduler.track(("button", "Save"), is_hovering_save, rect)
+
+            hud_rect = profiler.draw_hud(screen, hud_font, extra_lines=caches.hud_lines())
+            if hud_rect:
+                scheduler.mark_dirty(hud_rect)
+
+        with profiler.stage("flip"):
+            scheduler.flush()
+        profiler.end_frame()
+        caches.maybe_log()
+
+    planet_worker.stop()
+    pareto_worker.stop()
+    interval_worker.stop()
+    store.close()
+    profiler.close()
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Shared fractal noise for every rendering path.
+
+``fbm`` evaluates an octave recipe for whole arrays of points at once,
+split into chunks on tile_pool. ``NoiseGrid`` keeps the result of a field
+as a dense float32 grid over explicit bounds and maps coordinates back to
+its cells, so lookups never touch the noise generator again.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+import simplex_arrays
+import tile_pool
+
+CHUNK_POINTS = 16384
+
+# One octave of fBm: noise sampled at coordinates * frequency, times weight.
+# With remap the noise is first mapped from [-1, 1] to [0, 1].
+Octave = namedtuple("Octave", ["frequency", "weight", "remap"], defaults=[False])
+
+# (latitude, longitude) bounds of an equirectangular grid, north pole first
+SPHERE_BOUNDS = ((np.pi / 2, -np.pi / 2), (-np.pi, np.pi))
+
+
+def fbm(simplex, coords, octaves, dtype=np.float64):
+    """
+    Sums the octaves at every point.
+
+    Args:
+        simplex (OpenSimplex): noise generator
+        coords (tuple): 2 or 3 arrays of coordinates, broadcast together
+        octaves (list): Octave entries, summed in order
+        dtype: dtype of the result
+
+    Returns:
+        np.ndarray: noise with the broadcast shape of ``coords``
+    """
+    coords = np.broadcast_arrays(*coords)
+    shape = coords[0].shape
+    flat = [np.ravel(c) for c in coords]
+    noise = simplex_arrays.noise2 if len(flat) == 2 else simplex_arrays.noise3
+
+    def build_chunk(start, stop):
+        points = [c[start:stop] for c in flat]
+        total = None
+        for octave in octaves:
+            value = noise(simplex, *[c * octave.frequency for c in points])
+            value = octave.weight * (value + 1) / 2 if octave.remap else octave.weight * value
+            total = value if total is None else total + value
+        return total.astype(dtype, copy=False)
+
+    if flat[0].size == 0:
+        return np.zeros(shape, dtype=dtype)
+    chunks = tile_pool.map_row_tiles(build_chunk, flat[0].size, CHUNK_POINTS)
+    return np.concatenate(chunks).reshape(shape)
+
+
+def grid_index(bounds, shape, u, v):
+    """
+    Cells of a ``shape`` grid over ``bounds`` containing the points (u, v).
+    Points outside the bounds map to the nearest edge cell.
+
+    Returns:
+        tuple: (rows, cols) int64 arrays
+    """
+    indices = []
+    for (low, high), cells, coord in zip(bounds, shape, (u, v)):
+        index = ((np.asarray(coord) - low) / (high - low) * cells).astype(np.int64)
+        indices.append(np.clip(index, 0, cells - 1))
+    return tuple(indices)
+
+
+class NoiseGrid:
+    """
+    Dense float32 samples of a noise field. Cell ``(i, j)`` covers an equal
+    share of ``bounds`` and holds the field at its centre.
+    """
+
+    def __init__(self, values, bounds):
+        """
+        Args:
+            values (np.ndarray): (rows, cols) samples
+            bounds (tuple): ((u_start, u_end), (v_start, v_end)) along rows
+                and columns; an end may be below its start
+        """
+        self.values = np.asarray(values, dtype=np.float32)
+        self.bounds = bounds
+
+    @classmethod
+    def sphere(cls, simplex, octaves, shape):
+        """
+        Equirectangular grid of noise on the unit sphere: rows run from the
+        north pole down, columns from longitude -pi eastwards. Sampling in 3D
+        keeps the field seamless across the date line and the poles.
+
+        Args:
+            shape (tuple): (rows, cols)
+        """
+        lat, lon = (cls.cell_centres(bound, cells) for bound, cells in zip(SPHERE_BOUNDS, shape))
+        lat, lon = np.meshgrid(lat, lon, indexing="ij")
+        # y towards the north pole, z towards longitude 0
+        x, y, z = np.cos(lat) * np.sin(lon), np.sin(lat), np.cos(lat) * np.cos(lon)
+        return cls(fbm(simplex, (x, y, z), octaves, dtype=np.float32), SPHERE_BOUNDS)
+
+    @staticmethod
+    def cell_centres(bound, cells):
+        low, high = bound
+        return low + (np.arange(cells) + 0.5) / cells * (high - low)
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes
+
+    def index(self, u, v):
+        return grid_index(self.bounds, self.values.shape, u, v)
+
+    def sample(self, u, v):
+        """
+        Nearest-cell lookup for arrays of points.
+        """
+        return self.values[self.index(u, v)]
@@ -0,0 +1,246 @@
+"""
+Search for slider settings that maximize a habitability objective.
+
+The objective is a weighted sum of outputs scaled by their upper clamps
+(batch_equations.OUTPUT_MAXIMA): positive weights reward an output,
+negative ones penalize it. Differential evolution evaluates each whole
+generation with one batch_equations call; independent restarts with
+different seeds run on a process pool.
+
+    python optimizer.py --weight ASI=1 --weight Hunger=-2 --restarts 8 --save
+    python optimizer.py --where "thirst < 1 and water_resources > 500"
+
+Constraints restrict the search to settings meeting them: interval bounds
+(see interval.py) rule out the regions that cannot, the first generation
+is drawn from what is left and settings breaking a constraint score -inf.
+
+``--save`` writes the best settings as a preset of the scenario store
+(scenario_store.py), by default the one the Simulation front-end loads on
+start. In code, ``result.apply(sim)`` loads them into a
+Simulation directly.
+"""
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import batch_equations
+import interval
+import range_index
+import scenario_store
+
+DEFAULT_WEIGHTS = {"ASI": 1.0, "Hunger": -1.0, "Thirst": -1.0, "Health Risk": -1.0}
+
+POPULATION = 60
+GENERATIONS = 200
+DIFFERENTIAL_WEIGHT = 0.7
+CROSSOVER = 0.9
+TOLERANCE = 1e-9  # Stop when the whole population scores within this range
+
+_LOW = np.array([batch_equations.INPUT_RANGES[name][0] for name in batch_equations.INPUT_NAMES])
+_HIGH = np.array([batch_equations.INPUT_RANGES[name][1] for name in batch_equations.INPUT_NAMES])
+
+
+class Objective:
+    """
+    Weighted sum of scaled outputs. Settings the scalar equations cannot
+    evaluate (zero cloud density) or breaking a constraint score -inf, so
+    a result can always be loaded into the Simulation.
+    """
+
+    def __init__(self, weights=None, constraints=None):
+        self.weights = dict(DEFAULT_WEIGHTS if weights is None else weights)
+        for name in self.weights:
+            if name not in batch_equations.OUTPUT_MAXIMA:
+                raise ValueError(f"Unknown output: {name}")
+        self.constraints = [range_index.Constraint(range_index.resolve_output(output), op, value)
+                            for output, op, value in constraints or []]
+        self.region = interval.feasible_region(self.constraints) if self.constraints else None
+        if self.region is not None and not len(self.region):
+            raise ValueError("No slider settings can meet the constraints")
+
+    def sample(self, count, rng):
+        """
+        Uniform random settings, within the region the constraints allow.
+
+        Returns:
+            np.ndarray: (count, 4) array in INPUT_NAMES order
+        """
+        if self.region is None:
+            return rng.uniform(_LOW, _HIGH, (count, len(_LOW)))
+        return self.region.sample(count, rng)
+
+    def evaluate(self, points):
+        """
+        Args:
+            points (np.ndarray): (n, 4) slider settings in INPUT_NAMES order
+
+        Returns:
+            tuple: (scores, outputs) with outputs a dict of arrays
+        """
+        outputs = batch_equations.calculate_dependent_variables(dict(zip(batch_equations.INPUT_NAMES, points.T)))
+        scores = np.zeros(len(points))
+        for name, weight in self.weights.items():
+            scores += weight * outputs[name] / batch_equations.OUTPUT_MAXIMA[name]
+        scores[batch_equations.scalar_failures(outputs)] = -np.inf
+        for output, op, value in self.constraints:
+            scores[~range_index.OPERATORS[op](outputs[output], value)] = -np.inf
+        return scores, outputs
+
+    def __call__(self, points):
+        return self.evaluate(points)[0]
+
+
+class Result:
+    """
+    Best settings found by a search.
+    """
+
+    def __init__(self, point, score, evaluations, generations):
+        self.variables = dict(zip(batch_equations.INPUT_NAMES, np.asarray(point, dtype=float).tolist()))
+        self.score = float(score)
+        self.evaluations = evaluations
+        self.generations = generations
+
+    def apply(self, sim):
+        """
+        Loads the settings into a Simulation and recomputes it.
+        """
+        for name, value in self.variables.items():
+            sim.set_variable(name, value)
+        sim.update()
+
+    def save(self, name=scenario_store.DEFAULT_PRESET, directory=None):
+        """
+        Writes the settings as a new version of a scenario store preset.
+        """
+        store = scenario_store.ScenarioStore(directory)
+        try:
+            store.save_preset(name, self.variables)
+        finally:
+            store.close()
+
+    def __repr__(self):
+        settings = ", ".join(f"{name}={value:.2f}" for name, value in self.variables.items())
+        return f"Result(score={self.score:.6g}, {settings})"
+
+
+def differential_evolution(objective, seed=None, population=POPULATION, generations=GENERATIONS,
+                           differential_weight=DIFFERENTIAL_WEIGHT, crossover=CROSSOVER):
+    """
+    DE/rand/1/bin within the slider ranges. Mutants leaving the ranges are
+    clipped to them, since good settings often sit on a slider's end stop.
+
+    Returns:
+        Result: best settings of the final population
+    """
+    rng = np.random.default_rng(seed)
+    size, dims = population, len(_LOW)
+    members = objective.sample(size, rng)
+    scores = objective(members)
+    evaluations = size
+    rows = np.arange(size)
+
+    generation = 0
+    for generation in range(1, generations + 1):
+        # Three distinct partners per member, none of them the member itself
+        order = rng.random((size, size))
+        order[rows, rows] = np.inf
+        a, b, c = np.argsort(order, axis=1)[:, :3].T
+        mutants = np.clip(members[a] + differential_weight * (members[b] - members[c]), _LOW, _HIGH)
+
+        crossing = rng.random((size, dims)) < crossover
+        crossing[rows, rng.integers(0, dims, size)] = True
+        trials = np.where(crossing, mutants, members)
+        trial_scores = objective(trials)
+        evaluations += size
+
+        better = trial_scores >= scores
+        members[better] = trials[better]
+        scores[better] = trial_scores[better]
+        finite = scores[np.isfinite(scores)]
+        if len(finite) == size and finite.max() - finite.min() < TOLERANCE:
+            break
+
+    best = int(np.argmax(scores))
+    return Result(members[best], scores[best], evaluations, generation)
+
+
+def _restart(job):
+    objective, seed, options = job
+    return differential_evolution(objective, seed, **options)
+
+
+def optimize(objective=None, restarts=4, seed=0, workers=None, **options):
+    """
+    Runs independent searches with seeds ``seed``, ``seed + 1``, ... and
+    keeps the best. More than one restart runs on a process pool.
+
+    Args:
+        objective (Objective): by default DEFAULT_WEIGHTS
+        options: passed to differential_evolution
+
+    Returns:
+        Result: best over all restarts, with ``restarts`` holding every
+        restart's result
+    """
+    objective = objective or Objective()
+    jobs = [(objective, seed + i, options) for i in range(restarts)]
+    workers = min(workers or os.cpu_count() or 1, restarts)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_restart, jobs))
+    else:
+        results = [_restart(job) for job in jobs]
+    best = max(results, key=lambda result: result.score)
+    best.restarts = results
+    return best
+
+
+def parse_weights(assignments):
+    weights = {}
+    for assignment in assignments:
+        name, _, value = assignment.rpartition("=")
+        weights[name] = float(value)
+    return weights
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find slider settings maximizing a habitability objective.")
+    parser.add_argument("--weight", action="append", default=[], metavar="OUTPUT=WEIGHT",
+                        help="objective term, e.g. ASI=1 or Hunger=-2 (default: "
+                             + ", ".join(f"{name}={weight:g}" for name, weight in DEFAULT_WEIGHTS.items()) + ")")
+    parser.add_argument("--restarts", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--population", type=int, default=POPULATION)
+    parser.add_argument("--generations", type=int, default=GENERATIONS)
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--where", help='constraints, e.g. "thirst < 1 and water_resources > 500"')
+    parser.add_argument("--save", nargs="?", const=scenario_store.DEFAULT_PRESET, metavar="PRESET",
+                        help="save the best settings as a scenario preset "
+                             f"(default: {scenario_store.DEFAULT_PRESET}, which the Simulation loads)")
+    args = parser.parse_args()
+
+    try:
+        constraints = range_index.parse_constraints(args.where) if args.where else None
+        objective = Objective(parse_weights(args.weight) or None, constraints)
+    except ValueError as error:
+        parser.error(str(error))
+    result = optimize(objective, args.restarts, args.seed, args.workers,
+                      population=args.population, generations=args.generations)
+    _, outputs = objective.evaluate(np.array([list(result.variables.values())]))
+
+    for i, restart in enumerate(result.restarts):
+        print(f"Restart {i}: score {restart.score:.6g} after {restart.generations} generations")
+    print(result)
+    for name in dict.fromkeys(list(objective.weights) + [output for output, _, _ in objective.constraints]):
+        print(f"  {name}: {outputs[name][0]:.6g}")
+    if args.save:
+        result.save(args.save)
+        print("Variables saved:", result.variables)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""
+Pareto fronts over chosen model outputs.
+
+Candidate slider settings are sampled uniformly and evaluated in chunks
+with batch_equations; only the objective columns are kept, so millions of
+candidates fit in memory. ``non_dominated`` finds the front in
+O(n log n) for two objectives (one sort and a running minimum) and three
+(a sweep keeping a staircase of the best points seen so far). More
+objectives fall back to comparing every point against the front.
+
+    python pareto.py --objective ASI:max --objective "Health Risk:min" --samples 2000000 --out front.npz
+"""
+
+import argparse
+import bisect
+
+import numpy as np
+
+import batch_equations
+import sweep
+
+DEFAULT_OBJECTIVES = [("ASI", "max"), ("Health Risk", "min")]
+SAMPLES = 1_000_000
+CHUNK_POINTS = 250_000
+PIVOTS = 64  # Front points used to discard dominated candidates in bulk
+
+
+def _unique_rows(costs):
+    """
+    Lexicographic order of the rows and, in that order, a mask of the first
+    of each run of identical rows.
+    """
+    order = np.lexsort(costs.T[::-1])
+    ordered = costs[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = np.any(ordered[1:] != ordered[:-1], axis=1)
+    return order, first
+
+
+def _front_2d(costs):
+    # Sorted by the first cost, a point is on the front iff its second cost
+    # is below that of every earlier (distinct) point
+    second = costs[:, 1]
+    previous = np.minimum.accumulate(np.r_[np.inf, second[:-1]])
+    return second < previous
+
+
+def _front_3d(costs):
+    # Sorted by the first cost, a point is dominated iff an earlier point
+    # beats it on the other two. The staircase holds the (second, third)
+    # front of the points so far: second ascending, third descending.
+    stairs_2, stairs_3 = [], []
+    on_front = np.zeros(len(costs), dtype=bool)
+    for i, (_, c2, c3) in enumerate(costs.tolist()):
+        k = bisect.bisect_right(stairs_2, c2) - 1
+        if k >= 0 and stairs_3[k] <= c3:
+            continue
+        on_front[i] = True
+        position = bisect.bisect_left(stairs_2, c2)
+        end = position
+        while end < len(stairs_3) and stairs_3[end] >= c3:
+            end += 1
+        stairs_2[position:end] = [c2]
+        stairs_3[position:end] = [c3]
+    return on_front
+
+
+def _front_nd(costs):
+    on_front = np.zeros(len(costs), dtype=bool)
+    front = np.empty((0, costs.shape[1]))
+    for i, point in enumerate(costs):
+        if np.any(np.all(front <= point, axis=1)):
+            continue
+        on_front[i] = True
+        front = np.vstack([front[~np.all(point <= front, axis=1)], point])
+    return on_front
+
+
+def non_dominated(costs):
+    """
+    Mask of the Pareto-optimal rows of ``costs``, all objectives minimized.
+    Identical rows are kept or dropped together.
+
+    Args:
+        costs (np.ndarray): (n, objectives) array
+
+    Returns:
+        np.ndarray: bool mask of length n
+    """
+    costs = np.asarray(costs, dtype=np.float64)
+    n, objectives = costs.shape
+    if n == 0:
+        return np.zeros(0, dtype=bool)
+
+    # Candidates dominated by a few points of a preliminary front (the best
+    # point of every objective and a sample) are dropped in bulk first
+    candidates = np.arange(n)
+    if n > 4 * PIVOTS and objectives > 2:
+        sample = np.random.default_rng(0).choice(n, PIVOTS, replace=False)
+        pivots = np.unique(np.r_[costs.argmin(axis=0), sample])
+        pivots = pivots[non_dominated(costs[pivots])]
+        for pivot in costs[pivots]:
+            subset = costs[candidates]
+            dominated = np.all(pivot <= subset, axis=1) & np.any(pivot < subset, axis=1)
+            candidates = candidates[~dominated]
+
+    order, first = _unique_rows(costs[candidates])
+    distinct = costs[candidates[order[first]]]
+    if objectives == 1:
+        kept = distinct[:, 0] == distinct[0, 0]
+    elif objectives == 2:
+        kept = _front_2d(distinct)
+    elif objectives == 3:
+        kept = _front_3d(distinct)
+    else:
+        kept = _front_nd(distinct)
+
+    # Spread the verdict of each distinct row to its duplicates
+    group = np.cumsum(first) - 1
+    mask = np.zeros(n, dtype=bool)
+    mask[candidates[order]] = kept[group]
+    return mask
+
+
+def sample_points(samples, seed=0):
+    rng = np.random.default_rng(seed)
+    low = [batch_equations.INPUT_RANGES[name][0] for name in batch_equations.INPUT_NAMES]
+    high = [batch_equations.INPUT_RANGES[name][1] for name in batch_equations.INPUT_NAMES]
+    return rng.uniform(low, high, (samples, len(low)))
+
+
+class Front:
+    """
+    Pareto-optimal slider settings for a list of (output, "min" or "max")
+    objectives, sorted along the first objective.
+    """
+
+    def __init__(self, objectives, inputs, values):
+        self.objectives = [(batch_equations.OUTPUT_NAMES[batch_equations.OUTPUT_NAMES.index(name)], sense)
+                           for name, sense in objectives]
+        self.inputs = inputs  # (n, 4) in INPUT_NAMES order
+        self.values = values  # (n, objectives)
+
+    @classmethod
+    def compute(cls, objectives=None, samples=SAMPLES, seed=0):
+        """
+        Samples ``samples`` slider settings and keeps the non-dominated ones.
+        Settings the scalar equations cannot evaluate are left out.
+        """
+        objectives = objectives or DEFAULT_OBJECTIVES
+        for name, sense in objectives:
+            if name not in batch_equations.OUTPUT_NAMES or sense not in ("min", "max"):
+                raise ValueError(f"Bad objective: {name}:{sense}")
+        points = sample_points(samples, seed)
+        values = np.empty((samples, len(objectives)))
+        valid = np.empty(samples, dtype=bool)
+        for start in range(0, samples, CHUNK_POINTS):
+            chunk = points[start:start + CHUNK_POINTS]
+            outputs = batch_equations.calculate_dependent_variables(dict(zip(batch_equations.INPUT_NAMES, chunk.T)))
+            values[start:start + len(chunk)] = np.stack([outputs[name] for name, _ in objectives], axis=1)
+            valid[start:start + len(chunk)] = ~batch_equations.scalar_failures(outputs)
+
+        signs = np.array([1.0 if sense == "min" else -1.0 for _, sense in objectives])
+        points, values = points[valid], values[valid]
+        front = np.flatnonzero(non_dominated(values * signs))
+        front = front[np.argsort(values[front, 0], kind="stable")]
+        return cls(objectives, points[front], values[front])
+
+    def __len__(self):
+        return len(self.values)
+
+    def save(self, path):
+        """
+        Writes the front as .npz: the inputs and objective values as
+        columns, plus the objective list.
+        """
+        columns = {name: self.inputs[:, i] for i, name in enumerate(batch_equations.INPUT_NAMES)}
+        columns.update({sweep.column_key(name): self.values[:, i] for i, (name, _) in enumerate(self.objectives)})
+        np.savez(path, objectives=np.array([f"{name}:{sense}" for name, sense in self.objectives]), **columns)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            objectives = [tuple(entry.rsplit(":", 1)) for entry in data["objectives"].tolist()]
+            inputs = np.stack([data[name] for name in batch_equations.INPUT_NAMES], axis=1)
+            values = np.stack([data[sweep.column_key(name)] for name, _ in objectives], axis=1)
+        return cls(objectives, inputs, values)
+
+
+def parse_objective(text):
+    name, _, sense = text.rpartition(":")
+    return name, sense
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pareto front of the model over chosen outputs.")
+    parser.add_argument("--objective", action="append", default=[], metavar="OUTPUT:min|max",
+                        help="e.g. 'Health Risk:min' (default: ASI:max, Health Risk:min)")
+    parser.add_argument("--samples", type=int, default=SAMPLES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write the front to this .npz file")
+    args = parser.parse_args()
+
+    objectives = [parse_objective(text) for text in args.objective] or None
+    try:
+        front = Front.compute(objectives, args.samples, args.seed)
+    except ValueError as error:
+        parser.error(str(error))
+    print(f"{len(front)} Pareto-optimal settings out of {args.samples}")
+    header = batch_equations.INPUT_NAMES + [name for name, _ in front.objectives]
+    print("  ".join(f"{name:>16}" for name in header))
+    for row in np.hstack([front.inputs, front.values])[:: max(1, len(front) // 20)]:
+        print("  ".join(f"{value:16.4g}" for value in row))
+    if args.out:
+        front.save(args.out)
+
+
+if __name__ == "__main__":
+    main()
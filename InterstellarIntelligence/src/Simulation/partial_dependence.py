@@ -0,0 +1,344 @@
+"""
+Partial-dependence curves and heatmaps of the model outputs: one output
+against one slider (a curve) or two (a heatmap).
+
+The other sliders are held at fixed values (by default the middle of their
+range) or, with ``marginalize``, averaged over MARGINAL_SAMPLES random
+settings; the same settings are used for every point, so curves stay
+smooth. Sliders given a value are held at it either way.
+
+Curves are sampled adaptively. Starting from an even grid, every interval
+whose midpoint lies off the straight line between its ends by more than
+``tolerance`` (a share of the output's range) is halved, one batch of
+midpoints per round, so points gather where the output oscillates, such
+as around cos(cloud_density). Heatmap pixels off the line between their
+neighbours by more than the tolerance are supersampled, so oscillations
+finer than a pixel show as their average rather than as aliasing.
+
+Results are cached in the asset cache under the model digest, and
+rendered to PNG with pygame on the dummy video driver.
+
+    python partial_dependence.py Photosynthesis humidity --set solar_intensity=30 --out photo.png
+    python partial_dependence.py "Crop Yield" solar_intensity humidity --marginalize --out crop.png
+"""
+
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import argparse
+
+import numpy as np
+import pygame
+
+import asset_cache
+import batch_equations
+import range_index
+import sweep
+
+INITIAL_POINTS = 65
+MAX_POINTS = 4097
+TOLERANCE = 0.002
+MARGINAL_SAMPLES = 64
+RESOLUTION = 200  # Heatmap pixels per side
+SUPERSAMPLE = 4  # Sub-samples per side of a refined heatmap pixel
+CHUNK_POINTS = 1_000_000
+
+IMAGE_SIZE = (640, 400)
+MARGIN = 60
+LEFT_MARGIN = 100  # Room for the y label and ticks
+BACKGROUND = (20, 20, 30)
+FOREGROUND = (220, 220, 220)
+CURVE_COLOR = (255, 200, 60)
+# Dark blue -> teal -> yellow, sampled at even steps
+PALETTE = np.array([(40, 20, 90), (40, 90, 140), (30, 150, 130), (120, 200, 80), (250, 230, 40)], dtype=float)
+
+
+def other_settings(varied, fixed=None, marginalize=False, samples=MARGINAL_SAMPLES, seed=0):
+    """
+    Settings of the sliders that are not plotted.
+
+    Args:
+        varied (list): plotted input names
+        fixed (dict): input name -> value to hold it at
+        marginalize (bool): average the inputs not in ``fixed`` over
+            ``samples`` random settings instead of holding them mid-range
+
+    Returns:
+        dict: input name -> (samples,) array, or (1,) array without
+        marginalizing
+    """
+    fixed = fixed or {}
+    rng = np.random.default_rng(seed)
+    count = samples if marginalize else 1
+    settings = {}
+    for name in batch_equations.INPUT_NAMES:
+        if name in varied:
+            continue
+        low, high = batch_equations.INPUT_RANGES[name]
+        if name in fixed:
+            settings[name] = np.full(count, float(fixed[name]))
+        elif marginalize:
+            settings[name] = rng.uniform(low, high, count)
+        else:
+            settings[name] = np.full(count, (low + high) / 2)
+    return settings
+
+
+def evaluate(output, columns, others):
+    """
+    Mean of ``output`` over the other-slider settings at each point.
+
+    Args:
+        columns (dict): plotted input name -> (n,) array
+        others (dict): see other_settings
+
+    Returns:
+        np.ndarray: (n,) values
+    """
+    count = len(next(iter(columns.values())))
+    settings = len(next(iter(others.values())))
+    step = max(1, CHUNK_POINTS // settings)
+    values = np.empty(count)
+    for start in range(0, count, step):
+        stop = min(start + step, count)
+        variables = {name: column[start:stop, None] for name, column in columns.items()}
+        variables.update({name: setting[None, :] for name, setting in others.items()})
+        values[start:stop] = batch_equations.calculate_dependent_variables(variables)[output].mean(axis=1)
+    return values
+
+
+def compute_curve(output, input_name, others, tolerance=TOLERANCE, max_points=MAX_POINTS):
+    """
+    Adaptively sampled curve of ``output`` against ``input_name``.
+
+    Returns:
+        dict: "x" and "y" arrays, sorted by x
+    """
+    low, high = batch_equations.INPUT_RANGES[input_name]
+    x = np.linspace(low, high, INITIAL_POINTS)
+    y = evaluate(output, {input_name: x}, others)
+    # Intervals still to check, as indices of their left ends
+    pending = np.arange(len(x) - 1)
+    while len(pending) and len(x) + len(pending) <= max_points:
+        middle = (x[pending] + x[pending + 1]) / 2
+        y_middle = evaluate(output, {input_name: middle}, others)
+        scale = max(np.ptp(np.r_[y, y_middle]), np.finfo(float).tiny)
+        off_line = np.abs(y_middle - (y[pending] + y[pending + 1]) / 2) > tolerance * scale
+
+        order = np.argsort(np.r_[x, middle], kind="stable")
+        x, y = np.r_[x, middle][order], np.r_[y, y_middle][order]
+        # Both halves of an interval that was off the line are checked next
+        position = np.searchsorted(x, middle[off_line])
+        pending = np.sort(np.r_[position - 1, position])
+    return {"x": x, "y": y}
+
+
+def compute_heatmap(output, inputs, others, tolerance=TOLERANCE, resolution=RESOLUTION, supersample=SUPERSAMPLE):
+    """
+    Heatmap of ``output`` over two inputs, sampled at pixel centres and
+    supersampled where a pixel is off the line between its neighbours by
+    more than the tolerance.
+
+    Returns:
+        dict: "values" (resolution, resolution) array indexed [y, x] with
+        y rising, and "refined", the mask of supersampled pixels
+    """
+    (x_name, y_name) = inputs
+    ranges = [batch_equations.INPUT_RANGES[name] for name in inputs]
+    steps = [(high - low) / resolution for low, high in ranges]
+    centres = [low + step * (np.arange(resolution) + 0.5) for (low, _), step in zip(ranges, steps)]
+    grid_x, grid_y = np.meshgrid(*centres)
+    values = evaluate(output, {x_name: grid_x.ravel(), y_name: grid_y.ravel()}, others).reshape(grid_x.shape)
+
+    # Like the curves: how far each pixel is off the line between its
+    # neighbours, along either axis
+    padded = np.pad(values, 1, mode="edge")
+    bend_x = np.abs(padded[1:-1, :-2] + padded[1:-1, 2:] - 2 * values) / 2
+    bend_y = np.abs(padded[:-2, 1:-1] + padded[2:, 1:-1] - 2 * values) / 2
+    refined = np.maximum(bend_x, bend_y) > tolerance * max(np.ptp(values), np.finfo(float).tiny)
+
+    if refined.any():
+        offsets = (np.arange(supersample) + 0.5) / supersample - 0.5
+        dx, dy = (offset.ravel() for offset in np.meshgrid(offsets, offsets))
+        rows, cols = np.nonzero(refined)
+        sub_x = (grid_x[rows, cols][:, None] + dx[None] * steps[0]).ravel()
+        sub_y = (grid_y[rows, cols][:, None] + dy[None] * steps[1]).ravel()
+        sub_values = evaluate(output, {x_name: sub_x, y_name: sub_y}, others)
+        values[rows, cols] = sub_values.reshape(len(rows), -1).mean(axis=1)
+    return {"values": values, "refined": refined}
+
+
+def _cache_params(kind, output, inputs, others, **options):
+    return {"kind": kind, "model": batch_equations.model_digest(), "output": output, "inputs": list(inputs),
+            "others": {name: values.tolist() for name, values in others.items()}, **options}
+
+
+def curve(output, input_name, fixed=None, marginalize=False, samples=MARGINAL_SAMPLES, tolerance=TOLERANCE):
+    """
+    Cached partial-dependence curve.
+
+    Args:
+        output (str): output name or column key
+        input_name (str): slider on the x axis
+        fixed, marginalize, samples: see other_settings
+
+    Returns:
+        dict: "x" and "y" arrays
+    """
+    output = range_index.resolve_output(output)
+    if input_name not in batch_equations.INPUT_NAMES:
+        raise ValueError(f"Unknown input: {input_name}")
+    others = other_settings([input_name], fixed, marginalize, samples)
+    params = _cache_params("curve", output, [input_name], others, tolerance=tolerance, max_points=MAX_POINTS)
+    return asset_cache.load_or_build("partial_dependence", params,
+                                     lambda: compute_curve(output, input_name, others, tolerance))
+
+
+def heatmap(output, inputs, fixed=None, marginalize=False, samples=MARGINAL_SAMPLES, tolerance=TOLERANCE,
+            resolution=RESOLUTION):
+    """
+    Cached partial-dependence heatmap over two inputs (x, y).
+
+    Returns:
+        dict: "values" and "refined" arrays, see compute_heatmap
+    """
+    output = range_index.resolve_output(output)
+    if len(inputs) != 2 or inputs[0] == inputs[1] or not set(inputs) <= set(batch_equations.INPUT_NAMES):
+        raise ValueError(f"Need two different inputs, got {', '.join(inputs)}")
+    others = other_settings(inputs, fixed, marginalize, samples)
+    params = _cache_params("heatmap", output, inputs, others, tolerance=tolerance, resolution=resolution,
+                           supersample=SUPERSAMPLE)
+    return asset_cache.load_or_build("partial_dependence", params,
+                                     lambda: compute_heatmap(output, inputs, others, tolerance, resolution))
+
+
+def colormap(values, low, high):
+    """
+    Returns:
+        np.ndarray: (..., 3) uint8 colours of ``values`` along PALETTE
+    """
+    position = (values - low) / (high - low) if high > low else np.zeros_like(values)
+    stops = np.linspace(0, 1, len(PALETTE))
+    return np.stack([np.interp(position, stops, PALETTE[:, i]) for i in range(3)], axis=-1).astype(np.uint8)
+
+
+def _draw_frame(surface, font, title, x_label, y_label, x_range, y_range, plot):
+    surface.fill(BACKGROUND)
+    pygame.draw.rect(surface, FOREGROUND, plot.inflate(2, 2), 1)
+    surface.blit(font.render(title, True, FOREGROUND), (12, 12))
+    surface.blit(font.render(x_label, True, FOREGROUND), (plot.centerx - font.size(x_label)[0] // 2, plot.bottom + 22))
+    label = pygame.transform.rotate(font.render(y_label, True, FOREGROUND), 90)
+    surface.blit(label, (6, plot.centery - label.get_height() // 2))
+    for text, position in ((f"{x_range[0]:g}", (plot.left, plot.bottom + 4)),
+                           (f"{x_range[1]:g}", (plot.right - font.size(f"{x_range[1]:g}")[0], plot.bottom + 4)),
+                           (f"{y_range[1]:.4g}", (plot.left - font.size(f"{y_range[1]:.4g}")[0] - 4, plot.top)),
+                           (f"{y_range[0]:.4g}", (plot.left - font.size(f"{y_range[0]:.4g}")[0] - 4, plot.bottom - 14))):
+        surface.blit(font.render(text, True, FOREGROUND), position)
+
+
+def describe_others(others):
+    return ", ".join(
+        f"{name}={values[0]:g}" if np.all(values == values[0]) else f"{name} averaged"
+        for name, values in others.items()
+    )
+
+
+def render_curve(data, output, input_name, others, size=IMAGE_SIZE):
+    """
+    Returns:
+        pygame.Surface: the curve with axes and labels
+    """
+    pygame.font.init()
+    font = pygame.font.Font(None, 20)
+    surface = pygame.Surface(size)
+    plot = pygame.Rect(LEFT_MARGIN, MARGIN, size[0] - LEFT_MARGIN - MARGIN, size[1] - 2 * MARGIN)
+    x, y = np.asarray(data["x"]), np.asarray(data["y"])
+    y_low, y_high = float(y.min()), float(y.max())
+    if y_high == y_low:
+        y_low, y_high = y_low - 1, y_high + 1
+    _draw_frame(surface, font, f"{output} vs {input_name} ({describe_others(others)})", input_name, output,
+                (x[0], x[-1]), (y_low, y_high), plot)
+    px = plot.left + (x - x[0]) / (x[-1] - x[0]) * plot.width
+    py = plot.bottom - (y - y_low) / (y_high - y_low) * plot.height
+    pygame.draw.aalines(surface, CURVE_COLOR, False, np.stack([px, py], axis=1).tolist())
+    return surface
+
+
+def render_heatmap(data, output, inputs, others, size=IMAGE_SIZE):
+    """
+    Returns:
+        pygame.Surface: the heatmap with axes, labels and a colour bar
+    """
+    pygame.font.init()
+    font = pygame.font.Font(None, 20)
+    surface = pygame.Surface(size)
+    plot = pygame.Rect(LEFT_MARGIN, MARGIN, size[0] - LEFT_MARGIN - 2 * MARGIN, size[1] - 2 * MARGIN)
+    values = np.asarray(data["values"])
+    low, high = float(values.min()), float(values.max())
+    x_range, y_range = (batch_equations.INPUT_RANGES[name] for name in inputs)
+    _draw_frame(surface, font, f"{output} over {inputs[0]} and {inputs[1]} ({describe_others(others)})",
+                inputs[0], inputs[1], x_range, y_range, plot)
+
+    # Surfaces are indexed [x, y] with y down; the values have y up
+    image = pygame.surfarray.make_surface(colormap(values[::-1].T, low, high))
+    surface.blit(pygame.transform.scale(image, plot.size), plot)
+
+    bar = pygame.Rect(plot.right + 20, plot.top, 16, plot.height)
+    ramp = colormap(np.linspace(high, low, bar.height)[None].repeat(bar.width, axis=0), low, high)
+    surface.blit(pygame.surfarray.make_surface(ramp), bar)
+    surface.blit(font.render(f"{high:.4g}", True, FOREGROUND), (bar.right + 4, bar.top))
+    surface.blit(font.render(f"{low:.4g}", True, FOREGROUND), (bar.right + 4, bar.bottom - 14))
+    return surface
+
+
+def parse_fixed(assignments):
+    fixed = {}
+    for assignment in assignments:
+        name, _, value = assignment.partition("=")
+        if name not in batch_equations.INPUT_NAMES:
+            raise ValueError(f"Unknown input: {name}")
+        fixed[name] = float(value)
+    return fixed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Partial-dependence curves and heatmaps of the model outputs.")
+    parser.add_argument("output", help='output name or column key, e.g. "Crop Yield" or crop_yield')
+    parser.add_argument("inputs", nargs="+", metavar="input", help="one slider for a curve, two for a heatmap")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE",
+                        help="hold a slider at a value, e.g. solar_intensity=30")
+    parser.add_argument("--marginalize", action="store_true", help="average over the sliders not set")
+    parser.add_argument("--samples", type=int, default=MARGINAL_SAMPLES, help="settings averaged over")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="refinement threshold, share of the range")
+    parser.add_argument("--resolution", type=int, default=RESOLUTION, help="heatmap pixels per side")
+    parser.add_argument("--out", help="PNG path (default: <output>_<inputs>.png)")
+    args = parser.parse_args()
+
+    if len(args.inputs) > 2:
+        parser.error("give one input for a curve or two for a heatmap")
+    try:
+        output = range_index.resolve_output(args.output)
+        fixed = parse_fixed(args.set)
+        if len(args.inputs) == 1:
+            data = curve(output, args.inputs[0], fixed, args.marginalize, args.samples, args.tolerance)
+        else:
+            data = heatmap(output, args.inputs, fixed, args.marginalize, args.samples, args.tolerance,
+                           args.resolution)
+    except ValueError as error:
+        parser.error(str(error))
+
+    others = other_settings(args.inputs, fixed, args.marginalize, args.samples)
+    if len(args.inputs) == 1:
+        surface = render_curve(data, output, args.inputs[0], others)
+        print(f"{len(data['x'])} points")
+    else:
+        surface = render_heatmap(data, output, args.inputs, others)
+        print(f"{int(np.sum(data['refined']))} of {data['refined'].size} pixels supersampled")
+    out = args.out or "_".join([sweep.column_key(output)] + args.inputs) + ".png"
+    pygame.image.save(surface, out)
+    print("Saved", out)
+
+
+if __name__ == "__main__":
+    main()
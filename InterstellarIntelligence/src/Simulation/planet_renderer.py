@@ -0,0 +1,300 @@
+import pygame
+import numpy as np
+from opensimplex import OpenSimplex
+import asset_cache
+import globe
+import lighting
+import noise_field
+import tile_pool
+from cache_registry import CacheRegistry
+
+# Planet rendering shared by the windowed front-end (main.py), headless.py
+# and batch_render.py. Importing this module has no side effects: nothing
+# is generated until the first frame is rendered, and pygame is only used
+# for Surface objects, which need no display.
+
+NOISE_SEED = 42
+simplex = OpenSimplex(seed=NOISE_SEED)
+caches = CacheRegistry.from_env()
+
+PLANET_RADIUS = 200
+
+GREEN = (34, 139, 34)
+SANDY = (205, 133, 63)
+BLUE1 = (70, 130, 180)  # Water
+LIGHT_GREEN = (144, 238, 144)  # Sparse plants
+BROWN = (139, 69, 19)  # Dry areas
+
+@caches.memoize("terrain_color", max_entries=1024)
+def get_terrain_color(noise_value, rainfall, plant_density):
+    # Adjust plant density effect
+    if plant_density < 50:
+        plant_factor = plant_density / 50  # Gradually fades to brown
+    elif plant_density > 500:
+        plant_factor = max(0, (200 - plant_density) / 100)#max(0, 1 - (plant_density - 100) / 100)  # Gradually turns brown again
+    else:
+        plant_factor = 1  # Most green in 50-100 range
+
+    # Adjust rainfall effect
+    if rainfall < 80000:
+        rain_factor = 0  # No blue for very low rainfall
+    elif rainfall > 90000:
+        rain_factor = max(0, 1 - (rainfall - 90000) / 10000)  # Gradually fades out above 90000
+    else:
+        rain_factor = (rainfall - 80000) / (90000 - 80000)  # Most blue in 80000-90000 range
+
+    if noise_value < -0.1:
+        transition = plant_factor  # Use adjusted plant density
+        r = int(BROWN[0] * (1 - transition) + GREEN[0] * transition)
+        g = int(BROWN[1] * (1 - transition) + GREEN[1] * transition)
+        b = int(BROWN[2] * (1 - transition) + GREEN[2] * transition)
+    elif noise_value < 0:
+        transition = rain_factor  # Use adjusted rainfall
+        r = int(SANDY[0] * (1 - transition) + LIGHT_GREEN[0] * transition)
+        g = int(SANDY[1] * (1 - transition) + LIGHT_GREEN[1] * transition)
+        b = int(SANDY[2] * (1 - transition) + LIGHT_GREEN[2] * transition)
+    else:
+        transition = rain_factor  # Use adjusted rainfall
+        r = int(BROWN[0] * (1 - transition) + BLUE1[0] * transition)
+        g = int(BROWN[1] * (1 - transition) + BLUE1[1] * transition)
+        b = int(BROWN[2] * (1 - transition) + BLUE1[2] * transition)
+
+    return (max(0, min(255, r)), max(0, min(255, g)), max(0, min(255, b)))
+
+# Terrain and cloud noise: (scale, weight) octaves, with scales in pixels on
+# a planet of GLOBE_NOISE_RADIUS pixels
+TERRAIN_NOISE_OCTAVES = [(50, 1.0), (30, 0.5), (10, 0.25)]
+CLOUD_NOISE_OCTAVES = [(80, 1.0)]
+CITY_NOISE_OCTAVES = [(6, 1.0)]
+CITY_THRESHOLD = 0.3
+GLOBE_NOISE_RADIUS = 200
+
+GLOW_MARGIN = 30
+PLANET_FRAME_MARGIN = 2
+
+# Layers that only change when their inputs change, keyed by (name, inputs)
+planet_layers = caches.create("planet_layers", max_entries=4)
+
+def cached_layer(name, key, render):
+    return planet_layers.get_or_create((name, key), render)
+
+def get_cloud_opacity(cloud_density):
+    if cloud_density < 100:
+        cloud_opacity = 5
+    elif cloud_density < 150:
+        cloud_opacity = 50
+    elif cloud_density < 200:
+        cloud_opacity = 60
+    elif cloud_density < 400:
+        cloud_opacity = 70
+    elif cloud_density < 1000:
+        cloud_opacity = 90
+    elif cloud_density < 2000:
+        cloud_opacity = 120
+    elif cloud_density < 3000:
+        cloud_opacity = 140
+    elif cloud_density < 6000:
+        cloud_opacity = 160
+    else:
+        cloud_opacity = 170 # Best whiteness at 600+
+    return cloud_opacity
+
+# The kernels below work on float32 (rgb, alpha) arrays covering the planet
+# frame: a square of side 2 * radius + 2 * PLANET_FRAME_MARGIN centred on the
+# planet, divided by the level-of-detail scale. They run on one thread at a
+# time (the front-end's render worker, or the caller in headless mode), split
+# into row tiles on tile_pool, and release the GIL inside NumPy.
+
+# Level of detail: each level halves the frame resolution. Level 0 is full
+# detail.
+LOD_SCALES = (1, 2, 4)
+
+def get_frame_size(radius, scale):
+    return (2 * radius + 2 * PLANET_FRAME_MARGIN) // scale
+
+# Globe textures, disk lookups and light fields, only touched by the thread
+# rendering planet frames. Lookups are kept by use count so the full detail
+# one survives drags.
+globe_layers = caches.create("globe_layers", max_entries=1)
+globe_lookups = caches.create("globe_lookups", max_entries=2 * len(LOD_SCALES), policy="lfu")
+light_fields = caches.create("light_fields", max_entries=len(LOD_SCALES))
+
+def build_globe_noise(octaves):
+    recipe = [noise_field.Octave(GLOBE_NOISE_RADIUS / scale, weight) for scale, weight in octaves]
+    shape = (globe.TEXTURE_HEIGHT, globe.TEXTURE_WIDTH)
+    return noise_field.NoiseGrid.sphere(simplex, recipe, shape).values
+
+def build_globe_textures():
+    terrain_noise = build_globe_noise(TERRAIN_NOISE_OCTAVES)
+    cloud_noise = build_globe_noise(CLOUD_NOISE_OCTAVES)
+    city_noise = build_globe_noise(CITY_NOISE_OCTAVES)
+    # get_terrain_color only depends on which of three noise bands a texel is in
+    bands = (terrain_noise >= -0.1).astype(np.int8) + (terrain_noise >= 0)
+    # Cities only on land; the top band turns to water with enough rain
+    cities = np.clip((city_noise - CITY_THRESHOLD) / (1 - CITY_THRESHOLD), 0, 1) * (bands < 2)
+    return {
+        "terrain": bands,
+        "clouds": (cloud_noise > 0.2).astype(np.float32),
+        "cities": cities.astype(np.float32),
+    }
+
+def load_globe_layers():
+    params = {
+        "seed": NOISE_SEED,
+        "terrain_octaves": TERRAIN_NOISE_OCTAVES,
+        "cloud_octaves": CLOUD_NOISE_OCTAVES,
+        "city_octaves": CITY_NOISE_OCTAVES,
+        "city_threshold": CITY_THRESHOLD,
+        "noise_radius": GLOBE_NOISE_RADIUS,
+        "size": [globe.TEXTURE_WIDTH, globe.TEXTURE_HEIGHT],
+        "noise_dtype": "float32",
+    }
+    textures = asset_cache.load_or_build("globe", params, build_globe_textures)
+    return {name: globe.Globe(texture) for name, texture in textures.items()}
+
+def get_globe_layers():
+    return globe_layers.get_or_create("globe", load_globe_layers)
+
+def get_globe_lookup(radius, scale):
+    return globe_lookups.get_or_create(
+        (radius, scale),
+        lambda: globe.build_lookup(radius, get_frame_size(radius, scale), scale, PLANET_FRAME_MARGIN),
+    )
+
+def render_light_field(radius, scale, solar_intensity):
+    normals = get_globe_lookup(radius, scale)["normals"]
+    direction = lighting.sun_direction(solar_intensity)
+    tiles = tile_pool.map_row_tiles(
+        lambda start, stop: lighting.light_field(normals[:, start:stop], direction), normals.shape[1]
+    )
+    return tuple(np.concatenate(parts) for parts in zip(*tiles))
+
+def get_light_field(radius, scale, solar_intensity):
+    key = (radius, scale, solar_intensity)
+    return light_fields.get_or_create(key, lambda: render_light_field(*key))
+
+def composite_over(dst_rgb, dst_alpha, src_rgb, src_alpha):
+    out_alpha = src_alpha + dst_alpha * (1 - src_alpha)
+    weight = np.divide(src_alpha, out_alpha, out=np.zeros_like(out_alpha), where=out_alpha > 0)
+    out_rgb = dst_rgb + (src_rgb - dst_rgb) * weight[..., None]
+    return out_rgb, out_alpha
+
+def render_planet_frame(params, out):
+    radius, rainfall, plant_density, solar_intensity, population, cloud_opacity, rotation, cloud_rotation, lod = params
+    scale = LOD_SCALES[lod]
+    layers = get_globe_layers()
+    lookup = get_globe_lookup(radius, scale)
+    shade, night = get_light_field(radius, scale, solar_intensity)
+    palette = np.array([get_terrain_color(v, rainfall, plant_density) for v in (-1.0, -0.05, 1.0)], dtype=np.float32)
+
+    size = lookup["disk"].shape[0]
+    frame = out if out is not None and out.shape == (size, size, 4) else np.empty((size, size, 4), dtype=np.uint8)
+
+    def render_rows(start, stop):
+        index = lookup["index"][start:stop]
+        disk = lookup["disk"][start:stop]
+        tile_shade = shade[start:stop, :, None]
+        alpha = disk.astype(np.float32)
+        rgb = palette[layers["terrain"].sample(index, rotation)] * tile_shade
+        if population > 0:
+            cities = layers["cities"].sample(index, rotation)
+            rgb += lighting.city_light_rgb(cities, night[start:stop], population)
+
+        # Clouds are lit like the ground and hide the city lights below them
+        cloud_alpha = layers["clouds"].sample(index, cloud_rotation) * disk * np.float32(cloud_opacity / 255)
+        rgb, alpha = composite_over(rgb, alpha, np.float32(255) * tile_shade, cloud_alpha)
+
+        np.clip(rgb, 0, 255, out=rgb)
+        frame[start:stop, :, :3] = rgb
+        frame[start:stop, :, 3] = alpha * 255
+
+    tile_pool.map_row_tiles(render_rows, size)
+    return frame
+
+def frame_to_surface(frame):
+    height, width = frame.shape[:2]
+    return pygame.image.frombuffer(frame.tobytes(), (width, height), "RGBA")
+
+def get_glow_params(asi):
+    max_glow_alpha = min(255, 100 + int(asi * 1.55))
+
+    if asi < 5000:
+        glow_r = min(255, 200 + int(asi * 0.2))  
+        glow_g = min(255, 200 + int(asi * 0.2))
+        glow_b = min(255, 220 + int(asi * 0.25))
+        layer_spacing = 15  # Fewer layers
+    elif 6000 <= asi <= 9000:
+        glow_r = min(255, 240 + int(asi * 0.3))  
+        glow_g = min(255, 240 + int(asi * 0.3))
+        glow_b = min(255, 240 + int(asi * 0.3))
+        layer_spacing = 10  
+    else:
+        glow_r = min(255, 250 + int(asi * 0.2))  
+        glow_g = min(255, 250 + int(asi * 0.2))
+        glow_b = min(255, 255)
+        layer_spacing = 17 
+    return (glow_r, glow_g, glow_b), max_glow_alpha, layer_spacing
+
+def render_glow(radius, glow_rgb, max_glow_alpha, layer_spacing):
+    size = 2 * (radius + GLOW_MARGIN)
+    glow_surface = pygame.Surface((size, size), pygame.SRCALPHA)
+    for i in range(radius + 5, radius + 30, layer_spacing):  
+        alpha = max(0, max_glow_alpha - (i - radius) * 5)  # Fade effect
+        glow_layer = pygame.Surface((size, size), pygame.SRCALPHA)
+        pygame.draw.circle(glow_layer, (*glow_rgb, alpha), (size // 2, size // 2), i)
+        glow_surface.blit(glow_layer, (0, 0))
+    return glow_surface
+
+def get_glow_key(radius, asi):
+    return (radius,) + get_glow_params(asi)
+
+def get_glow_surface(glow_key):
+    return cached_layer("glow", glow_key, lambda: render_glow(*glow_key))
+
+def get_planet_params(sim, radius, lod=0):
+    """
+    Inputs of render_planet_frame for the current state of a Simulation.
+    """
+    return (
+        radius, sim.rainfall_area, sim.plants_density, sim.variables["solar_intensity"],
+        sim.variables["population"], get_cloud_opacity(sim.cloud_density),
+        globe.rotation_columns(sim.planet_rotation), globe.rotation_columns(sim.cloud_rotation), lod,
+    )
+
+def scale_planet_surface(frame_surface, radius, lod):
+    """
+    Brings a reduced detail frame back to full size.
+    """
+    if not lod:
+        return frame_surface
+    full_size = get_frame_size(radius, 1)
+    return pygame.transform.smoothscale(frame_surface, (full_size, full_size))
+
+def draw_planet(surface, sim, center, radius=PLANET_RADIUS, lod=0, planet_surface=None):
+    """
+    Draws the glow and the planet centred on ``center``.
+
+    Args:
+        surface (pygame.Surface): target
+        sim (Simulation): state to draw
+        center (tuple): (x, y) of the planet centre
+        planet_surface (pygame.Surface): full size planet frame to show; it
+            is rendered synchronously when None
+
+    Returns:
+        pygame.Rect: area covered by the glow and the planet
+    """
+    center_x, center_y = center
+    glow_surface = get_glow_surface(get_glow_key(radius, sim.asi))
+    surface.blit(glow_surface, (center_x - radius - GLOW_MARGIN, center_y - radius - GLOW_MARGIN))
+
+    if planet_surface is None:
+        frame = render_planet_frame(get_planet_params(sim, radius, lod), None)
+        planet_surface = scale_planet_surface(frame_to_surface(frame), radius, lod)
+    margin = radius + PLANET_FRAME_MARGIN
+    surface.blit(planet_surface, (center_x - margin, center_y - margin))
+    return get_planet_rect(center, radius)
+
+def get_planet_rect(center, radius):
+    margin = radius + GLOW_MARGIN
+    return pygame.Rect(center[0] - margin, center[1] - margin, 2 * margin, 2 * margin)
@@ -0,0 +1,151 @@
+import csv
+import os
+import time
+from collections import deque
+from contextlib import nullcontext
+
+import pygame
+
+# "swap" hands parameters to the render worker and takes its newest frame;
+# "planet" blits the glow and that frame; "simulation" advances the model
+# clock (rotation, trajectory playback)
+STAGES = ["stars", "events", "equations", "swap", "planet", "simulation", "ui", "flip"]
+
+_NULL_STAGE = nullcontext()
+
+
+class _Stage:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter_ns() - self.start
+        timings = self.profiler.current
+        timings[self.name] = timings.get(self.name, 0) + elapsed
+
+
+class FrameProfiler:
+    """
+    Opt-in timing of the main loop stages. When disabled every method is a
+    cheap no-op so the instrumentation can stay in the loop permanently.
+
+    Enable it with the SIM_PROFILE=1 environment variable (rolling HUD,
+    toggled with F3) and/or SIM_PROFILE_CSV=<path> (one row per frame).
+    """
+
+    def __init__(self, enabled=False, csv_path=None, window=120):
+        self.enabled = enabled or csv_path is not None
+        self.show_hud = enabled
+        self.current = {}
+        self.history = {name: deque(maxlen=window) for name in STAGES}
+        self.frame_times = deque(maxlen=window)
+        self.frame_count = 0
+        self.frame_start = None
+        self.last_frame_end = None
+
+        self.csv_file = None
+        self.csv_writer = None
+        if csv_path is not None:
+            self.csv_file = open(csv_path, "w", newline="")
+            self.csv_writer = csv.writer(self.csv_file)
+            self.csv_writer.writerow(
+                ["frame", "time_s", "interval_ms", "work_ms"] + [f"{name}_ms" for name in STAGES]
+            )
+
+    @classmethod
+    def from_env(cls):
+        enabled = os.environ.get("SIM_PROFILE", "") not in ("", "0")
+        csv_path = os.environ.get("SIM_PROFILE_CSV") or None
+        return cls(enabled=enabled, csv_path=csv_path)
+
+    def stage(self, name):
+        """
+        Context manager timing one stage. Repeated entries in a frame add up.
+        """
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def begin_frame(self):
+        if self.enabled:
+            self.current = {}
+            self.frame_start = time.perf_counter_ns()
+
+    def end_frame(self):
+        if not self.enabled or self.frame_start is None:
+            return
+        now = time.perf_counter_ns()
+        work_ms = (now - self.frame_start) / 1e6
+        interval_ms = (now - self.last_frame_end) / 1e6 if self.last_frame_end else work_ms
+        self.last_frame_end = now
+        self.frame_count += 1
+
+        stage_ms = [self.current.get(name, 0) / 1e6 for name in STAGES]
+        for name, ms in zip(STAGES, stage_ms):
+            self.history[name].append(ms)
+        self.frame_times.append(interval_ms)
+
+        if self.csv_writer is not None:
+            self.csv_writer.writerow(
+                [self.frame_count, f"{now / 1e9:.6f}", f"{interval_ms:.3f}", f"{work_ms:.3f}"]
+                + [f"{ms:.3f}" for ms in stage_ms]
+            )
+
+    def toggle_hud(self):
+        if self.enabled:
+            self.show_hud = not self.show_hud
+
+    def fps_percentiles(self):
+        """
+        Returns:
+            tuple: FPS at the median, 5th and 1st percentile (slowest) frames
+        """
+        times = sorted(self.frame_times)
+        if not times:
+            return 0.0, 0.0, 0.0
+
+        def fps_at(fraction):
+            ms = times[min(len(times) - 1, int(fraction * len(times)))]
+            return 1000 / ms if ms > 0 else 0.0
+
+        return fps_at(0.5), fps_at(0.95), fps_at(0.99)
+
+    def hud_lines(self):
+        p50, p5, p1 = self.fps_percentiles()
+        lines = [f"FPS p50 {p50:5.1f}  p5 {p5:5.1f}  p1 {p1:5.1f}"]
+        for name in STAGES:
+            samples = self.history[name]
+            mean = sum(samples) / len(samples) if samples else 0.0
+            peak = max(samples) if samples else 0.0
+            lines.append(f"{name:<10}{mean:7.2f} ms  max {peak:7.2f}")
+        return lines
+
+    def draw_hud(self, surface, font, pos=(10, 10), extra_lines=()):
+        """
+        Draws the rolling HUD, followed by ``extra_lines``, and returns the
+        rect it covered (or None).
+        """
+        if not (self.enabled and self.show_hud):
+            return None
+        lines = self.hud_lines() + list(extra_lines)
+        line_height = font.get_linesize()
+        width = max(font.size(line)[0] for line in lines) + 12
+        rect = pygame.Rect(pos[0], pos[1], width, line_height * len(lines) + 8)
+
+        background = pygame.Surface(rect.size, pygame.SRCALPHA)
+        background.fill((0, 0, 0, 180))
+        surface.blit(background, rect.topleft)
+        for i, line in enumerate(lines):
+            text = font.render(line, True, (0, 255, 0))
+            surface.blit(text, (rect.x + 6, rect.y + 4 + i * line_height))
+        return rect
+
+    def close(self):
+        if self.csv_file is not None:
+            self.csv_file.close()
+            self.csv_file = None
+            self.csv_writer = None
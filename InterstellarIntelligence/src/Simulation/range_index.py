@@ -0,0 +1,251 @@
+import hashlib
+import operator
+import re
+from collections import namedtuple
+
+import numpy as np
+
+import asset_cache
+import batch_equations
+import sweep
+
+GRID_STEPS = 41  # 2.5 slider units per step, 2.8M points
+EDGES = 127  # Bin edges per output; codes fit in a uint8
+SAMPLE_POINTS = 200_000  # Grid points used to place the edges
+
+OPERATORS = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge, "==": operator.eq}
+_CONSTRAINT = re.compile(r"^\s*(.+?)\s*(<=|>=|==|<|>)\s*([-+]?[0-9.]+(?:[eE][-+]?[0-9]+)?)\s*$")
+
+Constraint = namedtuple("Constraint", ["output", "op", "value"])
+
+
+def resolve_output(name):
+    """
+    Maps an output name or its column key ("ASI", "health_risk") to the
+    output name.
+    """
+    for output in batch_equations.OUTPUT_NAMES:
+        if name == output or name.lower() == output.lower() or name == sweep.column_key(output):
+            return output
+    raise ValueError(f"Unknown output: {name}")
+
+
+def parse_constraints(text):
+    """
+    Parses e.g. "thirst < 1 and hunger < 1 and ASI > 10000".
+
+    Returns:
+        list: Constraint entries
+    """
+    constraints = []
+    for part in re.split(r"\band\b", text):
+        match = _CONSTRAINT.match(part)
+        if not match:
+            raise ValueError(f"Cannot parse constraint: {part.strip()}")
+        name, op, value = match.groups()
+        constraints.append(Constraint(resolve_output(name), op, float(value)))
+    return constraints
+
+
+def encode(values, edges):
+    """
+    Bin codes of ``values``: 2i for the open interval below edges[i] (and
+    above edges[i - 1]), 2i + 1 for values equal to edges[i]. Codes are
+    ordered like the values, and equal codes at an odd value mean equal
+    values, so most comparisons are decided from the codes alone.
+    """
+    position = np.searchsorted(edges, values, side="left")
+    on_edge = edges[np.minimum(position, len(edges) - 1)] == values
+    return (2 * position + (on_edge & (position < len(edges)))).astype(np.uint8)
+
+
+def iter_chunks(axes, chunk=sweep.CHUNK_POINTS):
+    total = int(np.prod([len(values) for values in axes.values()]))
+    for start in range(0, total, chunk):
+        stop = min(start + chunk, total)
+        yield start, stop, batch_equations.calculate_dependent_variables(sweep.grid_points(axes, start, stop))
+
+
+def value_digests(axes):
+    """
+    Returns:
+        np.ndarray: sha1 hex digest of each output's values on the grid,
+        in OUTPUT_NAMES order
+    """
+    digests = {name: hashlib.sha1() for name in batch_equations.OUTPUT_NAMES}
+    for _, _, values in iter_chunks(axes):
+        for name, digest in digests.items():
+            digest.update(np.ascontiguousarray(values[name]).tobytes())
+    return np.array([digest.hexdigest() for digest in digests.values()])
+
+
+def build_codes(axes, outputs):
+    """
+    Places the bin edges of ``outputs`` on a sample of the grid, then codes
+    every grid point in chunks.
+
+    Returns:
+        dict: output name -> {"edges": float64 array, "codes": uint8 array}
+    """
+    total = int(np.prod([len(values) for values in axes.values()]))
+    sample = np.linspace(0, total - 1, min(total, SAMPLE_POINTS)).astype(np.int64)
+    sampled = batch_equations.calculate_dependent_variables(sweep.points_at(axes, sample))
+    levels = np.linspace(0, 1, EDGES)
+    built = {name: {"edges": np.unique(np.quantile(sampled[name], levels)),
+                    "codes": np.empty(total, dtype=np.uint8)} for name in outputs}
+    for start, stop, values in iter_chunks(axes):
+        for name in outputs:
+            built[name]["codes"][start:stop] = encode(values[name], built[name]["edges"])
+    return built
+
+
+class RangeMatch:
+    """
+    Grid points matching a range query.
+    """
+
+    def __init__(self, axes, indices):
+        self.axes = axes
+        self.indices = indices
+
+    def __len__(self):
+        return len(self.indices)
+
+    def points(self):
+        """
+        Returns:
+            dict: input name -> values of the matching points
+        """
+        return sweep.points_at(self.axes, self.indices)
+
+    def bounds(self):
+        """
+        Returns:
+            dict: input name -> (min, max) over the matching points, or None
+        """
+        if not len(self.indices):
+            return None
+        return {name: (float(values.min()), float(values.max())) for name, values in self.points().items()}
+
+    def runs(self):
+        """
+        Matching points merged into runs along the last input (population).
+
+        Returns:
+            list: dicts with the other three inputs and the (low, high)
+            population range of each run
+        """
+        if not len(self.indices):
+            return []
+        row = len(self.axes[batch_equations.INPUT_NAMES[-1]])
+        breaks = np.flatnonzero((np.diff(self.indices) != 1) | (np.diff(self.indices // row) != 0)) + 1
+        starts = self.indices[np.r_[0, breaks]]
+        ends = self.indices[np.r_[breaks - 1, len(self.indices) - 1]]
+        first, last = sweep.points_at(self.axes, starts), sweep.points_at(self.axes, ends)
+        *fixed, population = batch_equations.INPUT_NAMES
+        return [
+            {**{name: float(first[name][i]) for name in fixed},
+             population: (float(first[population][i]), float(last[population][i]))}
+            for i in range(len(starts))
+        ]
+
+
+class RangeIndex:
+    """
+    Index over a grid of slider settings answering range queries on the
+    (unrounded) outputs, such as "thirst < 1 and hunger < 1 and ASI > 10000".
+
+    Every output's values are replaced by one-byte bin codes over quantile
+    edges, so a query is a few vectorized comparisons of byte arrays. Only
+    the points whose code shares a bin with a query value are re-evaluated
+    exactly with batch_equations, so results equal a brute-force check of
+    every grid point.
+
+    Each output's codes are stored in the asset cache under a digest of its
+    values on the grid. When the equations change, only outputs whose
+    values changed are coded again.
+    """
+
+    def __init__(self, axes, outputs, rebuilt=()):
+        self.axes = axes
+        self.edges = {name: outputs[name]["edges"] for name in outputs}
+        self.codes = {name: outputs[name]["codes"] for name in outputs}
+        self.rebuilt = list(rebuilt)
+
+    @classmethod
+    def build(cls, steps=GRID_STEPS, axes=None):
+        """
+        Loads the index from the asset cache, coding any output whose
+        values are new.
+
+        Args:
+            steps (int): points per input, ignored if ``axes`` is given
+            axes (dict): input name -> grid values, see sweep.make_axes
+        """
+        axes = axes or sweep.make_axes(steps)
+        # Digests of every output's values, remembered per model source so
+        # an unchanged model skips the pass over the grid
+        digests = asset_cache.load_or_build(
+            "range_index_digests", {"axes": axes, "model": batch_equations.model_digest()},
+            lambda: {"digests": value_digests(axes)},
+        )["digests"].tolist()
+
+        params = {
+            name: {"output": name, "axes": axes, "edges": EDGES, "samples": SAMPLE_POINTS,
+                   "values": digest}
+            for name, digest in zip(batch_equations.OUTPUT_NAMES, digests)
+        }
+        missing = [name for name in batch_equations.OUTPUT_NAMES if not asset_cache.is_cached("range_index", params[name])]
+        built = build_codes(axes, missing) if missing else {}
+        outputs = {
+            name: asset_cache.load_or_build("range_index", params[name], lambda name=name: built[name])
+            for name in batch_equations.OUTPUT_NAMES
+        }
+        return cls(axes, outputs, rebuilt=missing)
+
+    def query(self, constraints):
+        """
+        Finds the grid points meeting every constraint.
+
+        Args:
+            constraints: a string like "thirst < 1 and ASI > 10000", or a
+                list of Constraint / (output, op, value) tuples
+
+        Returns:
+            RangeMatch: matching points in grid order
+        """
+        if isinstance(constraints, str):
+            constraints = parse_constraints(constraints)
+        constraints = [Constraint(resolve_output(output), op, value) for output, op, value in constraints]
+
+        sure = None
+        possible = None
+        for output, op, value in constraints:
+            compare = OPERATORS[op]
+            codes = self.codes[output]
+            code = int(encode(np.array([value]), self.edges[output])[0])
+            # Codes order like the values and an odd code stands for exactly
+            # one value, so only points sharing an even code with the query
+            # value need the exact model
+            passes = np.zeros(codes.shape, dtype=bool)
+            if compare(0, 1):
+                passes |= codes < code
+            if compare(1, 0):
+                passes |= codes > code
+            same_bin = codes == code
+            if code % 2 and compare(0, 0):
+                passes |= same_bin
+            maybe = passes | same_bin if code % 2 == 0 else passes
+            sure = passes if sure is None else sure & passes
+            possible = maybe if possible is None else possible & maybe
+
+        if sure is None:
+            return RangeMatch(self.axes, np.arange(len(next(iter(self.codes.values())))))
+        candidates = np.flatnonzero(possible & ~sure)
+        if len(candidates):
+            values = batch_equations.calculate_dependent_variables(sweep.points_at(self.axes, candidates))
+            keep = np.ones(len(candidates), dtype=bool)
+            for output, op, value in constraints:
+                keep &= OPERATORS[op](values[output], value)
+            sure[candidates[keep]] = True
+        return RangeMatch(self.axes, np.flatnonzero(sure))
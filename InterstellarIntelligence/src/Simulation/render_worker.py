@@ -0,0 +1,124 @@
+import threading
+import time
+import traceback
+
+
+class RenderWorker(threading.Thread):
+    """
+    Renders planet frames on a background thread so the event loop never
+    waits for terrain or cloud generation.
+
+    The main thread submits render parameters with ``submit``; only the most
+    recent request is kept, so a burst of slider changes costs one render.
+    The worker draws into a back buffer and swaps it with the front buffer
+    when the frame is complete. ``take`` hands the newest completed frame to
+    the main thread. A render that raises is reported by ``error``, and
+    the same params may be submitted again to retry. The same machinery runs other slow computations whose
+    result only matters for the newest request, such as the Pareto front.
+    """
+
+    def __init__(self, render, name="planet-render"):
+        """
+        Args:
+            render (callable): render(params, out) -> numpy array. ``out`` is
+                the back buffer from two frames ago (or None) and may be
+                reused if its shape still fits.
+            name (str): thread name
+        """
+        super().__init__(name=name, daemon=True)
+        self.render = render
+        self.condition = threading.Condition()
+        self.pending = None
+        self.requested = None
+        self.running = True
+
+        self.swap_lock = threading.Lock()
+        self.front = None
+        self.front_params = None
+        self.back = None
+        self.generation = 0
+        self.taken_generation = 0
+        self.front_render_ms = 0.0
+        self.failure = None  # (params, exception) of the newest failed render
+
+    def submit(self, params):
+        """
+        Requests a frame for ``params``. Does nothing if that frame was
+        already requested (queued, rendering or shown).
+        """
+        with self.condition:
+            if params == self.requested:
+                return
+            self.requested = params
+            self.pending = params
+            self.condition.notify()
+        with self.swap_lock:
+            if self.failure is not None and self.failure[0] == params:
+                self.failure = None
+
+    def take(self, convert):
+        """
+        Converts the newest completed frame on the calling thread.
+
+        Args:
+            convert (callable): convert(frame) -> object, must copy the data
+                since the buffer is reused by the worker afterwards
+
+        Returns:
+            tuple: (params, converted frame, render time in ms), or None if
+            nothing new is ready
+        """
+        with self.swap_lock:
+            if self.generation == self.taken_generation:
+                return None
+            self.taken_generation = self.generation
+            return self.front_params, convert(self.front), self.front_render_ms
+
+    def error(self, params):
+        """
+        Returns:
+            Exception: why the newest render of ``params`` failed, or None
+            if it did not fail (or has not finished)
+        """
+        with self.swap_lock:
+            if self.failure is not None and self.failure[0] == params:
+                return self.failure[1]
+            return None
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.running and self.pending is None:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                params = self.pending
+                self.pending = None
+
+            start = time.perf_counter()
+            try:
+                frame = self.render(params, self.back)
+            except Exception as error:
+                # Keep showing the last good frame rather than killing the
+                # thread; forget the request so submitting it again retries
+                traceback.print_exc()
+                with self.condition:
+                    if self.requested == params:
+                        self.requested = None
+                with self.swap_lock:
+                    self.failure = (params, error)
+                continue
+            render_ms = (time.perf_counter() - start) * 1000
+
+            with self.swap_lock:
+                self.back = self.front
+                self.front = frame
+                self.front_params = params
+                self.front_render_ms = render_ms
+                self.failure = None
+                self.generation += 1
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
@@ -0,0 +1,161 @@
+import itertools
+
+import numpy as np
+
+import asset_cache
+import batch_equations
+
+GRID_STEPS = 21
+TOLERANCE = 0.01  # Largest interpolation error accepted, as a share of an output's range
+CHECK_POINTS = 100_000
+ERROR_MARGIN = 1.5  # Sampling can miss the worst point; fresh samples came within 2 % of the raw maximum
+
+# Outputs with jumps or oscillations narrower than any practical grid cell
+DISCONTINUOUS_OUTPUTS = {
+    "Photosynthesis": "oscillates with cos(cloud_density)",
+    "Crop Yield": "branch at solar_intensity > 20",
+}
+
+_LOW = np.array([batch_equations.INPUT_RANGES[name][0] for name in batch_equations.INPUT_NAMES])
+_HIGH = np.array([batch_equations.INPUT_RANGES[name][1] for name in batch_equations.INPUT_NAMES])
+
+
+def stack_points(variables):
+    """
+    Broadcasts a dict of input arrays into an (n, 4) array of points.
+
+    Returns:
+        tuple: (points, broadcast shape)
+    """
+    columns = np.broadcast_arrays(*(np.asarray(variables[name], dtype=np.float64)
+                                    for name in batch_equations.INPUT_NAMES))
+    return np.stack([c.ravel() for c in columns], axis=1), columns[0].shape
+
+
+def evaluate_exact(points):
+    """
+    Returns:
+        np.ndarray: (n, outputs) exact model values at (n, 4) points
+    """
+    outputs = batch_equations.calculate_dependent_variables(dict(zip(batch_equations.INPUT_NAMES, points.T)))
+    return np.stack([outputs[name] for name in batch_equations.OUTPUT_NAMES], axis=1)
+
+
+def interpolate(values, points):
+    """
+    Multilinear interpolation on a regular grid over the input ranges.
+    Points outside the ranges are clamped to the edge, like the sliders.
+
+    Args:
+        values (np.ndarray): (steps, steps, steps, steps, outputs) samples
+        points (np.ndarray): (n, 4) query points
+
+    Returns:
+        np.ndarray: (n, outputs) interpolated values
+    """
+    steps = values.shape[0]
+    coords = np.ascontiguousarray(points.T)  # One contiguous row per axis
+    position = np.clip((coords - _LOW[:, None]) / (_HIGH - _LOW)[:, None] * (steps - 1), 0, steps - 1)
+    base = np.minimum(position.astype(np.int64), steps - 2)
+    fraction = position - base
+    strides = steps ** np.arange(3, -1, -1)
+    base_index = strides @ base
+    flat = np.ascontiguousarray(values.reshape(-1, values.shape[-1]))
+
+    # Corner weights are products of per-axis weights; build them from
+    # pairs of axes rather than from scratch for each of the 16 corners
+    axis_weights = [(1 - fraction[axis], fraction[axis]) for axis in range(4)]
+    head = {(a, b): axis_weights[0][a] * axis_weights[1][b] for a in (0, 1) for b in (0, 1)}
+    tail = {(c, d): axis_weights[2][c] * axis_weights[3][d] for c in (0, 1) for d in (0, 1)}
+
+    result = np.zeros((len(points), flat.shape[1]))
+    for corner in itertools.product((0, 1), repeat=4):
+        weight = head[corner[:2]] * tail[corner[2:]]
+        result += weight[:, None] * np.take(flat, base_index + int(np.dot(corner, strides)), axis=0)
+    return result
+
+
+def build_surface(steps):
+    axes = [np.linspace(low, high, steps) for low, high in zip(_LOW, _HIGH)]
+    mesh = np.meshgrid(*axes, indexing="ij")
+    points = np.stack([m.ravel() for m in mesh], axis=1)
+    values = evaluate_exact(points).reshape((steps,) * 4 + (-1,))
+
+    # Multilinear error peaks inside the cells, so check every cell centre
+    # plus random points, which also land next to branches and kinks
+    centres = [(a[:-1] + a[1:]) / 2 for a in axes]
+    check = np.stack([m.ravel() for m in np.meshgrid(*centres, indexing="ij")], axis=1)
+    rng = np.random.default_rng(0)
+    check = np.concatenate([check, rng.uniform(_LOW, _HIGH, (CHECK_POINTS, 4))])
+    error = np.abs(interpolate(values, check) - evaluate_exact(check)).max(axis=0)
+    return {"values": values, "max_errors": error}
+
+
+class ResponseSurface:
+    """
+    Precomputed grid of every model output over the slider ranges, with
+    multilinear interpolation for batch queries.
+
+    ``error_bounds`` holds an estimated bound on the interpolation error
+    of each output: the largest error against the exact model at every
+    cell centre and at random points when the grid is built, times
+    ERROR_MARGIN. Outputs in DISCONTINUOUS_OUTPUTS and
+    any output whose bound exceeds ``tolerance`` of its range are flagged
+    in ``exact_outputs`` and always computed with batch_equations instead.
+
+    The grid is stored in the asset cache, keyed on the model source.
+    """
+
+    def __init__(self, values, max_errors, tolerance=TOLERANCE):
+        self.values = values
+        self.steps = values.shape[0]
+        error_bounds = np.asarray(max_errors) * ERROR_MARGIN
+        self.error_bounds = dict(zip(batch_equations.OUTPUT_NAMES, error_bounds.tolist()))
+        flat = values.reshape(-1, values.shape[-1])
+        ranges = flat.max(axis=0) - flat.min(axis=0)
+        self.exact_outputs = {
+            name for name, bound, span in zip(batch_equations.OUTPUT_NAMES, error_bounds, ranges)
+            if name in DISCONTINUOUS_OUTPUTS or bound > tolerance * span
+        }
+
+    @classmethod
+    def load(cls, steps=GRID_STEPS, tolerance=TOLERANCE):
+        params = {"steps": steps, "check_points": CHECK_POINTS, "model": batch_equations.model_digest()}
+        arrays = asset_cache.load_or_build("response_surface", params, lambda: build_surface(steps))
+        return cls(arrays["values"], arrays["max_errors"], tolerance)
+
+    def query(self, variables, outputs=None):
+        """
+        Evaluates outputs for arrays of slider values.
+
+        Args:
+            variables (dict): batch_equations.INPUT_NAMES -> arrays, broadcast together
+            outputs (list): output names, by default all
+
+        Returns:
+            dict: output name -> float64 array of the broadcast shape
+        """
+        outputs = outputs or batch_equations.OUTPUT_NAMES
+        points, shape = stack_points(variables)
+        columns = [batch_equations.OUTPUT_NAMES.index(name) for name in outputs]
+        approximate = interpolate(self.values[..., columns], points)
+        exact = None
+        if self.exact_outputs.intersection(outputs):
+            exact = evaluate_exact(points)
+        result = {}
+        for i, (name, column) in enumerate(zip(outputs, columns)):
+            source = exact[:, column] if name in self.exact_outputs else approximate[:, i]
+            result[name] = source.reshape(shape)
+        return result
+
+    def report(self):
+        """
+        Returns:
+            list: one line per output with its error bound and how it is served
+        """
+        return [
+            f"{name:<22}{self.error_bounds[name]:14.4g}  "
+            + ("exact: " + DISCONTINUOUS_OUTPUTS.get(name, "error above tolerance")
+               if name in self.exact_outputs else "interpolated")
+            for name in batch_equations.OUTPUT_NAMES
+        ]
@@ -0,0 +1,300 @@
+"""
+Named slider presets and a history of slider changes, in place of the
+pickled saved_variables.pkl.
+
+Everything is appended to one JSON-lines log, ``scenarios.jsonl``: a
+"preset" record per saved version of a named preset and a "change"
+record per settled slider state, each with a timestamp. Nothing in the
+log is rewritten, so every earlier version of a preset stays readable.
+``index.json`` holds the byte offset of each preset version, so loading
+one is a seek and a single line read whatever the size of the log. The
+index also records how much of the log it covers; records beyond that
+(from a crash or another process) are picked up by scanning the tail.
+
+Writes go through a background thread so the Simulation's frame loop
+never waits for the disk. The store lives in
+~/.local/share/interstellar_intelligence/scenarios unless the
+SIM_SCENARIO_STORE environment variable points elsewhere.
+
+    python scenario_store.py
+    python scenario_store.py --preset saved --version 0
+    python scenario_store.py --history 20
+"""
+
+import argparse
+import json
+import os
+import queue
+import tempfile
+import threading
+import time
+import traceback
+
+import batch_equations
+
+# Bump when the record or index layout changes
+STORE_FORMAT = 1
+LOG_FILE = "scenarios.jsonl"
+INDEX_FILE = "index.json"
+DEFAULT_PRESET = "saved"  # Loaded by the Simulation on start
+
+
+def get_store_dir():
+    default = os.path.join(os.path.expanduser("~"), ".local", "share", "interstellar_intelligence", "scenarios")
+    return os.environ.get("SIM_SCENARIO_STORE", default)
+
+
+def _variables(record):
+    """
+    Slider settings of a record, checked against the model's inputs.
+    """
+    try:
+        return {name: float(record["variables"][name]) for name in batch_equations.INPUT_NAMES}
+    except (KeyError, TypeError, ValueError):
+        raise ValueError(f"Malformed scenario record: {record}") from None
+
+
+class ScenarioStore:
+    """
+    Presets and slider history in a directory. ``save_preset`` and
+    ``record`` queue the write and return at once; ``flush`` waits for the
+    queue to drain and ``close`` also stops the writer thread. A failed
+    write drops its presets from the store and is raised by the next
+    ``flush``.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or get_store_dir()
+        os.makedirs(self.directory, exist_ok=True)
+        self.log_path = os.path.join(self.directory, LOG_FILE)
+        self.index_path = os.path.join(self.directory, INDEX_FILE)
+        self.lock = threading.Lock()  # Guards presets, unwritten, log_size and error
+        self.presets = {}  # Name -> [(offset, time)] of each version, oldest first
+        self.unwritten = {}  # Name -> variables of versions still in the queue
+        self.log_size = 0
+        self.error = None  # First write failure since the last flush
+        self._load_index()
+        self._catch_up()
+
+        self.queue = queue.Queue()
+        self.writer = threading.Thread(target=self._write_loop, name="scenario-writer", daemon=True)
+        self.writer.start()
+
+    def _load_index(self):
+        try:
+            with open(self.index_path) as file:
+                index = json.load(file)
+        except (OSError, ValueError):
+            return
+        if index.get("format") != STORE_FORMAT:
+            return
+        log_size = os.path.getsize(self.log_path) if os.path.exists(self.log_path) else 0
+        if index["log_size"] > log_size:
+            return  # The log was replaced; rebuild from scratch
+        self.presets = {name: [tuple(entry) for entry in versions] for name, versions in index["presets"].items()}
+        self.log_size = index["log_size"]
+
+    def _catch_up(self):
+        """
+        Indexes records past ``log_size``; only whole lines are consumed.
+        """
+        if not os.path.exists(self.log_path):
+            return
+        with open(self.log_path, "rb") as file:
+            file.seek(self.log_size)
+            offset = self.log_size
+            for line in file:
+                if not line.endswith(b"\n"):
+                    break  # Partly written; its writer will finish it
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    record = {}  # A torn line left by a crash
+                if record.get("kind") == "preset":
+                    self.presets.setdefault(record["name"], []).append((offset, record["time"]))
+                offset += len(line)
+            self.log_size = offset
+
+    def _write_index(self):
+        index = {"format": STORE_FORMAT, "log_size": self.log_size, "presets": self.presets}
+        # Replace atomically so readers never see a partial index
+        fd, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as file:
+            json.dump(index, file)
+        os.replace(temporary, self.index_path)
+
+    def _write_loop(self):
+        while True:
+            batch = [self.queue.get()]
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            records = [record for record in batch if record is not None]
+            try:
+                if records:
+                    self._append(records)
+            except Exception as error:
+                # Keep the thread alive; the next write retries the index
+                traceback.print_exc()
+                self._drop_unwritten(records, error)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+            if None in batch:
+                return
+
+    def _drop_unwritten(self, records, error):
+        """
+        Forgets the preset versions of a failed write that did not reach
+        the log, so the store does not serve them as if they were saved.
+        """
+        with self.lock:
+            for record in records:
+                pending = self.unwritten.get(record.get("name"))
+                if record["kind"] != "preset" or not pending:
+                    continue
+                pending[:] = [variables for variables in pending if variables is not record["variables"]]
+                if not pending:
+                    del self.unwritten[record["name"]]
+            if self.error is None:
+                self.error = error
+
+    def _append(self, records):
+        with self.lock:
+            self._catch_up()  # Records other processes added since
+            with open(self.log_path, "ab") as file:
+                file.seek(0, os.SEEK_END)
+                self.log_size = file.tell()
+                for record in records:
+                    line = (json.dumps(record) + "\n").encode()
+                    file.write(line)
+                    if record["kind"] == "preset":
+                        self.presets.setdefault(record["name"], []).append((self.log_size, record["time"]))
+                        pending = self.unwritten.get(record["name"])
+                        if pending:
+                            pending.pop(0)
+                            if not pending:
+                                del self.unwritten[record["name"]]
+                    self.log_size += len(line)
+            self._write_index()
+
+    def _queue(self, kind, variables, **fields):
+        record = {"kind": kind, "time": time.time(), **fields, "variables": _variables({"variables": variables})}
+        self.queue.put(record)
+        return record
+
+    def save_preset(self, name, variables):
+        """
+        Saves ``variables`` as the newest version of preset ``name``.
+        """
+        with self.lock:
+            record = self._queue("preset", variables, name=name)
+            self.unwritten.setdefault(name, []).append(record["variables"])
+
+    def record(self, variables):
+        """
+        Appends a slider state to the history.
+        """
+        self._queue("change", variables)
+
+    def names(self):
+        with self.lock:
+            return sorted(set(self.presets) | set(self.unwritten))
+
+    def versions(self, name):
+        """
+        Returns:
+            int: how many versions of the preset exist, 0 if none
+        """
+        with self.lock:
+            return len(self.presets.get(name, ())) + len(self.unwritten.get(name, ()))
+
+    def load(self, name, version=-1):
+        """
+        Slider settings of one version of a preset, the newest by default.
+
+        Raises:
+            KeyError: if the preset or version does not exist
+        """
+        with self.lock:
+            written = self.presets.get(name, [])
+            versions = len(written) + len(self.unwritten.get(name, ()))
+            if not -versions <= version < versions:
+                raise KeyError(f"No version {version} of preset {name!r}")
+            version %= versions
+            if version >= len(written):
+                return dict(self.unwritten[name][version - len(written)])
+            offset = written[version][0]
+        with open(self.log_path, "rb") as file:
+            file.seek(offset)
+            return _variables(json.loads(file.readline()))
+
+    def history(self, limit=None):
+        """
+        Returns:
+            list: (time, variables) of the written slider changes, oldest
+            first, the last ``limit`` only if given
+        """
+        changes = []
+        if os.path.exists(self.log_path):
+            with open(self.log_path, "rb") as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if record.get("kind") == "change":
+                        changes.append((record["time"], _variables(record)))
+        return changes[-limit:] if limit else changes
+
+    def flush(self):
+        """
+        Blocks until every queued write is on disk.
+
+        Raises:
+            Exception: the first write failure since the last flush
+        """
+        self.queue.join()
+        with self.lock:
+            error, self.error = self.error, None
+        if error is not None:
+            raise error
+
+    def close(self):
+        self.queue.put(None)
+        self.writer.join()
+
+
+def format_variables(variables):
+    return ", ".join(f"{name}={value:g}" for name, value in variables.items())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List and show saved scenarios.")
+    parser.add_argument("--store", help=f"store directory (default: {get_store_dir()})")
+    parser.add_argument("--preset", help="show this preset")
+    parser.add_argument("--version", type=int, default=-1, help="version of --preset, 0 first, -1 newest")
+    parser.add_argument("--history", type=int, metavar="N", help="show the last N slider changes")
+    args = parser.parse_args()
+
+    store = ScenarioStore(args.store)
+    try:
+        if args.preset:
+            try:
+                print(format_variables(store.load(args.preset, args.version)))
+            except KeyError as error:
+                parser.error(error.args[0])
+        elif args.history is not None:
+            for stamp, variables in store.history(args.history):
+                print(time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(stamp)), format_variables(variables))
+        else:
+            for name in store.names():
+                print(f"{name} ({store.versions(name)} versions): {format_variables(store.load(name))}")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+"""
+Per-point NumPy evaluation of OpenSimplex noise.
+
+OpenSimplex.noise2array/noise3array only sample the Cartesian product of
+their coordinate axes and, without numba, loop over it in Python. The
+sphere and the rotating globe need noise at arbitrary points, so these
+functions evaluate the same lattice for whole arrays of points at once.
+They reuse the generator's permutation tables and gradients, and they pick
+the same contributing vertices as opensimplex's scalar code. Results match
+OpenSimplex.noise2/noise3 to within floating point summation order
+(test_simplex_arrays.py checks this).
+
+The permutation tables are private attributes of opensimplex 0.4. If a
+later version moves them, both functions warn once and fall back to the
+scalar methods point by point: slow, but the same noise.
+"""
+
+import warnings
+
+import numpy as np
+from opensimplex.constants import (
+    GRADIENTS2,
+    GRADIENTS3,
+    NORM_CONSTANT2,
+    NORM_CONSTANT3,
+    SQUISH_CONSTANT2,
+    SQUISH_CONSTANT3,
+    STRETCH_CONSTANT2,
+    STRETCH_CONSTANT3,
+)
+
+
+def _tables(simplex):
+    """
+    Permutation tables of a generator, or None if this opensimplex version
+    does not expose them as 0.4 does.
+    """
+    try:
+        return simplex._perm, simplex._perm_grad_index3
+    except AttributeError:
+        pass
+    try:
+        from opensimplex.internals import _init
+        return _init(simplex.get_seed())
+    except (ImportError, AttributeError):
+        warnings.warn("opensimplex internals not found; simplex_arrays falls back to scalar noise",
+                      RuntimeWarning, stacklevel=3)
+        return None
+
+
+def _scalar_fallback(method, *coordinates):
+    coordinates = np.broadcast_arrays(*(np.asarray(v, dtype=np.float64) for v in coordinates))
+    return np.vectorize(method, otypes=[np.float64])(*coordinates)
+
+
+def _contribution2(perm, xsb, ysb, dx0, dy0, ox, oy):
+    """
+    Contribution of lattice vertex (xsb + ox, ysb + oy) to the noise value.
+    """
+    dx = dx0 - ox - (ox + oy) * SQUISH_CONSTANT2
+    dy = dy0 - oy - (ox + oy) * SQUISH_CONSTANT2
+    attn = 2 - dx * dx - dy * dy
+    index = perm[(perm[(xsb + ox) & 0xFF] + ysb + oy) & 0xFF] & 0x0E
+    extrapolation = GRADIENTS2[index] * dx + GRADIENTS2[index + 1] * dy
+    attn = np.maximum(attn, 0)
+    attn *= attn
+    return attn * attn * extrapolation
+
+
+def _contribution3(perm, perm_grad_index3, xsb, ysb, zsb, dx0, dy0, dz0, ox, oy, oz):
+    squish = (ox + oy + oz) * SQUISH_CONSTANT3
+    dx = dx0 - ox - squish
+    dy = dy0 - oy - squish
+    dz = dz0 - oz - squish
+    attn = 2 - dx * dx - dy * dy - dz * dz
+    index = perm_grad_index3[(perm[(perm[(xsb + ox) & 0xFF] + ysb + oy) & 0xFF] + zsb + oz) & 0xFF]
+    extrapolation = GRADIENTS3[index] * dx + GRADIENTS3[index + 1] * dy + GRADIENTS3[index + 2] * dz
+    attn = np.maximum(attn, 0)
+    attn *= attn
+    return attn * attn * extrapolation
+
+
+def noise2(simplex, x, y):
+    """
+    2D OpenSimplex noise for every point (x[i], y[i]).
+
+    Args:
+        simplex (OpenSimplex): generator providing the permutation table
+        x, y (array-like): coordinates, broadcast against each other
+
+    Returns:
+        numpy.ndarray: noise values in [-1, 1] with the broadcast shape
+    """
+    tables = _tables(simplex)
+    if tables is None:
+        return _scalar_fallback(simplex.noise2, x, y)
+    perm = tables[0]
+    x, y = np.broadcast_arrays(np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64))
+
+    stretch_offset = (x + y) * STRETCH_CONSTANT2
+    xs = x + stretch_offset
+    ys = y + stretch_offset
+    xsb = np.floor(xs).astype(np.int64)
+    ysb = np.floor(ys).astype(np.int64)
+    squish_offset = (xsb + ysb) * SQUISH_CONSTANT2
+    dx0 = x - (xsb + squish_offset)
+    dy0 = y - (ysb + squish_offset)
+    xins = xs - xsb
+    yins = ys - ysb
+    in_sum = xins + yins
+
+    lower = in_sum <= 1
+    zins = np.where(lower, 1 - in_sum, 2 - in_sum)
+
+    # The extra vertex depends on which corner of the rhombus is closest
+    near_axis = np.where(lower, (zins > xins) | (zins > yins), (zins < xins) | (zins < yins))
+    x_major = xins > yins
+    ext_x = np.where(lower, np.where(near_axis, np.where(x_major, 1, -1), 1), np.where(near_axis, np.where(x_major, 2, 0), 0))
+    ext_y = np.where(lower, np.where(near_axis, np.where(x_major, -1, 1), 1), np.where(near_axis, np.where(x_major, 0, 2), 0))
+    base = np.where(lower, 0, 1)
+
+    value = _contribution2(perm, xsb, ysb, dx0, dy0, 1, 0)
+    value += _contribution2(perm, xsb, ysb, dx0, dy0, 0, 1)
+    value += _contribution2(perm, xsb, ysb, dx0, dy0, base, base)
+    value += _contribution2(perm, xsb, ysb, dx0, dy0, ext_x, ext_y)
+    return value / NORM_CONSTANT2
+
+
+def _axis_bits(c):
+    return (c & 0x01) != 0, (c & 0x02) != 0, (c & 0x04) != 0
+
+
+def _extra_vertices3(xins, yins, zins, in_sum):
+    """
+    Lattice offsets of the two extra vertices opensimplex adds to the
+    simplex containing each point, as two (ox, oy, oz) tuples of int arrays.
+    """
+    shape = xins.shape
+    ext0 = [np.zeros(shape, dtype=np.int64) for _ in range(3)]
+    ext1 = [np.zeros(shape, dtype=np.int64) for _ in range(3)]
+
+    def assign(mask, offsets0, offsets1):
+        for axis in range(3):
+            ext0[axis][mask] = np.broadcast_to(offsets0[axis], shape)[mask]
+            ext1[axis][mask] = np.broadcast_to(offsets1[axis], shape)[mask]
+
+    region1 = in_sum <= 1
+    region2 = ~region1 & (in_sum >= 2)
+    region3 = ~region1 & ~region2
+
+    # Tetrahedron at (0,0,0): closest two of (1,0,0), (0,1,0), (0,0,1)
+    a_point = np.full(shape, 0x01)
+    a_score = xins.copy()
+    b_point = np.full(shape, 0x02)
+    b_score = yins.copy()
+    swap_b = (a_score >= b_score) & (zins > b_score)
+    swap_a = ~swap_b & (a_score < b_score) & (zins > a_score)
+    b_score[swap_b], b_point[swap_b] = zins[swap_b], 0x04
+    a_score[swap_a], a_point[swap_a] = zins[swap_a], 0x04
+
+    wins = 1 - in_sum
+    origin_close = (wins > a_score) | (wins > b_score)
+    c = np.where(b_score > a_score, b_point, a_point)
+    cx, cy, cz = _axis_bits(c)
+    offsets0 = (
+        np.where(cx, 1, -1),
+        np.where(cy, 1, np.where(cx, -1, 0)),
+        np.where(cz, 1, 0),
+    )
+    offsets1 = (
+        np.where(cx, 1, 0),
+        np.where(cy, 1, np.where(cx, 0, -1)),
+        np.where(cz, 1, -1),
+    )
+    assign(region1 & origin_close, offsets0, offsets1)
+
+    cx, cy, cz = _axis_bits(a_point | b_point)
+    assign(
+        region1 & ~origin_close,
+        (cx.astype(np.int64), cy.astype(np.int64), cz.astype(np.int64)),
+        (np.where(cx, 1, -1), np.where(cy, 1, -1), np.where(cz, 1, -1)),
+    )
+
+    # Tetrahedron at (1,1,1): closest two of (1,1,0), (1,0,1), (0,1,1)
+    a_point = np.full(shape, 0x06)
+    a_score = xins.copy()
+    b_point = np.full(shape, 0x05)
+    b_score = yins.copy()
+    swap_b = (a_score <= b_score) & (zins < b_score)
+    swap_a = ~swap_b & (a_score > b_score) & (zins < a_score)
+    b_score[swap_b], b_point[swap_b] = zins[swap_b], 0x03
+    a_score[swap_a], a_point[swap_a] = zins[swap_a], 0x03
+
+    wins = 3 - in_sum
+    corner_close = (wins < a_score) | (wins < b_score)
+    c = np.where(b_score < a_score, b_point, a_point)
+    cx, cy, cz = _axis_bits(c)
+    offsets0 = (
+        np.where(cx, 2, 0),
+        np.where(cy, np.where(cx, 1, 2), 0),
+        np.where(cz, 1, 0),
+    )
+    offsets1 = (
+        np.where(cx, 1, 0),
+        np.where(cy, np.where(cx, 2, 1), 0),
+        np.where(cz, 2, 0),
+    )
+    assign(region2 & corner_close, offsets0, offsets1)
+
+    cx, cy, cz = _axis_bits(a_point & b_point)
+    assign(
+        region2 & ~corner_close,
+        (cx.astype(np.int64), cy.astype(np.int64), cz.astype(np.int64)),
+        (np.where(cx, 2, 0), np.where(cy, 2, 0), np.where(cz, 2, 0)),
+    )
+
+    # Octahedron in between
+    p1 = xins + yins
+    a_far = p1 > 1
+    a_score = np.where(a_far, p1 - 1, 1 - p1)
+    a_point = np.where(a_far, 0x03, 0x04)
+    p2 = xins + zins
+    b_far = p2 > 1
+    b_score = np.where(b_far, p2 - 1, 1 - p2)
+    b_point = np.where(b_far, 0x05, 0x02)
+
+    p3 = yins + zins
+    far3 = p3 > 1
+    score = np.where(far3, p3 - 1, 1 - p3)
+    replace_a = (a_score <= b_score) & (a_score < score)
+    replace_b = ~replace_a & (a_score > b_score) & (b_score < score)
+    a_point = np.where(replace_a, np.where(far3, 0x06, 0x01), a_point)
+    a_far = np.where(replace_a, far3, a_far)
+    b_point = np.where(replace_b, np.where(far3, 0x06, 0x01), b_point)
+    b_far = np.where(replace_b, far3, b_far)
+
+    same_side = a_far == b_far
+    zero = np.zeros(shape, dtype=np.int64)
+    one = np.ones(shape, dtype=np.int64)
+
+    # Both closest points on the (1,1,1) side: (1,1,1) plus 2 along the shared axis
+    cx, cy, _ = _axis_bits(a_point & b_point)
+    assign(
+        region3 & same_side & a_far,
+        (one, one, one),
+        (np.where(cx, 2, 0), np.where(~cx & cy, 2, 0), np.where(~cx & ~cy, 2, 0)),
+    )
+
+    # Both on the (0,0,0) side: (0,0,0) plus a permutation of (1,1,-1) on the omitted axis
+    cx, cy, _ = _axis_bits(a_point | b_point)
+    assign(
+        region3 & same_side & ~a_far,
+        (zero, zero, zero),
+        (np.where(~cx, -1, 1), np.where(cx & ~cy, -1, 1), np.where(cx & cy, -1, 1)),
+    )
+
+    # One on each side
+    c1 = np.where(a_far, a_point, b_point)
+    c2 = np.where(a_far, b_point, a_point)
+    c1x, c1y, _ = _axis_bits(c1)
+    c2x, c2y, _ = _axis_bits(c2)
+    assign(
+        region3 & ~same_side,
+        (np.where(~c1x, -1, 1), np.where(c1x & ~c1y, -1, 1), np.where(c1x & c1y, -1, 1)),
+        (np.where(c2x, 2, 0), np.where(~c2x & c2y, 2, 0), np.where(~c2x & ~c2y, 2, 0)),
+    )
+
+    return tuple(ext0), tuple(ext1)
+
+
+# Vertices of the unit cube each simplex region always evaluates
+_REGION_VERTICES3 = [
+    ((0, 0, 0), (1, 0, 0), (0, 1, 0), (0, 0, 1)),
+    ((1, 1, 0), (1, 0, 1), (0, 1, 1), (1, 1, 1)),
+    ((1, 0, 0), (0, 1, 0), (0, 0, 1), (1, 1, 0), (1, 0, 1), (0, 1, 1)),
+]
+
+
+def noise3(simplex, x, y, z):
+    """
+    3D OpenSimplex noise for every point (x[i], y[i], z[i]).
+
+    Args:
+        simplex (OpenSimplex): generator providing the permutation tables
+        x, y, z (array-like): coordinates, broadcast against each other
+
+    Returns:
+        numpy.ndarray: noise values in [-1, 1] with the broadcast shape
+    """
+    tables = _tables(simplex)
+    if tables is None:
+        return _scalar_fallback(simplex.noise3, x, y, z)
+    perm, perm_grad_index3 = tables
+    x, y, z = np.broadcast_arrays(*(np.asarray(v, dtype=np.float64) for v in (x, y, z)))
+
+    stretch_offset = (x + y + z) * STRETCH_CONSTANT3
+    xs = x + stretch_offset
+    ys = y + stretch_offset
+    zs = z + stretch_offset
+    xsb = np.floor(xs).astype(np.int64)
+    ysb = np.floor(ys).astype(np.int64)
+    zsb = np.floor(zs).astype(np.int64)
+    squish_offset = (xsb + ysb + zsb) * SQUISH_CONSTANT3
+    dx0 = x - (xsb + squish_offset)
+    dy0 = y - (ysb + squish_offset)
+    dz0 = z - (zsb + squish_offset)
+    xins = xs - xsb
+    yins = ys - ysb
+    zins = zs - zsb
+    in_sum = xins + yins + zins
+
+    region1 = in_sum <= 1
+    region2 = ~region1 & (in_sum >= 2)
+    region3 = ~region1 & ~region2
+
+    cube = (xsb, ysb, zsb, dx0, dy0, dz0)
+    value = np.zeros(x.shape, dtype=np.float64)
+    for region, vertices in zip((region1, region2, region3), _REGION_VERTICES3):
+        for ox, oy, oz in vertices:
+            value += np.where(region, _contribution3(perm, perm_grad_index3, *cube, ox, oy, oz), 0)
+
+    ext0, ext1 = _extra_vertices3(xins, yins, zins, in_sum)
+    value += _contribution3(perm, perm_grad_index3, *cube, *ext0)
+    value += _contribution3(perm, perm_grad_index3, *cube, *ext1)
+    return value / NORM_CONSTANT3
@@ -0,0 +1,109 @@
+import equations
+
+# Independent variables (sliders)
+DEFAULT_VARIABLES = {
+    "solar_intensity": 0,
+    "humidity": 50,
+    "wind_speed": 10,
+    "population": 1000,
+}
+
+# Rotation in revolutions per second. Clouds turn faster with the wind.
+ROTATION_SPEED = 1 / 90
+CLOUD_DRIFT = 0.0005  # Extra revolutions per second per m/s of wind
+
+PLAYBACK_SPEED = 5.0  # Years of a played trajectory per second
+
+
+class Simulation:
+    """
+    State of the planet model: the slider variables, the dependent
+    variables computed from them and the rotation of the globe and its
+    clouds. Has no pygame dependency, so it can be driven from scripts.
+
+    A dynamics.Trajectory can be played back: its drivers set the sliders,
+    its population moves the population slider and its other states
+    replace the matching dependent variables as playback time advances.
+    """
+
+    def __init__(self, variables=None):
+        self.variables = dict(DEFAULT_VARIABLES if variables is None else variables)
+        self.dependent_variables = {}
+        self.variables_state = None
+        self.planet_rotation = 0.0
+        self.cloud_rotation = 0.0
+        self.trajectory = None
+        self.trajectory_time = 0.0
+        self.trajectory_values = {}
+        self.update()
+
+    def set_variable(self, name, value):
+        self.variables[name] = max(0, min(100, value))
+
+    def reset(self):
+        self.variables = dict(DEFAULT_VARIABLES)
+        self.stop_trajectory()
+
+    def play_trajectory(self, trajectory):
+        """
+        Starts playing ``trajectory`` from its first state, looping at the end.
+        """
+        self.trajectory = trajectory
+        self.trajectory_time = float(trajectory.times[0])
+        for name, value in zip(("solar_intensity", "humidity", "wind_speed"), trajectory.drivers):
+            self.set_variable(name, float(value))
+        self._apply_trajectory()
+
+    def stop_trajectory(self):
+        self.trajectory = None
+        self.trajectory_values = {}
+
+    def _apply_trajectory(self):
+        values = self.trajectory.at(self.trajectory_time)
+        self.set_variable("population", values.pop("Population"))
+        self.trajectory_values = values
+
+    def update(self):
+        """
+        Recomputes the dependent variables if any slider changed.
+
+        Returns:
+            bool: True if they were recomputed
+        """
+        state = (tuple(self.variables.items()), tuple(self.trajectory_values.values()))
+        if state == self.variables_state:
+            return False
+        self.variables_state = state
+        self.dependent_variables = equations.calculate_dependent_variables(self.variables)
+        self.dependent_variables.update(self.trajectory_values)
+        return True
+
+    def step(self, dt):
+        """
+        Advances the rotation, and any trajectory being played, by ``dt``
+        seconds.
+        """
+        self.planet_rotation = (self.planet_rotation + ROTATION_SPEED * dt) % 1
+        cloud_drift = self.variables["wind_speed"] * CLOUD_DRIFT  # Wind effect
+        self.cloud_rotation = (self.cloud_rotation + (ROTATION_SPEED + cloud_drift) * dt) % 1
+        if self.trajectory is not None:
+            start, end = self.trajectory.times[0], self.trajectory.times[-1]
+            elapsed = self.trajectory_time - start + PLAYBACK_SPEED * dt
+            self.trajectory_time = start + (elapsed % (end - start) if end > start else 0.0)
+            self._apply_trajectory()
+
+    @property
+    def plants_density(self):
+        return max(0, min(100, self.dependent_variables.get("Plants Density")))
+
+    @property
+    def rainfall_area(self):
+        return self.dependent_variables.get("Rainfall Area")
+
+    @property
+    def asi(self):
+        return self.dependent_variables.get("ASI")
+
+    @property
+    def cloud_density(self):
+        return int(self.dependent_variables.get("Cloud Density"))
@@ -0,0 +1,189 @@
+"""
+Global sensitivity of every output to the four sliders (Sobol indices).
+
+Uses Saltelli's scheme: two independent sample matrices A and B over the
+slider ranges plus, for each input i, A with column i taken from B. That
+is samples * (inputs + 2) model runs, all in one batch_equations call.
+First-order indices use the Saltelli (2010) estimator, total indices
+Jansen's. Bootstrap confidence intervals resample the rows with a
+matrix product per block of replicates rather than re-evaluating the model.
+
+The indices are for the unrounded outputs over uniform sliders.
+
+    python sobol.py --samples 65536 --bootstrap 200
+"""
+
+import argparse
+
+import numpy as np
+
+import batch_equations
+
+SAMPLES = 65536
+BOOTSTRAP = 200
+CONFIDENCE = 0.95
+BOOTSTRAP_BLOCK = 25  # Replicates per matrix product
+
+
+def evaluate(points):
+    """
+    Returns:
+        np.ndarray: (n, outputs) model values at (n, inputs) points
+    """
+    outputs = batch_equations.calculate_dependent_variables(dict(zip(batch_equations.INPUT_NAMES, points.T)))
+    return np.stack([outputs[name] for name in batch_equations.OUTPUT_NAMES], axis=1)
+
+
+def saltelli_terms(samples, seed=0):
+    """
+    Evaluates the Saltelli design and returns the per-row terms whose
+    means give the indices.
+
+    Returns:
+        np.ndarray: (samples, 2 * inputs + 2, outputs) array; rows hold
+        the first-order numerators, the total-effect numerators, then the
+        sum and sum of squares of f(A) and f(B)
+    """
+    rng = np.random.default_rng(seed)
+    low = np.array([batch_equations.INPUT_RANGES[name][0] for name in batch_equations.INPUT_NAMES])
+    high = np.array([batch_equations.INPUT_RANGES[name][1] for name in batch_equations.INPUT_NAMES])
+    inputs = len(low)
+    a = rng.uniform(low, high, (samples, inputs))
+    b = rng.uniform(low, high, (samples, inputs))
+    mixed = np.repeat(a[None], inputs, axis=0)
+    for i in range(inputs):
+        mixed[i, :, i] = b[:, i]
+
+    values = evaluate(np.concatenate([a, b, mixed.reshape(-1, inputs)]))
+    # Centring leaves the indices unchanged but keeps the first-order
+    # estimator from drowning in the product of large means
+    values -= values[:2 * samples].mean(axis=0)
+    f_a, f_b = values[:samples], values[samples:2 * samples]
+    f_mixed = values[2 * samples:].reshape(inputs, samples, -1)
+
+    first = f_b[None] * (f_mixed - f_a[None])  # Saltelli 2010
+    total = 0.5 * (f_a[None] - f_mixed) ** 2  # Jansen 1999
+    moments = np.stack([f_a + f_b, f_a * f_a + f_b * f_b])
+    return np.concatenate([first, total, moments]).transpose(1, 0, 2)
+
+
+def indices_from_means(means, inputs):
+    """
+    Args:
+        means (np.ndarray): (..., 2 * inputs + 2, outputs) row means of
+            saltelli_terms
+
+    Returns:
+        tuple: (first, total) arrays of shape (..., inputs, outputs); NaN
+        for outputs that do not vary
+    """
+    mean = means[..., 2 * inputs, :] / 2
+    variance = means[..., 2 * inputs + 1, :] / 2 - mean * mean
+    variance = np.where(variance > 0, variance, np.nan)[..., None, :]
+    return means[..., :inputs, :] / variance, means[..., inputs:2 * inputs, :] / variance
+
+
+class SobolResult:
+    """
+    First-order and total Sobol indices with bootstrap intervals, each an
+    (inputs, outputs) array in INPUT_NAMES x OUTPUT_NAMES order; the
+    intervals add a last axis of (low, high).
+    """
+
+    def __init__(self, first, total, first_interval, total_interval, samples):
+        self.first = first
+        self.total = total
+        self.first_interval = first_interval
+        self.total_interval = total_interval
+        self.samples = samples
+
+    def for_output(self, name):
+        """
+        Returns:
+            dict: input name -> {"first", "total", "first_interval", "total_interval"}
+        """
+        j = batch_equations.OUTPUT_NAMES.index(name)
+        return {
+            input_name: {
+                "first": float(self.first[i, j]),
+                "total": float(self.total[i, j]),
+                "first_interval": tuple(self.first_interval[i, j].tolist()),
+                "total_interval": tuple(self.total_interval[i, j].tolist()),
+            }
+            for i, input_name in enumerate(batch_equations.INPUT_NAMES)
+        }
+
+    def table(self):
+        """
+        Returns:
+            list: text lines, one per output, of first / total indices
+        """
+        header = "".join(f"{name:>24}" for name in batch_equations.INPUT_NAMES)
+        lines = [f"{'':<22}{header}"]
+        for j, name in enumerate(batch_equations.OUTPUT_NAMES):
+            cells = "".join(
+                f"{self.first[i, j]:>11.3f} / {self.total[i, j]:<10.3f}" for i in range(len(batch_equations.INPUT_NAMES))
+            )
+            lines.append(f"{name:<22}{cells}")
+        return lines
+
+
+def analyze(samples=SAMPLES, bootstrap=BOOTSTRAP, confidence=CONFIDENCE, seed=0):
+    """
+    Computes first-order and total indices of every output.
+
+    Args:
+        samples (int): rows of each Saltelli matrix; the model runs
+            samples * (inputs + 2) times
+        bootstrap (int): bootstrap replicates for the intervals, 0 for none
+        confidence (float): coverage of the intervals
+
+    Returns:
+        SobolResult
+    """
+    inputs = len(batch_equations.INPUT_NAMES)
+    terms = saltelli_terms(samples, seed)
+    flat = terms.reshape(samples, -1)
+    first, total = indices_from_means(terms.mean(axis=0), inputs)
+
+    # A bootstrap replicate weights each row by how often it was drawn, so
+    # a block of replicates is one (replicates x samples) @ (samples x terms)
+    rng = np.random.default_rng(seed + 1)
+    replicates = []
+    for start in range(0, bootstrap, BOOTSTRAP_BLOCK):
+        block = min(BOOTSTRAP_BLOCK, bootstrap - start)
+        counts = np.stack([np.bincount(rng.integers(0, samples, samples), minlength=samples) for _ in range(block)])
+        replicates.append((counts @ flat / samples).reshape((block,) + terms.shape[1:]))
+
+    if replicates:
+        first_boot, total_boot = indices_from_means(np.concatenate(replicates), inputs)
+        tails = [100 * (1 - confidence) / 2, 100 * (1 + confidence) / 2]
+        first_interval = np.moveaxis(np.nanpercentile(first_boot, tails, axis=0), 0, -1)
+        total_interval = np.moveaxis(np.nanpercentile(total_boot, tails, axis=0), 0, -1)
+    else:
+        first_interval = np.stack([first, first], axis=-1)
+        total_interval = np.stack([total, total], axis=-1)
+    return SobolResult(first, total, first_interval, total_interval, samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sobol sensitivity indices of every output.")
+    parser.add_argument("--samples", type=int, default=SAMPLES, help="rows per Saltelli matrix")
+    parser.add_argument("--bootstrap", type=int, default=BOOTSTRAP, help="bootstrap replicates")
+    parser.add_argument("--confidence", type=float, default=CONFIDENCE)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="show the intervals of one output")
+    args = parser.parse_args()
+
+    result = analyze(args.samples, args.bootstrap, args.confidence, args.seed)
+    print(f"First-order / total indices from {args.samples * (len(batch_equations.INPUT_NAMES) + 2)} model runs")
+    print("\n".join(result.table()))
+    if args.output:
+        for name, entry in result.for_output(args.output).items():
+            print(f"{name:<16} first {entry['first']:.3f} [{entry['first_interval'][0]:.3f}, "
+                  f"{entry['first_interval'][1]:.3f}]  total {entry['total']:.3f} "
+                  f"[{entry['total_interval'][0]:.3f}, {entry['total_interval'][1]:.3f}]")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import numpy as np
+import pygame
+
+# Parallax layers, far to near: scroll speed in pixels per 30 FPS frame and
+# star brightness. A star's random speed picks its layer.
+LAYER_SPEEDS = np.array([0.5, 1.0, 2.0], dtype=np.float32)
+LAYER_BRIGHTNESS = (110, 180, 255)
+LAYER_EDGES = [1.0, 1.5]
+SIZES = (1, 2, 3)
+# Dirty rects are merged per square cell of this many pixels, so their
+# number is bounded by the cell count rather than the star count
+DIRTY_CELL = 64
+
+
+def render_sprite(size, brightness):
+    side = 2 * size + 1
+    sprite = pygame.Surface((side, side))
+    sprite.set_colorkey((0, 0, 0))
+    pygame.draw.circle(sprite, (brightness,) * 3, (size, size), size)
+    return sprite
+
+
+class StarField:
+    """
+    Scrolling star field kept in NumPy arrays.
+
+    Stars are split into parallax layers by speed: distant layers are dim
+    and slow, near ones bright and fast. Every frame moves and twinkles all
+    stars in a few array operations and draws them with one ``blits`` call
+    per layer and size from pre-rendered sprites. The areas to update are
+    the stars' old and new boxes merged per DIRTY_CELL square, a few hundred
+    rects at most however many stars there are.
+    """
+
+    def __init__(self, width, height, count=600, twinkle_rate=0.08, seed=None):
+        rng = np.random.default_rng(seed)
+        self.rng = rng
+        self.width = width
+        self.height = height
+        self.twinkle_rate = twinkle_rate
+
+        self.x = rng.uniform(0, width, count).astype(np.float32)
+        self.y = rng.integers(0, height, count)
+        self.layer = np.digitize(rng.uniform(0.5, 2, count), LAYER_EDGES)
+        self.speed = LAYER_SPEEDS[self.layer]
+        self.size = rng.integers(SIZES[0], SIZES[-1] + 1, count)
+
+        self.sprites = {
+            (layer, size): render_sprite(size, brightness)
+            for layer, brightness in enumerate(LAYER_BRIGHTNESS)
+            for size in SIZES
+        }
+        self.boxes = np.empty((0, 4), dtype=np.int64)  # (left, top, right, bottom) drawn last frame
+
+    def update(self, frame_scale):
+        """
+        Advances the field by ``frame_scale`` 30 FPS frames.
+        """
+        twinkling = self.rng.random(len(self.x)) < self.twinkle_rate * frame_scale
+        self.size[twinkling] = self.rng.integers(SIZES[0], SIZES[-1] + 1, twinkling.sum())
+        self.x = (self.x + self.speed * frame_scale) % self.width
+
+    def draw(self, surface):
+        """
+        Draws every star.
+
+        Returns:
+            list: rects covering the stars of the previous and this frame,
+            both of which need to reach the display
+        """
+        left = self.x.astype(np.int64) - self.size
+        top = self.y - self.size
+        for (layer, size), sprite in self.sprites.items():
+            members = np.flatnonzero((self.layer == layer) & (self.size == size))
+            if len(members):
+                positions = zip(left[members].tolist(), top[members].tolist())
+                surface.blits([(sprite, pos) for pos in positions], doreturn=False)
+
+        side = 2 * self.size + 1
+        boxes = np.stack([left, top, left + side, top + side], axis=1)
+        previous, self.boxes = self.boxes, boxes
+        return self.merge_boxes(np.concatenate([previous, boxes]))
+
+    def merge_boxes(self, boxes):
+        """
+        Bounding rect of the boxes in each DIRTY_CELL square, clipped to the
+        field.
+        """
+        left, top, right, bottom = np.clip(boxes, 0, [self.width, self.height] * 2).T
+        columns = -(-self.width // DIRTY_CELL)
+        cell = (top // DIRTY_CELL) * columns + np.minimum(left // DIRTY_CELL, columns - 1)
+        cells = (self.height // DIRTY_CELL + 1) * columns  # Row for boxes clipped to the bottom edge
+        low_x = np.full(cells, self.width)
+        low_y = np.full(cells, self.height)
+        high_x = np.zeros(cells, dtype=np.int64)
+        high_y = np.zeros(cells, dtype=np.int64)
+        np.minimum.at(low_x, cell, left)
+        np.minimum.at(low_y, cell, top)
+        np.maximum.at(high_x, cell, right)
+        np.maximum.at(high_y, cell, bottom)
+        used = np.flatnonzero((high_x > low_x) & (high_y > low_y))
+        return [pygame.Rect(x, y, w, h) for x, y, w, h in zip(
+            low_x[used].tolist(), low_y[used].tolist(),
+            (high_x - low_x)[used].tolist(), (high_y - low_y)[used].tolist())]
@@ -0,0 +1,282 @@
+"""
+Full-grid sweeps of the model over the four slider variables.
+
+The grid is the product of one evenly spaced axis per input, enumerated in
+C order (population varies fastest). It is streamed in fixed-size chunks
+of flat indices through batch_equations on a process pool; each chunk
+becomes one shard holding a column per output. No process ever holds more
+than one chunk, so memory is bounded by the chunk size whatever the grid.
+
+    python sweep.py out/ --steps 101 --chunk 1000000 --dtype float32
+
+``out/manifest.json`` describes the grid, columns and shards. Shards are
+written to a temporary name and renamed when complete, so an interrupted
+sweep resumes by running the same command again: finished shards are
+skipped.
+
+``--where "thirst < 1 and hunger < 1"`` skips the shards that interval
+bounds (see interval.py) prove cannot hold a point meeting the
+constraints; the shards that are written still hold every point.
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import batch_equations
+import interval
+
+MANIFEST = "manifest.json"
+FORMATS = ("npz", "npy")
+CHUNK_POINTS = 1_000_000
+
+
+def column_key(name):
+    """
+    File-safe column name, e.g. "Temperature (C)" -> "temperature_c".
+    """
+    return re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_")
+
+
+def make_axes(steps=101, ranges=None):
+    """
+    Evenly spaced values over each input's range.
+
+    Args:
+        steps (int or dict): points per axis, or input name -> points
+        ranges (dict): input name -> (low, high), by default the slider ranges
+
+    Returns:
+        dict: input name -> list of values
+    """
+    ranges = {**batch_equations.INPUT_RANGES, **(ranges or {})}
+    axes = {}
+    for name in batch_equations.INPUT_NAMES:
+        count = steps[name] if isinstance(steps, dict) else steps
+        low, high = ranges[name]
+        axes[name] = np.linspace(low, high, int(count)).tolist()
+    return axes
+
+
+def grid_points(axes, start, stop):
+    """
+    Input values of the flat grid indices [start, stop).
+
+    Returns:
+        dict: input name -> float64 array
+    """
+    return points_at(axes, np.arange(start, stop))
+
+
+def points_at(axes, indices):
+    """
+    Input values of an array of flat grid indices.
+
+    Returns:
+        dict: input name -> float64 array
+    """
+    shape = [len(axes[name]) for name in batch_equations.INPUT_NAMES]
+    unravelled = np.unravel_index(indices, shape)
+    return {
+        name: np.asarray(axes[name])[index]
+        for name, index in zip(batch_equations.INPUT_NAMES, unravelled)
+    }
+
+
+def index_bounds(axes, start, stop):
+    """
+    Corners of the smallest box of input values holding the grid points
+    [start, stop).
+
+    Returns:
+        tuple: (low, high) arrays in INPUT_NAMES order
+    """
+    shape = [len(axes[name]) for name in batch_equations.INPUT_NAMES]
+    first, last = np.unravel_index(start, shape), np.unravel_index(stop - 1, shape)
+    low, high = [], []
+    spread = False
+    for name, a, b in zip(batch_equations.INPUT_NAMES, first, last):
+        values = np.asarray(axes[name])
+        # Once an axis steps, every later axis runs through all its values
+        span = values if spread else values[a:b + 1]
+        low.append(span.min())
+        high.append(span.max())
+        spread = spread or a != b
+    return np.array(low), np.array(high)
+
+
+def shard_name(index, shard_format):
+    return f"shard_{index:06d}" + (".npz" if shard_format == "npz" else "")
+
+
+def build_manifest(axes, chunk, dtype, shard_format, constraints=None):
+    total = int(np.prod([len(values) for values in axes.values()]))
+    shards = -(-total // chunk)
+    manifest = {
+        "inputs": batch_equations.INPUT_NAMES,
+        "axes": axes,
+        "points": total,
+        "chunk": chunk,
+        "dtype": np.dtype(dtype).name,
+        "format": shard_format,
+        "columns": {column_key(name): name for name in batch_equations.OUTPUT_NAMES},
+        "shards": [
+            {"name": shard_name(i, shard_format), "start": i * chunk, "stop": min((i + 1) * chunk, total)}
+            for i in range(shards)
+        ],
+    }
+    if constraints:
+        manifest["where"] = [list(constraint) for constraint in constraints]
+        region = interval.feasible_region(constraints)
+        for shard in manifest["shards"]:
+            if not region.intersects(*index_bounds(axes, shard["start"], shard["stop"])):
+                shard["pruned"] = True
+    return manifest
+
+
+def write_shard(out_dir, manifest, shard):
+    """
+    Evaluates and writes one shard. Runs in a worker process.
+    """
+    points = grid_points(manifest["axes"], shard["start"], shard["stop"])
+    outputs = batch_equations.calculate_dependent_variables(points)
+    dtype = np.dtype(manifest["dtype"])
+    columns = {key: outputs[name].astype(dtype, copy=False) for key, name in manifest["columns"].items()}
+
+    path = os.path.join(out_dir, shard["name"])
+    partial = path + ".partial"
+    if manifest["format"] == "npz":
+        with open(partial, "wb") as file:
+            np.savez(file, **columns)
+    else:
+        os.makedirs(partial, exist_ok=True)
+        for key, values in columns.items():
+            np.save(os.path.join(partial, key + ".npy"), values)
+    os.replace(partial, path)
+    return shard["name"]
+
+
+def _write_shard_job(job):
+    return write_shard(*job)
+
+
+def load_manifest(out_dir):
+    with open(os.path.join(out_dir, MANIFEST)) as file:
+        return json.load(file)
+
+
+def run_sweep(out_dir, axes, chunk=CHUNK_POINTS, dtype=np.float64, shard_format="npz", workers=None,
+              constraints=None):
+    """
+    Runs a sweep into ``out_dir``, or resumes the one already there.
+
+    Args:
+        axes (dict): input name -> list of values, see make_axes
+        chunk (int): grid points per shard
+        dtype: float64, or float32 to halve disk and memory
+        shard_format (str): "npz" (one file per shard) or "npy" (one
+            directory per shard with a memory-mappable file per column)
+        workers (int): process count, by default one per CPU
+        constraints (list): (output, op, value) tuples; shards that cannot
+            hold a point meeting all of them are marked pruned and skipped
+
+    Returns:
+        dict: the manifest
+    """
+    if shard_format not in FORMATS:
+        raise ValueError(f"Unknown shard format: {shard_format}")
+    manifest = build_manifest(axes, chunk, dtype, shard_format, constraints)
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, MANIFEST)
+    if os.path.exists(manifest_path):
+        if load_manifest(out_dir) != manifest:
+            raise ValueError(f"{out_dir} holds a different sweep; use another directory")
+    else:
+        with open(manifest_path, "w") as file:
+            json.dump(manifest, file, indent=1)
+
+    pruned = sum(1 for shard in manifest["shards"] if shard.get("pruned"))
+    if pruned:
+        print(f"Skipping {pruned} of {len(manifest['shards'])} shards that cannot meet the constraints")
+    pending = [shard for shard in manifest["shards"]
+               if not shard.get("pruned") and not os.path.exists(os.path.join(out_dir, shard["name"]))]
+    done = len(manifest["shards"]) - pruned - len(pending)
+    if done:
+        print(f"Resuming: {done} of {len(manifest['shards']) - pruned} shards already written")
+
+    jobs = [(out_dir, manifest, shard) for shard in pending]
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+        for count, _ in enumerate(executor.map(_write_shard_job, jobs), 1):
+            if count % 10 == 0 or count == len(jobs):
+                elapsed = time.perf_counter() - start
+                print(f"{done + count}/{len(manifest['shards'])} shards, {elapsed:.1f} s")
+    return manifest
+
+
+def read_shard(out_dir, manifest, shard, columns=None, mmap=False):
+    """
+    Loads one shard.
+
+    Args:
+        columns (list): column keys to load, by default all
+        mmap (bool): memory-map the columns (npy shards only)
+
+    Returns:
+        dict: column key -> array
+    """
+    columns = columns or list(manifest["columns"])
+    path = os.path.join(out_dir, shard["name"])
+    if manifest["format"] == "npz":
+        with np.load(path) as data:
+            return {key: data[key] for key in columns}
+    mode = "r" if mmap else None
+    return {key: np.load(os.path.join(path, key + ".npy"), mmap_mode=mode) for key in columns}
+
+
+def iter_shards(out_dir, columns=None, with_inputs=False):
+    """
+    Yields (shard, columns) for every written shard in grid order, adding
+    the input values when ``with_inputs`` is set. Pruned shards are left out.
+    """
+    manifest = load_manifest(out_dir)
+    for shard in manifest["shards"]:
+        if shard.get("pruned") or not os.path.exists(os.path.join(out_dir, shard["name"])):
+            continue
+        data = read_shard(out_dir, manifest, shard, columns)
+        if with_inputs:
+            data.update(grid_points(manifest["axes"], shard["start"], shard["stop"]))
+        yield shard, data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the model over a full grid of slider values.")
+    parser.add_argument("out", help="output directory; rerun with the same arguments to resume")
+    parser.add_argument("--steps", type=int, default=101, help="points per axis (101 = integer steps)")
+    parser.add_argument("--chunk", type=int, default=CHUNK_POINTS, help="grid points per shard")
+    parser.add_argument("--dtype", choices=["float64", "float32"], default="float64")
+    parser.add_argument("--format", choices=FORMATS, default="npz")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--where", help='skip shards that cannot meet e.g. "thirst < 1 and hunger < 1"')
+    args = parser.parse_args()
+
+    # range_index imports this module, so it is only imported once loaded
+    import range_index
+
+    axes = make_axes(args.steps)
+    try:
+        constraints = range_index.parse_constraints(args.where) if args.where else None
+        manifest = run_sweep(args.out, axes, args.chunk, args.dtype, args.format, args.workers, constraints)
+    except ValueError as error:
+        parser.error(str(error))
+    written = sum(1 for shard in manifest["shards"] if not shard.get("pruned"))
+    print(f"{manifest['points']} points, {written} of {len(manifest['shards'])} shards written in {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import os
+
+import numpy as np
+import pytest
+
+import batch_equations
+import equations
+
+
+def random_inputs(count, seed, integers):
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for name in batch_equations.INPUT_NAMES:
+        low, high = batch_equations.INPUT_RANGES[name]
+        columns[name] = rng.integers(low, high + 1, count).astype(float) if integers else rng.uniform(low, high, count)
+    return columns
+
+
+def scalar(columns, index):
+    # Python floats as the sliders give; NumPy scalars divide by zero silently
+    variables = {name: float(values[index]) for name, values in columns.items()}
+    try:
+        return equations.calculate_dependent_variables(variables)
+    except ZeroDivisionError:
+        return None
+
+
+@pytest.mark.parametrize("integers", [True, False], ids=["slider values", "real values"])
+def test_matches_scalar_equations(integers):
+    columns = random_inputs(3000, seed=1, integers=integers)
+    columns["humidity"][:20] = 0  # Zero cloud density, where the scalar path raises
+    batch = batch_equations.calculate_dependent_variables(columns, truncate=True)
+    failures = batch_equations.scalar_failures(batch_equations.calculate_dependent_variables(columns))
+
+    for index in range(len(columns["humidity"])):
+        expected = scalar(columns, index)
+        assert failures[index] == (expected is None)
+        if expected is None:
+            continue
+        actual = {name: batch[name][index] for name in batch_equations.OUTPUT_NAMES}
+        assert actual == expected, index
+
+
+def test_default_population_outside_slider_range():
+    # DEFAULT_VARIABLES starts population at 1000, beyond the slider range
+    variables = {"solar_intensity": 30.0, "humidity": 50.0, "wind_speed": 10.0, "population": 1000.0}
+    batch = batch_equations.calculate_dependent_variables({k: np.array([v]) for k, v in variables.items()}, True)
+    expected = equations.calculate_dependent_variables(variables)
+    assert {name: batch[name][0] for name in expected} == expected
+
+
+def test_unclamped_values_respect_clamps():
+    columns = random_inputs(2000, seed=2, integers=False)
+    unclamped = {}
+    outputs = batch_equations.calculate_dependent_variables(columns, unclamped=unclamped)
+    assert set(unclamped) == set(batch_equations.CLAMPS)
+    for name, (low, high) in batch_equations.CLAMPS.items():
+        np.testing.assert_array_equal(outputs[name], np.clip(unclamped[name], low, high))
+
+
+def test_digest_covers_scalar_equations(tmp_path, monkeypatch):
+    sources = []
+    for path in batch_equations.MODEL_SOURCES:
+        copy = tmp_path / os.path.basename(path)
+        copy.write_bytes(open(path, "rb").read())
+        sources.append(str(copy))
+    monkeypatch.setattr(batch_equations, "MODEL_SOURCES", sources)
+    before = batch_equations.model_digest()
+    with open(tmp_path / "equations.py", "a") as file:
+        file.write("\n# edited\n")
+    assert batch_equations.model_digest() != before
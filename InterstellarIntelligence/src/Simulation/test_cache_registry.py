@@ -0,0 +1,28 @@
+import threading
+
+import numpy as np
+
+import cache_registry
+
+
+def test_limit_holds_with_concurrent_writers():
+    registry = cache_registry.CacheRegistry(memory_limit=2_000_000)
+    caches = [registry.create(f"cache{i}", max_entries=50) for i in range(4)]
+
+    def fill(seed):
+        rng = np.random.default_rng(seed)
+        for i in range(2000):
+            cache = caches[rng.integers(len(caches))]
+            cache.put((seed, i), np.zeros(rng.integers(1000, 50000), dtype=np.uint8))
+            cache.get((seed, i - 1))
+
+    threads = [threading.Thread(target=fill, args=(seed,)) for seed in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert registry.total_bytes() <= registry.memory_limit
+    for cache in caches:
+        assert cache.bytes == sum(size for _, size in cache.entries.values())
+        assert set(cache.uses) == set(cache.entries)
@@ -0,0 +1,57 @@
+import numpy as np
+
+import batch_equations
+import dual
+
+STEP = 1e-5
+
+
+def random_inputs(count, seed):
+    rng = np.random.default_rng(seed)
+    return {name: rng.uniform(low + 1, high - 1, count)
+            for name, (low, high) in batch_equations.INPUT_RANGES.items()}
+
+
+def shifted(columns, name, delta):
+    return batch_equations.calculate_dependent_variables({**columns, name: columns[name] + delta})
+
+
+def test_values_match_model():
+    columns = random_inputs(2000, seed=0)
+    outputs, _ = dual.jacobian(columns)
+    expected = batch_equations.calculate_dependent_variables(columns)
+    for name in batch_equations.OUTPUT_NAMES:
+        np.testing.assert_array_equal(outputs[name], expected[name])
+
+
+def central_difference(columns, name, output, step):
+    return (shifted(columns, name, step)[output] - shifted(columns, name, -step)[output]) / (2 * step)
+
+
+def test_jacobian_matches_central_differences():
+    columns = random_inputs(2000, seed=1)
+    _, matrix = dual.jacobian(columns)
+    compared = 0
+    for j, name in enumerate(batch_equations.INPUT_NAMES):
+        for i, output in enumerate(batch_equations.OUTPUT_NAMES):
+            fine = central_difference(columns, name, output, STEP)
+            coarse = central_difference(columns, name, output, 10 * STEP)
+            scale = 1 + np.abs(fine)
+            # Only where the difference has converged: away from clamps and
+            # branches, and from the steep corners a step cannot resolve
+            converged = np.abs(fine - coarse) <= 1e-6 * scale
+            error = np.abs(matrix[:, i, j] - fine) / scale
+            assert np.all(error[converged] <= 1e-5), (output, name, error[converged].max())
+            compared += converged.sum()
+    assert compared > 0.95 * matrix.size
+
+
+def test_sensitivities_at_one_setting():
+    variables = {"solar_intensity": 30.0, "humidity": 50.0, "wind_speed": 10.0, "population": 40.0}
+    result = dual.sensitivities(variables)
+    values = batch_equations.calculate_dependent_variables({k: np.array([v]) for k, v in variables.items()})
+    for name in batch_equations.INPUT_NAMES:
+        above = shifted({k: np.array([v]) for k, v in variables.items()}, name, STEP)
+        for output in batch_equations.OUTPUT_NAMES:
+            slope = (above[output][0] - values[output][0]) / STEP
+            assert abs(result[output][name] - slope) <= 1e-3 * (1 + abs(slope)), (output, name)
@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+import dynamics
+
+
+def planets(count=20):
+    rng = np.random.default_rng(0)
+    variables = {name: rng.uniform(0, 100, count) for name in dynamics.batch_equations.INPUT_NAMES}
+    return dynamics.Planets.from_variables(variables, barren=True)
+
+
+def test_adaptive_reaches_the_end():
+    group = planets()
+    recorded = group.run_adaptive(10.0, record=3)
+    np.testing.assert_allclose(group.time, 10.0)
+    assert recorded.times[-1] == pytest.approx(10.0)
+
+
+def test_adaptive_raises_when_rounds_run_out():
+    group = planets()
+    with pytest.raises(RuntimeError, match="unfinished after 5 rounds"):
+        group.run_adaptive(10.0, max_rounds=5)
+    assert group.time.max() < 10.0
@@ -0,0 +1,37 @@
+import os
+import runpy
+
+import pytest
+
+import batch_equations
+import interval
+
+AUTOGRADER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "AutoGrader")
+
+
+@pytest.fixture(scope="module")
+def outputs(tmp_path_factory):
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv("SIM_ASSET_CACHE", str(tmp_path_factory.mktemp("cache")))
+        return interval.output_bounds()[0]
+
+
+def test_bounds_enclose_attained_values(outputs):
+    for name, bounds in outputs.items():
+        assert bounds.low <= bounds.attained_low <= bounds.attained_high <= bounds.high, name
+
+
+def test_variable_ranges_within_clamps(outputs):
+    ranges = interval.variable_ranges(outputs)
+    assert len(ranges) == len(batch_equations.CLAMPS)
+    for (low, high), (clamp_low, clamp_high), name in zip(ranges.values(), batch_equations.CLAMPS.values(),
+                                                          batch_equations.CLAMPS):
+        assert clamp_low <= low <= outputs[name].attained_low, name
+        assert outputs[name].attained_high <= high <= clamp_high, name
+
+
+@pytest.mark.parametrize("module", ["calculation.py", "actual_solution.py"])
+def test_autograder_ranges_match_model(outputs, module):
+    # Regenerate with: python interval.py --variable-ranges
+    table = runpy.run_path(os.path.join(AUTOGRADER_DIR, module))["variable_ranges"]
+    assert table == interval.variable_ranges(outputs)
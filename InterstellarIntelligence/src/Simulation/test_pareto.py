@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+import batch_equations
+import pareto
+
+
+def brute_force(costs):
+    # A row is dominated if another is no worse everywhere and better somewhere
+    no_worse = np.all(costs[:, None, :] <= costs[None, :, :], axis=2)
+    better = np.any(costs[:, None, :] < costs[None, :, :], axis=2)
+    return ~np.any(no_worse & better, axis=0)
+
+
+@pytest.mark.parametrize("objectives", [1, 2, 3, 4])
+@pytest.mark.parametrize("count", [1, 50, 600])
+def test_matches_brute_force(objectives, count):
+    rng = np.random.default_rng(objectives * 1000 + count)
+    real = rng.normal(size=(count, objectives))
+    ties = rng.integers(0, 6, (count, objectives)).astype(float)  # Shared values and duplicate rows
+    for costs in (real, ties):
+        np.testing.assert_array_equal(pareto.non_dominated(costs), brute_force(costs))
+
+
+def test_anticorrelated_front():
+    # Most points on the front; the pivot filter must not drop any of them
+    rng = np.random.default_rng(3)
+    costs = rng.dirichlet(np.ones(3), 800)
+    np.testing.assert_array_equal(pareto.non_dominated(costs), brute_force(costs))
+
+
+def test_empty():
+    assert pareto.non_dominated(np.empty((0, 2))).shape == (0,)
+
+
+def test_front_is_non_dominated():
+    front = pareto.Front.compute(samples=5000)
+    signs = np.array([1.0 if sense == "min" else -1.0 for _, sense in front.objectives])
+    assert brute_force(front.values * signs).all()
+    assert np.all(np.diff(front.values[:, 0]) >= 0)
+    outputs = batch_equations.calculate_dependent_variables(dict(zip(batch_equations.INPUT_NAMES, front.inputs.T)))
+    for i, (name, _) in enumerate(front.objectives):
+        np.testing.assert_array_equal(outputs[name], front.values[:, i])
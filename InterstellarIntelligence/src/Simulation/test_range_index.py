@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+import batch_equations
+import range_index
+import sweep
+
+
+@pytest.fixture(scope="module")
+def index(tmp_path_factory):
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv("SIM_ASSET_CACHE", str(tmp_path_factory.mktemp("cache")))
+        yield range_index.RangeIndex.build(steps=9)
+
+
+def brute_force(axes, constraints):
+    total = int(np.prod([len(values) for values in axes.values()]))
+    values = batch_equations.calculate_dependent_variables(sweep.grid_points(axes, 0, total))
+    keep = np.ones(total, dtype=bool)
+    for output, op, value in constraints:
+        keep &= range_index.OPERATORS[op](values[output], value)
+    return np.flatnonzero(keep)
+
+
+@pytest.mark.parametrize("text", [
+    "thirst < 1 and hunger < 1",
+    "ASI > 10000",
+    "health_risk >= 2 and Photosynthesis <= 50",
+    "cloud density == 0",
+    "thirst > 1000000",
+])
+def test_query_matches_brute_force(index, text):
+    constraints = range_index.parse_constraints(text)
+    np.testing.assert_array_equal(index.query(text).indices, brute_force(index.axes, constraints))
+
+
+@pytest.mark.parametrize("op", sorted(range_index.OPERATORS))
+def test_values_on_bin_edges(index, op):
+    # Edge values get odd codes, decided from the codes alone
+    for output in batch_equations.OUTPUT_NAMES:
+        edges = index.edges[output]
+        for value in edges[[0, len(edges) // 2, -1]]:
+            constraints = [(output, op, float(value))]
+            np.testing.assert_array_equal(index.query(constraints).indices,
+                                          brute_force(index.axes, constraints), err_msg=output)
+
+
+def test_runs_cover_matches(index):
+    match = index.query("thirst < 1")
+    population = batch_equations.INPUT_NAMES[-1]
+    points = sum(
+        int(np.sum((np.asarray(index.axes[population]) >= low) & (np.asarray(index.axes[population]) <= high)))
+        for low, high in (run[population] for run in match.runs())
+    )
+    assert points == len(match)
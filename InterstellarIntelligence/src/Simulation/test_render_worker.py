@@ -0,0 +1,54 @@
+import time
+
+import pytest
+
+from render_worker import RenderWorker
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        result = condition()
+        if result:
+            return result
+        time.sleep(0.005)
+    raise AssertionError("timed out")
+
+
+@pytest.fixture
+def worker():
+    attempts = []
+
+    def render(params, out):
+        attempts.append(params)
+        if params == "bad" and attempts.count("bad") == 1:
+            raise ValueError("broken")
+        return params.upper()
+
+    worker = RenderWorker(render, name="test-worker")
+    worker.attempts = attempts
+    worker.start()
+    yield worker
+    worker.stop()
+
+
+def test_failure_is_reported_and_retried(worker, monkeypatch):
+    monkeypatch.setattr("traceback.print_exc", lambda: None)
+    worker.submit("bad")
+    assert str(wait_for(lambda: worker.error("bad"))) == "broken"
+    assert worker.take(lambda frame: frame) is None
+    assert worker.error("good") is None
+
+    worker.submit("bad")  # The same params again retry the failed render
+    assert worker.error("bad") is None
+    assert wait_for(lambda: worker.take(lambda frame: frame))[:2] == ("bad", "BAD")
+    assert worker.attempts == ["bad", "bad"]
+
+
+def test_repeated_request_renders_once(worker):
+    worker.submit("good")
+    assert wait_for(lambda: worker.take(lambda frame: frame))[:2] == ("good", "GOOD")
+    worker.submit("good")
+    time.sleep(0.1)
+    assert worker.take(lambda frame: frame) is None
+    assert worker.attempts == ["good"]
@@ -0,0 +1,116 @@
+import json
+import os
+
+import pytest
+
+import scenario_store
+
+FIRST = {"solar_intensity": 30.0, "humidity": 50.0, "wind_speed": 10.0, "population": 40.0}
+SECOND = {**FIRST, "humidity": 75.0}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = scenario_store.ScenarioStore(str(tmp_path))
+    yield store
+    store.close()
+
+
+def test_presets_round_trip(store):
+    store.save_preset("saved", FIRST)
+    store.save_preset("saved", SECOND)
+    store.save_preset("other", SECOND)
+    store.flush()
+    assert store.names() == ["other", "saved"]
+    assert store.versions("saved") == 2
+    assert store.load("saved") == SECOND
+    assert store.load("saved", 0) == FIRST
+    with pytest.raises(KeyError):
+        store.load("saved", 2)
+    with pytest.raises(KeyError):
+        store.load("missing")
+
+
+def test_reopen_uses_index(tmp_path, store):
+    store.save_preset("saved", FIRST)
+    store.save_preset("saved", SECOND)
+    store.flush()
+    reopened = scenario_store.ScenarioStore(str(tmp_path))
+    try:
+        assert reopened.versions("saved") == 2
+        assert reopened.load("saved", 0) == FIRST
+        assert reopened.log_size == os.path.getsize(store.log_path)
+    finally:
+        reopened.close()
+
+
+def test_reopen_catches_up_on_unindexed_records(tmp_path, store):
+    store.save_preset("saved", FIRST)
+    store.flush()
+    # Written after the index, as by a crash or another process, then a torn line
+    record = {"kind": "preset", "name": "saved", "time": 1.0, "variables": SECOND}
+    with open(store.log_path, "a") as file:
+        file.write(json.dumps(record) + "\n")
+        file.write('{"kind": "pre')
+    reopened = scenario_store.ScenarioStore(str(tmp_path))
+    try:
+        assert reopened.versions("saved") == 2
+        assert reopened.load("saved") == SECOND
+    finally:
+        reopened.close()
+
+
+def test_index_of_another_format_is_rebuilt(tmp_path, store):
+    store.save_preset("saved", FIRST)
+    store.flush()
+    with open(store.index_path) as file:
+        index = json.load(file)
+    index["format"] = scenario_store.STORE_FORMAT + 1
+    index["presets"] = {}
+    with open(store.index_path, "w") as file:
+        json.dump(index, file)
+    reopened = scenario_store.ScenarioStore(str(tmp_path))
+    try:
+        assert reopened.load("saved") == FIRST
+    finally:
+        reopened.close()
+
+
+def test_history(store):
+    for humidity in range(5):
+        store.record({**FIRST, "humidity": float(humidity)})
+    store.save_preset("saved", FIRST)
+    store.flush()
+    history = store.history()
+    assert [variables["humidity"] for _, variables in history] == [0, 1, 2, 3, 4]
+    assert [variables["humidity"] for _, variables in store.history(2)] == [3, 4]
+    assert all(earlier[0] <= later[0] for earlier, later in zip(history, history[1:]))
+
+
+def test_failed_write_is_reported_and_dropped(store, monkeypatch):
+    store.save_preset("saved", FIRST)
+    store.flush()
+
+    def fail(records):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(store, "_append", fail)
+    monkeypatch.setattr(scenario_store.traceback, "print_exc", lambda: None)
+    store.save_preset("saved", SECOND)
+    store.save_preset("new", SECOND)
+    with pytest.raises(OSError, match="disk full"):
+        store.flush()
+    assert store.versions("saved") == 1
+    assert store.load("saved") == FIRST
+    assert store.names() == ["saved"]
+    store.flush()  # Reported once
+
+    monkeypatch.undo()
+    store.save_preset("saved", SECOND)
+    store.flush()
+    assert store.load("saved") == SECOND
+
+
+def test_malformed_variables_are_rejected(store):
+    with pytest.raises(ValueError):
+        store.save_preset("saved", {"humidity": 50.0})
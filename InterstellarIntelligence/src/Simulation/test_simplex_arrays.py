@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+from opensimplex import OpenSimplex
+
+import simplex_arrays
+
+
+@pytest.fixture(scope="module")
+def simplex():
+    return OpenSimplex(seed=42)
+
+
+def points(dimensions, count=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    random = rng.uniform(-20, 20, (count, dimensions))
+    lattice = rng.integers(-5, 5, (50, dimensions)).astype(float)  # Ties in the vertex selection
+    return np.vstack([random, lattice, lattice + 0.5])
+
+
+def test_noise2_matches_scalar(simplex):
+    x, y = points(2).T
+    expected = [simplex.noise2(a, b) for a, b in zip(x, y)]
+    np.testing.assert_allclose(simplex_arrays.noise2(simplex, x, y), expected, rtol=0, atol=1e-12)
+
+
+def test_noise3_matches_scalar(simplex):
+    x, y, z = points(3).T
+    expected = [simplex.noise3(a, b, c) for a, b, c in zip(x, y, z)]
+    np.testing.assert_allclose(simplex_arrays.noise3(simplex, x, y, z), expected, rtol=0, atol=1e-12)
+
+
+def test_broadcasts(simplex):
+    x = np.linspace(0, 4, 7)[:, None]
+    y = np.linspace(-2, 2, 5)[None, :]
+    values = simplex_arrays.noise3(simplex, x, y, 0.25)
+    assert values.shape == (7, 5)
+    assert values[3, 2] == pytest.approx(simplex.noise3(x[3, 0], y[0, 2], 0.25), abs=1e-12)
+
+
+def test_tables_match_generator(simplex):
+    perm, perm_grad_index3 = simplex_arrays._tables(simplex)
+    assert len(perm) == 256 and len(perm_grad_index3) == 256
+
+
+def test_scalar_fallback(simplex, monkeypatch):
+    monkeypatch.setattr(simplex_arrays, "_tables", lambda generator: None)
+    x, y, z = points(3, count=200).T
+    np.testing.assert_allclose(simplex_arrays.noise3(simplex, x, y, z),
+                               [simplex.noise3(a, b, c) for a, b, c in zip(x, y, z)], rtol=0, atol=1e-15)
+    np.testing.assert_allclose(simplex_arrays.noise2(simplex, x, y),
+                               [simplex.noise2(a, b) for a, b in zip(x, y)], rtol=0, atol=1e-15)
@@ -0,0 +1,50 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+import pygame
+import pytest
+
+import starfield
+from frame_scheduler import FrameScheduler
+
+WIDTH, HEIGHT = 1200, 700
+
+
+@pytest.fixture(scope="module")
+def surface():
+    pygame.init()
+    return pygame.Surface((WIDTH, HEIGHT))
+
+
+def test_default_field_stays_on_dirty_rect_path(surface, monkeypatch):
+    field = starfield.StarField(WIDTH, HEIGHT, seed=0)
+    scheduler = FrameScheduler()
+    scheduler.full_redraw = False
+    calls = []
+    monkeypatch.setattr(pygame.display, "flip", lambda: calls.append("flip"))
+    monkeypatch.setattr(pygame.display, "update", lambda rects: calls.append("update"))
+
+    field.draw(surface)
+    field.update(1.0)
+    for rect in field.draw(surface):
+        scheduler.mark_dirty(rect)
+    assert len(scheduler.dirty_rects) < scheduler.max_dirty_rects // 2
+    scheduler.flush()
+    assert calls == ["update"]
+
+
+@pytest.mark.parametrize("count", [600, 5000])
+def test_rects_cover_old_and_new_stars(surface, count):
+    field = starfield.StarField(WIDTH, HEIGHT, count=count, seed=1)
+    field.draw(surface)
+    previous = field.boxes
+    field.update(1.0)
+    rects = field.draw(surface)
+
+    covered = np.zeros((WIDTH, HEIGHT), dtype=bool)
+    for rect in rects:
+        covered[rect.left:rect.right, rect.top:rect.bottom] = True
+    for left, top, right, bottom in np.concatenate([previous, field.boxes]):
+        assert covered[max(left, 0):min(right, WIDTH), max(top, 0):min(bottom, HEIGHT)].all()
@@ -0,0 +1,91 @@
+"""
+Row-tiled execution of array kernels on a shared thread pool.
+
+Rasterizers split their output into fixed bands of rows and hand each band
+to ``map_row_tiles``. The NumPy kernels release the GIL, so the bands run
+on all cores. Tile boundaries depend only on the row count, never on the
+number of threads, and every tile writes its own rows, so the stitched
+result is identical for any thread count.
+
+The pool size defaults to the number of CPUs and can be set with the
+SIM_RENDER_THREADS environment variable or ``set_thread_count``.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+TILE_ROWS = 32
+
+_lock = threading.Lock()
+_executor = None
+_thread_count = None
+_local = threading.local()
+
+
+def get_thread_count():
+    if _thread_count is not None:
+        return _thread_count
+    value = os.environ.get("SIM_RENDER_THREADS", "")
+    if value.isdigit() and int(value) > 0:
+        return int(value)
+    return os.cpu_count() or 1
+
+
+def set_thread_count(count):
+    """
+    Resizes the pool. ``None`` goes back to the default.
+    """
+    global _executor, _thread_count
+    with _lock:
+        _thread_count = count
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None and get_thread_count() > 1:
+            _executor = ThreadPoolExecutor(get_thread_count(), thread_name_prefix="raster")
+        return _executor
+
+
+def row_tiles(rows, tile_rows=TILE_ROWS):
+    """
+    Returns:
+        list: (start, stop) row ranges covering ``rows`` rows in order
+    """
+    return [(start, min(start + tile_rows, rows)) for start in range(0, rows, tile_rows)]
+
+
+def map_row_tiles(kernel, rows, tile_rows=TILE_ROWS):
+    """
+    Runs ``kernel(start, stop)`` for every row tile.
+
+    Args:
+        kernel (callable): computes rows [start, stop) of the output
+        rows (int): total number of rows
+        tile_rows (int): rows per tile
+
+    Returns:
+        list: kernel results in tile order
+    """
+    tiles = row_tiles(rows, tile_rows)
+    # Kernels that tile again run their tiles inline; waiting on the pool
+    # from inside it could deadlock
+    nested = getattr(_local, "in_tile", False)
+    executor = _get_executor() if len(tiles) > 1 and not nested else None
+    if executor is None:
+        return [kernel(start, stop) for start, stop in tiles]
+    futures = [executor.submit(_run_tile, kernel, start, stop) for start, stop in tiles]
+    return [future.result() for future in futures]
+
+
+def _run_tile(kernel, start, stop):
+    _local.in_tile = True
+    try:
+        return kernel(start, stop)
+    finally:
+        _local.in_tile = False
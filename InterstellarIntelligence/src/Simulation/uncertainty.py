@@ -0,0 +1,271 @@
+"""
+Monte Carlo propagation of uncertain slider inputs through the model.
+
+Each slider is either fixed or drawn from a distribution, with draws
+clipped to the slider range as dragging a slider would be. Samples are evaluated in chunks
+with batch_equations, and every output keeps only running sums, exceedance
+counts and P-squared quantile markers (Jain and Chlamtac, 1985), so memory
+does not grow with the sample count. The P-squared update is applied a
+chunk at a time: marker positions advance by the number of samples below
+each marker and the markers then move towards their desired positions
+with the piecewise-parabolic formula.
+
+The statistics are of the unrounded outputs.
+
+    python uncertainty.py --set solar_intensity=40 --set "humidity=normal(50, 10)" \\
+        --set "wind_speed=uniform(5, 15)" --set population=30 --samples 1000000
+"""
+
+import argparse
+import collections
+import re
+
+import numpy as np
+
+import batch_equations
+
+SAMPLES = 100_000
+CHUNK = 8192
+QUANTILES = (0.05, 0.5, 0.95)
+# Default exceedance events: the limits failures are judged by
+THRESHOLDS = (("Hunger", ">", 1.0), ("Thirst", ">", 1.0))
+
+Summary = collections.namedtuple("Summary", "mean std quantiles exceedance")
+
+
+class Distribution(collections.namedtuple("Distribution", "kind params")):
+    """
+    A slider distribution: ``fixed(value)``, ``uniform(low, high)``,
+    ``normal(mean, sd)``, ``triangular(low, mode, high)`` or
+    ``lognormal(mean, sigma)`` (mean and sigma of the logarithm).
+    """
+
+    __slots__ = ()
+
+    def sample(self, rng, count, name):
+        if self.kind == "fixed":
+            return np.full(count, float(self.params[0]))
+        return np.clip(getattr(rng, self.kind)(*self.params, count), *batch_equations.INPUT_RANGES[name])
+
+
+ARITY = {"fixed": 1, "uniform": 2, "normal": 2, "triangular": 3, "lognormal": 2}
+
+
+def parse_distribution(text):
+    """
+    Parses ``normal(50, 10)`` and the like; a bare number is fixed.
+
+    Raises:
+        ValueError: if the text is not a known distribution
+    """
+    text = text.strip()
+    try:
+        return Distribution("fixed", (float(text),))
+    except ValueError:
+        pass
+    match = re.fullmatch(r"(\w+)\s*\((.*)\)", text)
+    if not match or match.group(1) not in ARITY:
+        raise ValueError(f"Unknown distribution: {text}")
+    kind = match.group(1)
+    params = tuple(float(value) for value in match.group(2).split(","))
+    if len(params) != ARITY[kind]:
+        raise ValueError(f"{kind} takes {ARITY[kind]} parameters")
+    return Distribution(kind, params)
+
+
+def around(variables, spreads):
+    """
+    Normal distributions centred on slider settings, with the standard
+    deviations in ``spreads``; other sliders stay fixed.
+    """
+    return {
+        name: Distribution("normal", (value, spreads[name])) if spreads.get(name) else Distribution("fixed", (value,))
+        for name, value in variables.items()
+    }
+
+
+class P2Quantiles:
+    """
+    Streaming estimates of several quantiles of several columns, with five
+    markers per (quantile, column) pair and constant memory.
+    """
+
+    def __init__(self, quantiles, columns):
+        self.quantiles = np.asarray(quantiles, dtype=float)
+        p = np.repeat(self.quantiles, columns)[:, None]
+        self.increments = np.hstack([np.zeros_like(p), p / 2, p, (1 + p) / 2, np.ones_like(p)])
+        self.columns = columns
+        self.heights = None  # (quantiles * columns, 5) marker heights
+        self.positions = None  # Marker positions, 1-based
+        self.desired = None
+
+    def update(self, values):
+        """
+        Adds a chunk of observations.
+
+        Args:
+            values (np.ndarray): (n, columns); the first chunk needs n >= 5
+        """
+        values = np.tile(np.asarray(values, dtype=float), (1, len(self.quantiles)))
+        count = len(values)
+        if self.heights is None:
+            # Markers start at the sample quantiles of the first chunk
+            ordered = np.sort(values, axis=0)
+            self.desired = 1 + (count - 1) * self.increments
+            # Nearest ranks, pushed apart so the five markers stay distinct
+            offsets = np.arange(5)
+            positions = np.maximum.accumulate(np.rint(self.desired) - offsets, axis=1) + offsets
+            self.positions = np.minimum(positions, count - 4 + offsets)
+            self.heights = np.take_along_axis(ordered, self.positions.T.astype(int) - 1, axis=0).T
+            return
+        self.heights[:, 0] = np.minimum(self.heights[:, 0], values.min(axis=0))
+        self.heights[:, 4] = np.maximum(self.heights[:, 4], values.max(axis=0))
+        for i in (1, 2, 3):
+            self.positions[:, i] += (values < self.heights[:, i]).sum(axis=0)
+        self.positions[:, 4] += count
+        self.desired += count * self.increments
+        for i in (1, 2, 3):
+            self._adjust(i)
+
+    def _adjust(self, i):
+        q, n = self.heights, self.positions
+        below = n[:, i - 1] - n[:, i]
+        above = n[:, i + 1] - n[:, i]
+        step = np.clip(np.rint(self.desired[:, i] - n[:, i]), below + 1, above - 1)
+        move = step != 0
+        if not move.any():
+            return
+        with np.errstate(divide="ignore", invalid="ignore"):
+            parabolic = q[:, i] + step / (above - below) * (
+                (step - below) * (q[:, i + 1] - q[:, i]) / above
+                + (above - step) * (q[:, i] - q[:, i - 1]) / -below)
+            neighbour = np.where(step > 0, q[:, i + 1], q[:, i - 1])
+            gap = np.where(step > 0, above, below)
+            linear = q[:, i] + step * (neighbour - q[:, i]) / gap
+        inside = (q[:, i - 1] < parabolic) & (parabolic < q[:, i + 1])
+        q[:, i] = np.where(move, np.where(inside, parabolic, linear), q[:, i])
+        n[:, i] += step
+
+    def values(self):
+        """
+        Returns:
+            np.ndarray: (quantiles, columns) estimates
+        """
+        return self.heights[:, 2].reshape(len(self.quantiles), self.columns)
+
+
+def propagate(distributions, samples=SAMPLES, quantiles=QUANTILES, thresholds=THRESHOLDS, chunk=CHUNK, seed=0):
+    """
+    Pushes samples of the slider distributions through the model.
+
+    Args:
+        distributions (dict): INPUT_NAMES -> Distribution
+        thresholds: (output, ">" or "<", value) events to count
+
+    Returns:
+        dict: output name -> Summary, with ``quantiles`` a dict from each
+        quantile and ``exceedance`` a dict from each (op, value) for that
+        output to its probability
+
+    Raises:
+        ValueError: with fewer than five samples or samples per chunk,
+            the least P-squared starts from
+    """
+    if min(samples, chunk) < 5:
+        raise ValueError("Need at least 5 samples and 5 samples per chunk")
+    rng = np.random.default_rng(seed)
+    names = batch_equations.OUTPUT_NAMES
+    estimator = P2Quantiles(quantiles, len(names))
+    total = np.zeros(len(names))
+    total_squares = np.zeros(len(names))
+    exceeded = np.zeros(len(thresholds))
+    shift = None
+    done = 0
+    while done < samples:
+        count = min(chunk, samples - done)
+        inputs = {name: distributions[name].sample(rng, count, name) for name in batch_equations.INPUT_NAMES}
+        outputs = batch_equations.calculate_dependent_variables(inputs)
+        values = np.stack([outputs[name] for name in names], axis=1)
+        if shift is None:
+            shift = values[0]  # Sums about the first sample keep the variance accurate
+        centred = values - shift
+        total += centred.sum(axis=0)
+        total_squares += (centred * centred).sum(axis=0)
+        for j, (name, op, value) in enumerate(thresholds):
+            exceeded[j] += np.count_nonzero(outputs[name] > value if op == ">" else outputs[name] < value)
+        estimator.update(values)
+        done += count
+
+    mean = total / done
+    variance = np.maximum(total_squares / done - mean * mean, 0) * done / max(done - 1, 1)
+    estimates = estimator.values()
+    summaries = {}
+    for k, name in enumerate(names):
+        events = {(op, value): float(exceeded[j] / done)
+                  for j, (output, op, value) in enumerate(thresholds) if output == name}
+        summaries[name] = Summary(float(shift[k] + mean[k]), float(np.sqrt(variance[k])),
+                                  dict(zip(quantiles, estimates[:, k].tolist())), events)
+    return summaries
+
+
+def parse_threshold(text):
+    match = re.fullmatch(r"(.+?)\s*([<>])\s*([-+.\deE]+)", text.strip())
+    if not match or match.group(1) not in batch_equations.OUTPUT_NAMES:
+        raise ValueError(f"Bad threshold: {text} (expected OUTPUT>VALUE or OUTPUT<VALUE)")
+    return match.group(1), match.group(2), float(match.group(3))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Propagate uncertain slider inputs through the model.")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=DIST",
+                        help="e.g. humidity=normal(50,10); unset sliders are fixed at the defaults")
+    parser.add_argument("--samples", type=int, default=SAMPLES)
+    parser.add_argument("--chunk", type=int, default=CHUNK, help="samples evaluated at a time")
+    parser.add_argument("--quantile", type=float, action="append", help="quantiles to estimate")
+    parser.add_argument("--exceed", action="append", metavar="OUTPUT>VALUE",
+                        help="probability events; defaults to Hunger>1 and Thirst>1")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--exact", action="store_true", help="also print exact quantiles of a stored sample")
+    args = parser.parse_args()
+
+    import simulation  # Slider defaults; kept out of module scope so imports stay light
+
+    distributions = {name: Distribution("fixed", (float(value),))
+                     for name, value in simulation.DEFAULT_VARIABLES.items()}
+    try:
+        for assignment in args.set:
+            name, _, text = assignment.partition("=")
+            if name not in batch_equations.INPUT_NAMES:
+                raise ValueError(f"Unknown input: {name}")
+            distributions[name] = parse_distribution(text)
+        thresholds = tuple(parse_threshold(text) for text in args.exceed) if args.exceed else THRESHOLDS
+    except ValueError as error:
+        parser.error(str(error))
+    quantiles = tuple(args.quantile) if args.quantile else QUANTILES
+    if not all(0 < q < 1 for q in quantiles):
+        parser.error("Quantiles must lie strictly between 0 and 1")
+
+    try:
+        summaries = propagate(distributions, args.samples, quantiles, thresholds, args.chunk, args.seed)
+    except ValueError as error:
+        parser.error(str(error))
+    exact = None
+    if args.exact:
+        rng = np.random.default_rng(args.seed)
+        inputs = {name: distributions[name].sample(rng, args.samples, name) for name in batch_equations.INPUT_NAMES}
+        exact = batch_equations.calculate_dependent_variables(inputs)
+
+    header = "".join(f"{f'q{q:g}':>13}" for q in quantiles)
+    print(f"{'Output':<22}{'mean':>13}{'std':>13}{header}")
+    for name, summary in summaries.items():
+        row = "".join(f"{value:13.6g}" for value in summary.quantiles.values())
+        print(f"{name:<22}{summary.mean:13.6g}{summary.std:13.6g}{row}")
+        if exact is not None:
+            row = "".join(f"{value:13.6g}" for value in np.quantile(exact[name], quantiles))
+            print(f"{'  exact':<48}{row}")
+    for name, op, value in thresholds:
+        print(f"P({name} {op} {value:g}) = {summaries[name].exceedance[(op, value)]:.6f}")
+
+
+if __name__ == "__main__":
+    main()